@@ -0,0 +1,104 @@
+import os
+import threading
+import uuid
+from typing import Optional
+from config import settings
+
+
+class AlmacenArtefactos:
+    """
+    Guarda en disco los reportes ya generados, con el hash de su contenido como nombre
+    de archivo (<clave>.pdf). Si el mismo reporte se vuelve a pedir con los mismos
+    datos, se lee el archivo en lugar de volver a armarlo.
+
+    El tamaño total se limita a max_bytes: al superarlo se borran los archivos usados
+    hace más tiempo (cada lectura actualiza la fecha de modificación del archivo).
+    Las escrituras son atómicas (archivo temporal + os.replace), así que varios
+    procesos, como los del pool de reportes, pueden compartir el directorio.
+    """
+
+    def __init__(self, directorio: str, max_bytes: int):
+        self._directorio = directorio
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Se calcula recorriendo el directorio la primera vez que se guarda algo
+        self._tamanio_total: Optional[int] = None
+
+    @property
+    def habilitado(self) -> bool:
+        return self._max_bytes > 0
+
+    def _ruta(self, clave: str, extension: str) -> str:
+        return os.path.join(self._directorio, f"{clave}.{extension}")
+
+    def leer(self, clave: str, extension: str = "pdf") -> Optional[bytes]:
+        if not self.habilitado:
+            return None
+        ruta = self._ruta(clave, extension)
+        try:
+            with open(ruta, "rb") as archivo:
+                contenido = archivo.read()
+            os.utime(ruta)
+        except FileNotFoundError:
+            # También puede haberlo borrado otro proceso entre el open y el utime
+            return None
+        return contenido
+
+    def guardar(self, clave: str, contenido: bytes, extension: str = "pdf"):
+        if not self.habilitado or len(contenido) > self._max_bytes:
+            return
+        os.makedirs(self._directorio, exist_ok=True)
+        ruta = self._ruta(clave, extension)
+        try:
+            # La clave es el hash del contenido: si el archivo existe ya tiene estos
+            # mismos bytes, y volver a escribirlo sumaría su tamaño dos veces al total
+            os.utime(ruta)
+            return
+        except FileNotFoundError:
+            pass
+        temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+        with self._lock:
+            if self._tamanio_total is None:
+                self._tamanio_total = self._recorrer()[1]
+            else:
+                self._tamanio_total += len(contenido)
+            if self._tamanio_total > self._max_bytes:
+                self._descartar_viejos()
+
+    def _recorrer(self):
+        archivos = []
+        total = 0
+        with os.scandir(self._directorio) as entradas:
+            for entrada in entradas:
+                if not entrada.is_file() or entrada.name.endswith(".tmp"):
+                    continue
+                try:
+                    datos = entrada.stat()
+                except FileNotFoundError:
+                    continue
+                archivos.append((datos.st_mtime, datos.st_size, entrada.path))
+                total += datos.st_size
+        return archivos, total
+
+    def _descartar_viejos(self):
+        # Se vuelve a recorrer el directorio: otros procesos también escriben en él
+        archivos, total = self._recorrer()
+        for _, tamanio, ruta in sorted(archivos):
+            if total <= self._max_bytes:
+                break
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamanio
+        self._tamanio_total = total
+
+
+almacen_artefactos = AlmacenArtefactos(
+    settings.ARTEFACTOS_DIRECTORIO,
+    settings.ARTEFACTOS_MAX_MB * 1024 * 1024,
+)
@@ -0,0 +1,860 @@
+"""
+Benchmarks de rendimiento.
+
+Cada escenario arma su propia base SQLite temporal (no toca turnos.db), la llena con
+datos sintéticos y compara la implementación anterior contra la actual.
+
+Uso:
+    python benchmark.py                 # corre todos los escenarios
+    python benchmark.py disponibilidad  # corre solo uno
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+import models
+from config import settings
+
+# --- CONFIGURACIÓN VISUAL ---
+GREEN = "\033[92m"
+CYAN = "\033[96m"
+YELLOW = "\033[93m"
+RESET = "\033[0m"
+
+
+def crear_base_temporal():
+    """Crea una base SQLite en un directorio temporal y devuelve (engine, SessionLocal)"""
+    directorio = tempfile.mkdtemp(prefix="bench_turnos_")
+    url = f"sqlite:///{os.path.join(directorio, 'bench.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+
+def poblar(db, personas: int, dias: int, seed: int = 1):
+    """Carga personas y turnos repartidos en `dias` días hacia atrás desde hoy"""
+    rnd = random.Random(seed)
+    db.bulk_insert_mappings(models.Persona, [
+        {
+            "id": i,
+            "nombre": f"Persona {i}",
+            "email": f"persona{i}@email.com",
+            "dni": f"{i:08d}",
+            "fecha_nacimiento": date(1990, 1, 1),
+            "habilitado": True,
+        }
+        for i in range(1, personas + 1)
+    ])
+
+    hoy = date.today()
+    turnos = []
+    for d in range(dias):
+        fecha = hoy - timedelta(days=d)
+        for hora in settings.HORARIOS_VALIDOS:
+            if rnd.random() < 0.7:
+                turnos.append({
+                    "fecha": fecha,
+                    "hora": hora,
+                    "estado": rnd.choice(settings.ESTADOS_VALIDOS),
+                    "persona_id": rnd.randint(1, personas),
+                })
+    db.bulk_insert_mappings(models.Turno, turnos)
+    db.commit()
+    return len(turnos)
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Devuelve el tiempo promedio por llamada en milisegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+def reportar(nombre: str, anterior_ms: float, actual_ms: float):
+    mejora = anterior_ms / actual_ms if actual_ms else float("inf")
+    print(f"  {nombre:<40} anterior: {anterior_ms:9.3f} ms | actual: {actual_ms:9.3f} ms | {GREEN}x{mejora:.1f}{RESET}")
+
+
+# =========================================================================
+# ESCENARIOS
+# =========================================================================
+
+def turnos_disponibles_anterior(db, fecha):
+    """Implementación original de services.turnos_disponibles"""
+    ocupados = [r[0] for r in db.query(models.Turno.hora).filter(
+        models.Turno.fecha == fecha,
+        models.Turno.estado != settings.ESTADO_CANCELADO,
+    ).all()]
+    return [h for h in settings.HORARIOS_VALIDOS if h not in ocupados]
+
+
+def bench_disponibilidad(repeticiones: int):
+    """GET /turnos-disponibles: consulta + búsqueda lineal vs índice de ocupación"""
+    import services
+    from ocupacion import indice_ocupacion
+
+    _, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        total = poblar(db, personas=500, dias=365)
+        print(f"{YELLOW}> {total} turnos en 365 días{RESET}")
+        fechas = [date.today() - timedelta(days=d) for d in range(30)]
+
+        indice_ocupacion.limpiar()
+        for fecha in fechas:
+            assert services.turnos_disponibles(db, fecha) == turnos_disponibles_anterior(db, fecha)
+
+        anterior = medir(lambda: [turnos_disponibles_anterior(db, f) for f in fechas], repeticiones)
+        actual = medir(lambda: [services.turnos_disponibles(db, f) for f in fechas], repeticiones)
+        reportar("turnos_disponibles (30 fechas)", anterior, actual)
+    finally:
+        db.close()
+
+
+def bench_calendario(repeticiones: int):
+    """GET /turnos-disponibles/calendario: una consulta por rango vs una llamada por día"""
+    import services
+    from ocupacion import indice_ocupacion
+
+    _, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        total = poblar(db, personas=500, dias=365)
+        print(f"{YELLOW}> {total} turnos en 365 días{RESET}")
+        hasta = date.today()
+        desde = hasta - timedelta(days=settings.MAX_DIAS_CALENDARIO - 1)
+        fechas = [desde + timedelta(days=i) for i in range(settings.MAX_DIAS_CALENDARIO)]
+
+        def calendario_en_frio():
+            # Sin índice cargado, para comparar consultas contra consultas
+            indice_ocupacion.limpiar()
+            return services.calendario_disponibles(db, desde, hasta)
+
+        esperado = [{"fecha": f, "horarios_disponibles": turnos_disponibles_anterior(db, f)} for f in fechas]
+        assert calendario_en_frio() == esperado
+
+        anterior = medir(lambda: [turnos_disponibles_anterior(db, f) for f in fechas], repeticiones)
+        actual = medir(calendario_en_frio, repeticiones)
+        reportar(f"{len(fechas)} llamadas vs calendario", anterior, actual)
+    finally:
+        db.close()
+
+
+def bench_habilitacion(repeticiones: int):
+    """Reportes estado-personas: un COUNT por persona vs un GROUP BY para todas"""
+    import services
+
+    _, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        personas = 12000
+        total = poblar(db, personas=personas, dias=365)
+        print(f"{YELLOW}> {personas} personas, {total} turnos{RESET}")
+        ids = list(range(1, personas + 1))
+
+        esperado = {pid: services.puede_sacar_turno(db, pid) for pid in ids}
+        assert services.puede_sacar_turno_bulk(db, ids) == esperado
+
+        # El recorrido persona por persona es muy lento: se mide con menos repeticiones
+        anterior = medir(lambda: [services.puede_sacar_turno(db, pid) for pid in ids], max(1, repeticiones // 10))
+        actual = medir(lambda: services.puede_sacar_turno_bulk(db, ids), repeticiones)
+        reportar(f"puede_sacar_turno ({personas} personas)", anterior, actual)
+    finally:
+        db.close()
+
+
+def bench_csv(repeticiones: int):
+    """CSV de turnos cancelados: DataFrame + StringIO vs escritura por bloques"""
+    import io
+    import tracemalloc
+    import pandas as pd
+    import crud
+    import services
+
+    def csv_anterior(db):
+        turnos = crud.query_turnos_cancelados(db).all()
+        df = pd.DataFrame([
+            {"ID Turno": t.id, "Fecha": t.fecha, "Hora": t.hora, "Estado": t.estado, "Persona ID": t.persona_id}
+            for t in turnos
+        ])
+        stream = io.StringIO()
+        df.to_csv(stream, index=False, sep=";")
+        return len(stream.getvalue().encode("utf-8"))
+
+    def csv_actual(db):
+        return sum(len(b) for b in services.generar_csv_turnos_cancelados(
+            crud.iterar_en_lotes(crud.query_turnos_cancelados(db))
+        ))
+
+    def pico_memoria_mb(funcion):
+        tracemalloc.start()
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return pico / 1024 / 1024
+
+    _, SessionLocal = crear_base_temporal()
+    for dias in (365, 365 * 4):
+        db = SessionLocal()
+        try:
+            db.query(models.Turno).delete()
+            db.query(models.Persona).delete()
+            total = poblar(db, personas=500, dias=dias)
+            print(f"{YELLOW}> {total} turnos{RESET}")
+            assert csv_anterior(db) == csv_actual(db)
+
+            anterior = medir(lambda: csv_anterior(db), max(1, repeticiones // 10))
+            actual = medir(lambda: csv_actual(db), max(1, repeticiones // 10))
+            reportar("tiempo", anterior, actual)
+            db.expunge_all()
+            print(f"  {'pico de memoria':<40} anterior: {pico_memoria_mb(lambda: csv_anterior(db)):9.1f} MB"
+                  f" | actual: {pico_memoria_mb(lambda: csv_actual(db)):9.1f} MB")
+        finally:
+            db.close()
+
+
+def bench_lote(repeticiones: int):
+    """Alta de 500 turnos: POST /turnos uno por uno vs POST /turnos/lote"""
+    import crud
+    import schemas
+    import services
+
+    def lote(desde_dia: int):
+        # Horarios libres: fechas futuras que poblar() no usa
+        inicio = date.today() + timedelta(days=desde_dia)
+        return [
+            schemas.TurnoCreateConDNI(
+                fecha=inicio + timedelta(days=i // len(settings.HORARIOS_VALIDOS)),
+                hora=settings.HORARIOS_VALIDOS[i % len(settings.HORARIOS_VALIDOS)],
+                dni=f"{i % 2000 + 1:08d}",
+            )
+            for i in range(500)
+        ]
+
+    def uno_por_uno(db, turnos):
+        # Lo que hace POST /turnos por cada turno
+        for turno in turnos:
+            persona = crud.get_persona_por_dni(db, turno.dni)
+            if persona and persona.habilitado and services.puede_sacar_turno(db, persona.id):
+                crud.create_turno(db, schemas.TurnoCreate(
+                    fecha=turno.fecha, hora=turno.hora, estado=turno.estado, persona_id=persona.id
+                ))
+
+    _, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        total = poblar(db, personas=2000, dias=365)
+        print(f"{YELLOW}> {total} turnos; lotes de 500{RESET}")
+        rondas = max(1, repeticiones // 10)
+        desplazamientos = iter(range(10, 10_000, 40))
+        anterior = medir(lambda: uno_por_uno(db, lote(next(desplazamientos))), rondas)
+        actual = medir(lambda: services.crear_turnos_lote(db, lote(next(desplazamientos))), rondas)
+        reportar("500 turnos", anterior, actual)
+    finally:
+        db.close()
+
+
+def bench_importacion(repeticiones: int):
+    """Alta de personas: POST /personas uno por uno vs importar_personas por bloques"""
+    import csv
+    import tracemalloc
+    import crud
+    import schemas
+    from importar_personas import importar_personas
+
+    def escribir_csv(ruta, desde, cantidad):
+        with open(ruta, "w", newline="", encoding="utf-8") as archivo:
+            writer = csv.writer(archivo)
+            writer.writerow(["nombre", "email", "dni", "telefono", "fecha_nacimiento", "habilitado"])
+            for i in range(desde, desde + cantidad):
+                writer.writerow([f"Persona {i}", f"persona{i}@email.com", f"{i:08d}", "", "1990-01-01", "si"])
+
+    def uno_por_uno(db, ruta):
+        # Lo que hace POST /personas por cada fila
+        with open(ruta, newline="", encoding="utf-8") as archivo:
+            for fila in csv.DictReader(archivo):
+                persona = schemas.PersonaCreate(
+                    nombre=fila["nombre"], email=fila["email"], dni=fila["dni"],
+                    fecha_nacimiento=fila["fecha_nacimiento"]
+                )
+                if db.query(models.Persona).filter(models.Persona.email == persona.email).first():
+                    continue
+                if db.query(models.Persona).filter(models.Persona.dni == persona.dni).first():
+                    continue
+                crud.create_persona(db, persona)
+
+    def importar(db, ruta):
+        with open(ruta, newline="", encoding="utf-8") as archivo:
+            return importar_personas(db, archivo)
+
+    directorio = tempfile.mkdtemp(prefix="bench_importacion_")
+    _, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        cantidad = 2000
+        escribir_csv(os.path.join(directorio, "a.csv"), 1, cantidad)
+        escribir_csv(os.path.join(directorio, "b.csv"), cantidad + 1, cantidad)
+        anterior = medir(lambda: uno_por_uno(db, os.path.join(directorio, "a.csv")), 1)
+        actual = medir(lambda: importar(db, os.path.join(directorio, "b.csv")), 1)
+        reportar(f"{cantidad} personas", anterior, actual)
+
+        grande = 100_000
+        ruta = os.path.join(directorio, "grande.csv")
+        escribir_csv(ruta, 2 * cantidad + 1, grande)
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        resumen = importar(db, ruta)
+        segundos = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert resumen["importadas"] == grande
+        print(f"  {f'{grande} personas':<40} {segundos:.1f} s | pico de memoria: {pico / 1024 / 1024:.1f} MB")
+    finally:
+        db.close()
+
+
+# Presupuesto documentado para un PDF de 10.000 filas (ver README)
+PRESUPUESTO_PDF_10K_SEGUNDOS = 10
+
+
+def bench_pdf(repeticiones: int):
+    """PDF de turnos por fecha: tabla borb con un Paragraph por celda vs ReportePDF por páginas"""
+    import io
+    from decimal import Decimal
+    from types import SimpleNamespace
+    from borb.pdf import Document, Page, SingleColumnLayout, Paragraph, PDF
+    from borb.pdf import FixedColumnWidthTable, TableCell
+    import services
+    import pdf_reportes
+    from artefactos import AlmacenArtefactos
+
+    # Se mide el armado: sin almacén de artefactos (ver bench_artefactos)
+    pdf_reportes.almacen_artefactos = AlmacenArtefactos(tempfile.mkdtemp(prefix="bench_artefactos_"), 0)
+
+    def pdf_anterior(filas):
+        # Implementación original: una sola página, una celda borb por valor
+        documento = Document()
+        pagina = Page()
+        documento.add_page(pagina)
+        layout = SingleColumnLayout(pagina)
+        layout.add(Paragraph("Reporte de turnos del día", font_size=Decimal(14)))
+        table = FixedColumnWidthTable(number_of_rows=len(filas) + 1, number_of_columns=5)
+        for encabezado in ["ID", "Hora", "Estado", "Nombre", "DNI"]:
+            table.add(TableCell(Paragraph(encabezado, font="Helvetica-Bold")))
+        for turno in filas:
+            for valor in (turno.Turno.id, turno.Turno.hora, turno.Turno.estado, turno.nombre, turno.dni):
+                table.add(TableCell(Paragraph(str(valor))))
+        layout.add(table)
+        buffer = io.BytesIO()
+        PDF.dumps(buffer, documento)
+        return buffer
+
+    def filas_sinteticas(cantidad):
+        return [
+            SimpleNamespace(
+                Turno=SimpleNamespace(id=i, hora=settings.HORARIOS_VALIDOS[i % len(settings.HORARIOS_VALIDOS)], estado="pendiente"),
+                nombre=f"Persona {i}",
+                dni=f"{i:08d}",
+            )
+            for i in range(cantidad)
+        ]
+
+    # El PDF anterior solo entra en una página con pocas filas (y tarda ~20 ms por fila)
+    chicas = filas_sinteticas(20)
+    anterior = medir(lambda: pdf_anterior(chicas), 1)
+    actual = medir(lambda: services.generar_pdf_turnos_fecha(chicas, date.today()), max(1, repeticiones // 10))
+    reportar("PDF de 20 filas", anterior, actual)
+
+    grandes = filas_sinteticas(10000)
+    segundos = medir(lambda: services.generar_pdf_turnos_fecha(grandes, date.today()), 1) / 1000
+    color = GREEN if segundos <= PRESUPUESTO_PDF_10K_SEGUNDOS else YELLOW
+    print(f"  {'PDF de 10.000 filas':<40} {color}{segundos:.2f} s{RESET} (presupuesto: {PRESUPUESTO_PDF_10K_SEGUNDOS} s)")
+
+
+def bench_artefactos(repeticiones: int):
+    """PDF de turnos por fecha: armado con borb vs lectura del almacén de artefactos"""
+    from types import SimpleNamespace
+    import services
+    import pdf_reportes
+    from artefactos import AlmacenArtefactos
+
+    filas = [
+        SimpleNamespace(
+            Turno=SimpleNamespace(id=i, hora=settings.HORARIOS_VALIDOS[i % len(settings.HORARIOS_VALIDOS)], estado="pendiente"),
+            nombre=f"Persona {i}",
+            dni=f"{i:08d}",
+        )
+        for i in range(5000)
+    ]
+    directorio = tempfile.mkdtemp(prefix="bench_artefactos_")
+
+    pdf_reportes.almacen_artefactos = AlmacenArtefactos(directorio, 0)
+    anterior = medir(lambda: services.generar_pdf_turnos_fecha(filas, date.today()), 1)
+    esperado = services.generar_pdf_turnos_fecha(filas, date.today()).getvalue()
+
+    pdf_reportes.almacen_artefactos = AlmacenArtefactos(directorio, 50 * 1024 * 1024)
+    services.generar_pdf_turnos_fecha(filas, date.today())
+    actual = medir(lambda: services.generar_pdf_turnos_fecha(filas, date.today()), max(1, repeticiones // 10))
+    print(f"{YELLOW}> PDF de {len(filas)} filas, {len(esperado) // 1024} KB{RESET}")
+    reportar("armado vs almacén", anterior, actual)
+
+
+def bench_concurrencia(repeticiones: int):
+    """GET por id y disponibilidad con 200 clientes concurrentes: handlers sync (threadpool) vs /async"""
+    import asyncio
+    import httpx
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    import main
+    from database import get_db_lectura, get_async_db_lectura, crear_engine_lectura, crear_async_engine_lectura
+    from ocupacion import indice_ocupacion
+
+    base, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        total = poblar(db, personas=2000, dias=365)
+    finally:
+        db.close()
+    base.dispose()
+    indice_ocupacion.limpiar()
+
+    engine = crear_engine_lectura(base.url)
+    SessionLectura = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = crear_async_engine_lectura(base.url)
+    AsyncSessionLectura = async_sessionmaker(async_engine, autoflush=False)
+
+    def get_db_lectura_temporal():
+        db = SessionLectura()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db_lectura_temporal():
+        async with AsyncSessionLectura() as db:
+            yield db
+
+    concurrencia = 200
+    pedidos = max(2000, repeticiones * 40)
+    rnd = random.Random(2)
+    hoy = date.today()
+    urls = [
+        rnd.choice((
+            f"/turnos/{rnd.randint(1, total)}",
+            f"/personas/{rnd.randint(1, 2000)}",
+            f"/turnos-disponibles?fecha={hoy - timedelta(days=rnd.randint(0, 364))}",
+        ))
+        for _ in range(pedidos)
+    ]
+
+    async def correr(prefijo: str) -> float:
+        limite = asyncio.Semaphore(concurrencia)
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            async def pedir(url):
+                async with limite:
+                    respuesta = await cliente.get(prefijo + url)
+                    assert respuesta.status_code == 200, respuesta.text
+            inicio = time.perf_counter()
+            await asyncio.gather(*(pedir(url) for url in urls))
+            return time.perf_counter() - inicio
+
+    main.app.dependency_overrides[get_db_lectura] = get_db_lectura_temporal
+    main.app.dependency_overrides[get_async_db_lectura] = get_async_db_lectura_temporal
+    try:
+        print(f"{YELLOW}> {total} turnos; {pedidos} pedidos con {concurrencia} concurrentes{RESET}")
+        asyncio.run(correr(""))  # calienta el índice de ocupación y las conexiones
+        anterior = asyncio.run(correr(""))
+        actual = asyncio.run(correr("/async"))
+        print(f"  {'pedidos por segundo':<40} anterior: {pedidos / anterior:9.0f}    | actual: {pedidos / actual:9.0f}")
+        reportar(f"{pedidos} pedidos (tiempo total)", anterior * 1000, actual * 1000)
+    finally:
+        main.app.dependency_overrides.clear()
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+
+def bench_mixta(repeticiones: int):
+    """Reportes y altas de turnos en paralelo: un engine por defecto vs escritor único + pool de lectura con WAL"""
+    import itertools
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy.exc import OperationalError
+    import crud
+    import schemas
+    import services
+    from database import crear_engine_escritura, crear_engine_lectura
+
+    lectores, escritores, segundos = 6, 4, 5
+    hoy = date.today()
+    horarios = itertools.count()
+
+    def correr(SesionEscritura, SesionLectura):
+        fin = time.perf_counter() + segundos
+        cuentas = {"lecturas": 0, "escrituras": 0, "bloqueos": 0}
+        lock = threading.Lock()
+
+        def sumar(clave):
+            with lock:
+                cuentas[clave] += 1
+
+        def leer():
+            while time.perf_counter() < fin:
+                db = SesionLectura()
+                try:
+                    services.obtener_turnos_confirmados_periodos(db, hoy - timedelta(days=365), hoy)
+                    sumar("lecturas")
+                finally:
+                    db.close()
+
+        def escribir():
+            while time.perf_counter() < fin:
+                n = next(horarios)
+                db = SesionEscritura()
+                try:
+                    crud.create_turno(db, schemas.TurnoCreate(
+                        fecha=hoy + timedelta(days=1 + n // len(settings.HORARIOS_VALIDOS)),
+                        hora=settings.HORARIOS_VALIDOS[n % len(settings.HORARIOS_VALIDOS)],
+                        persona_id=n % 2000 + 1,
+                    ))
+                    sumar("escrituras")
+                except OperationalError:
+                    # "database is locked"
+                    db.rollback()
+                    sumar("bloqueos")
+                finally:
+                    db.close()
+
+        with ThreadPoolExecutor(lectores + escritores) as pool:
+            tareas = [pool.submit(leer) for _ in range(lectores)] + [pool.submit(escribir) for _ in range(escritores)]
+            for tarea in tareas:
+                tarea.result()
+        return cuentas
+
+    base, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        total = poblar(db, personas=2000, dias=3650)
+    finally:
+        db.close()
+    base.dispose()
+    print(f"{YELLOW}> {total} turnos; {lectores} hilos de reportes y {escritores} de altas durante {segundos} s{RESET}")
+
+    # Antes: un solo engine con la configuración por defecto para lecturas y escrituras
+    engine = create_engine(base.url, connect_args={"check_same_thread": False})
+    with engine.connect() as conexion:
+        conexion.exec_driver_sql("PRAGMA journal_mode=DELETE")
+    Sesion = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    anterior = correr(Sesion, Sesion)
+    engine.dispose()
+
+    escritura, lectura = crear_engine_escritura(base.url), crear_engine_lectura(base.url)
+    actual = correr(
+        sessionmaker(autocommit=False, autoflush=False, bind=escritura, expire_on_commit=False),
+        sessionmaker(autocommit=False, autoflush=False, bind=lectura),
+    )
+    escritura.dispose()
+    lectura.dispose()
+
+    for clave in ("lecturas", "escrituras", "bloqueos"):
+        print(f"  {clave + ' por segundo':<40} anterior: {anterior[clave] / segundos:9.1f}    | actual: {actual[clave] / segundos:9.1f}")
+
+
+def bench_reserva(repeticiones: int):
+    """Muchas reservas simultáneas del mismo horario: consulta previa + INSERT vs índice único parcial (verificado en tests/test_reserva.py)"""
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    import httpx
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    import crud
+    import main
+    import schemas
+    from database import configurar_sqlite, get_db, get_async_db
+
+    hilos = 50
+    rondas = max(1, repeticiones // 10)
+    hoy = date.today()
+
+    def motor(url):
+        # Una conexión por hilo para que compitan en la base y no en el pool
+        engine = create_engine(url, connect_args={"check_same_thread": False}, max_overflow=-1)
+        configurar_sqlite(engine)
+        return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+    def consulta_previa(db, turno):
+        # Lo que haría crear_turno verificando antes de insertar
+        if crud.get_horarios_ocupados(db, [turno.fecha]) & {(turno.fecha, turno.hora)}:
+            raise crud.HorarioOcupado(crud.mensaje_horario_ocupado(turno.fecha, turno.hora))
+        crud.create_turno(db, turno)
+
+    def reservar_en_paralelo(Sesion, crear, ronda):
+        turno = schemas.TurnoCreate(fecha=hoy + timedelta(days=ronda + 1), hora=settings.HORARIOS_VALIDOS[0], persona_id=1)
+        largada = threading.Barrier(hilos)
+
+        def reservar(_):
+            db = Sesion()
+            try:
+                largada.wait()
+                crear(db, turno)
+                return True
+            except crud.HorarioOcupado:
+                return False
+            finally:
+                db.close()
+
+        with ThreadPoolExecutor(hilos) as pool:
+            return sum(pool.map(reservar, range(hilos)))
+
+    base, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        poblar(db, personas=hilos * 2, dias=1)
+    finally:
+        db.close()
+    print(f"{YELLOW}> {hilos} reservas simultáneas del mismo horario, {rondas} rondas{RESET}")
+
+    indice = next(i for i in models.Turno.__table__.indexes if i.name == "ux_turnos_horario_activo")
+    engine, Sesion = motor(base.url)
+    with engine.begin() as conexion:
+        indice.drop(conexion)
+    sin_indice = [reservar_en_paralelo(Sesion, consulta_previa, ronda) for ronda in range(rondas)]
+    with engine.begin() as conexion:
+        conexion.execute(models.Turno.__table__.delete().where(models.Turno.fecha > hoy))
+        indice.create(conexion)
+    con_indice = [reservar_en_paralelo(Sesion, crud.create_turno, ronda) for ronda in range(rondas)]
+    engine.dispose()
+    print(f"  {'reservas aceptadas por horario':<40} anterior: {sum(sin_indice) / rondas:9.1f}    | actual: {sum(con_indice) / rondas:9.1f}")
+
+    # Lo mismo a través de la API, mezclando POST /turnos (sync) y POST /async/turnos
+    engine, Sesion = motor(base.url)
+    async_engine = create_async_engine(base.url.set(drivername="sqlite+aiosqlite"))
+    configurar_sqlite(async_engine.sync_engine)
+    AsyncSesion = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_db_temporal():
+        db = Sesion()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db_temporal():
+        async with AsyncSesion() as db:
+            yield db
+
+    async def reservar_api():
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            cuerpo = lambda i: {"fecha": str(hoy + timedelta(days=1000)), "hora": settings.HORARIOS_VALIDOS[0], "dni": f"{i + 1:08d}"}
+            respuestas = await asyncio.gather(*(
+                cliente.post("/async/turnos" if i % 2 else "/turnos", json=cuerpo(i)) for i in range(hilos * 2)
+            ))
+            return [r.status_code for r in respuestas]
+
+    main.app.dependency_overrides[get_db] = get_db_temporal
+    main.app.dependency_overrides[get_async_db] = get_async_db_temporal
+    try:
+        estados = asyncio.run(reservar_api())
+    finally:
+        main.app.dependency_overrides.clear()
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+    print(f"  {'API: respuestas por código':<40} {dict(sorted((c, estados.count(c)) for c in set(estados)))}")
+
+
+def turnos_cancelados_por_mes_anterior(db, anio, mes):
+    """Implementación original de crud.query_turnos_cancelados_por_mes"""
+    from sqlalchemy import func
+    return db.query(models.Turno).filter(
+        func.strftime("%Y", models.Turno.fecha) == str(anio),
+        func.strftime("%m", models.Turno.fecha) == f"{mes:02d}",
+        models.Turno.estado == settings.ESTADO_CANCELADO,
+    ).all()
+
+
+def bench_planes(repeticiones: int):
+    """Reportes por mes: strftime sin índices vs rango de fechas + índice (estado, fecha); los planes se verifican en tests/test_planes.py"""
+    import crud
+    from consultas_sql import planes_de_consultas
+
+    hoy = date.today()
+    engine, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        total = poblar(db, personas=2000, dias=3650)
+        print(f"{YELLOW}> {total} turnos en 3650 días{RESET}")
+
+        print(f"  {'cancelados por mes con strftime':<40} {planes_de_consultas(engine, lambda: turnos_cancelados_por_mes_anterior(db, hoy.year, hoy.month))[0]}")
+        print(f"  {'cancelados por mes con rango':<40} {planes_de_consultas(engine, lambda: crud.get_turnos_cancelados_por_mes(db, hoy.year, hoy.month))[0]}")
+        anterior = medir(lambda: turnos_cancelados_por_mes_anterior(db, hoy.year, hoy.month), repeticiones)
+        actual = medir(lambda: crud.get_turnos_cancelados_por_mes(db, hoy.year, hoy.month), repeticiones)
+        reportar("cancelados por mes", anterior, actual)
+        anterior = medir(lambda: turnos_cancelados_por_mes_anterior(db, hoy.year - 5, 6), repeticiones)
+        actual = medir(lambda: crud.get_turnos_cancelados_por_mes(db, hoy.year - 5, 6), repeticiones)
+        reportar("cancelados por mes (hace 5 años)", anterior, actual)
+    finally:
+        db.close()
+
+
+def bench_serializacion(repeticiones: int):
+    """GET /turnos y GET /personas (1000 filas): modelos campo por campo + response_model vs TypeAdapter + pydantic-core"""
+    import json
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    import crud
+    import schemas
+    import services
+    import respuesta_json
+
+    _, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        total = poblar(db, personas=2000, dias=365)
+        print(f"{YELLOW}> {total} turnos; páginas de 1000 filas{RESET}")
+        limite = 1000
+
+        def por_response_model(tipo, modelos) -> bytes:
+            # Lo que hace FastAPI con lo que devuelve un endpoint con response_model:
+            # model_dump, validar otra vez, serializar a tipos JSON y json.dumps
+            adaptador = TypeAdapter(tipo)
+            contenido = [m.model_dump() for m in modelos]
+            validado = adaptador.validate_python(contenido)
+            return json.dumps(
+                jsonable_encoder(adaptador.dump_python(validado, mode="json")),
+                ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8")
+
+        def turnos_anterior() -> bytes:
+            modelos = [
+                schemas.TurnoOut(
+                    id=t.id, fecha=t.fecha, hora=t.hora, estado=t.estado,
+                    persona_id=t.persona_id, dni=t.persona.dni
+                )
+                for t in crud.get_turnos(db, limit=limite)
+            ]
+            return por_response_model(List[schemas.TurnoOut], modelos)
+
+        def turnos_actual() -> bytes:
+            filas = crud.get_turnos_filas(db, limit=limite)
+            return respuesta_json.lista_json(respuesta_json.TURNOS_OUT, filas).body
+
+        def personas_anterior() -> bytes:
+            modelos = [
+                schemas.PersonaOut(
+                    id=p.id, nombre=p.nombre, email=p.email, dni=p.dni, telefono=p.telefono,
+                    fecha_nacimiento=p.fecha_nacimiento, habilitado=p.habilitado,
+                    edad=services.calcular_edad(p.fecha_nacimiento)
+                )
+                for p in crud.get_personas(db, limit=limite)
+            ]
+            return por_response_model(List[schemas.PersonaOut], modelos)
+
+        def personas_actual() -> bytes:
+            filas = [
+                {**p._mapping, "edad": services.calcular_edad(p.fecha_nacimiento)}
+                for p in crud.get_personas_filas(db, limit=limite)
+            ]
+            return respuesta_json.lista_json(respuesta_json.PERSONAS_OUT, filas).body
+
+        assert json.loads(turnos_anterior()) == json.loads(turnos_actual())
+        assert json.loads(personas_anterior()) == json.loads(personas_actual())
+
+        # Cada medición arranca sin objetos en la sesión, como un pedido nuevo
+        def en_sesion_limpia(funcion):
+            def medida():
+                db.expunge_all()
+                return funcion()
+            return medida
+
+        reportar("GET /turnos (1000 filas)",
+                 medir(en_sesion_limpia(turnos_anterior), repeticiones), medir(en_sesion_limpia(turnos_actual), repeticiones))
+        reportar("GET /personas (1000 filas)",
+                 medir(en_sesion_limpia(personas_anterior), repeticiones), medir(en_sesion_limpia(personas_actual), repeticiones))
+
+        reporte = {"resultados": [
+            {"id": i, "fecha": date.today(), "hora": "10:00", "estado": "pendiente",
+             "persona": {"id": i, "nombre": f"Persona {i}", "dni": f"{i:08d}", "email": f"p{i}@email.com"}}
+            for i in range(5000)
+        ]}
+        anterior = medir(lambda: json.dumps(jsonable_encoder(reporte), ensure_ascii=False, separators=(",", ":")), repeticiones)
+        actual = medir(lambda: respuesta_json.RespuestaJSON(reporte).body, repeticiones)
+        reportar("reporte JSON (5000 filas)", anterior, actual)
+    finally:
+        db.close()
+
+
+def bench_horarios(repeticiones: int):
+    """turnos.hora como minutos (SMALLINT) vs texto "HH:MM": tamaño del índice (fecha, hora) y validación"""
+    engine, SessionLocal = crear_base_temporal()
+    db = SessionLocal()
+    try:
+        total = poblar(db, personas=2000, dias=3650)
+    finally:
+        db.close()
+    print(f"{YELLOW}> {total} turnos en 10 años{RESET}")
+
+    with engine.begin() as conexion:
+        # La misma tabla con la hora como texto, como estaba antes de la migración
+        conexion.exec_driver_sql(
+            "CREATE TABLE turnos_texto AS SELECT id, fecha, printf('%02d:%02d', hora / 60, hora % 60) AS hora, "
+            "estado, persona_id FROM turnos"
+        )
+        conexion.exec_driver_sql(
+            "CREATE UNIQUE INDEX ux_texto ON turnos_texto (fecha, hora) WHERE estado != 'cancelado'"
+        )
+        conexion.exec_driver_sql("CREATE UNIQUE INDEX ux_entero ON turnos (fecha, hora) WHERE estado != 'cancelado'")
+        tamanios = dict(conexion.exec_driver_sql(
+            "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ('ux_texto', 'ux_entero', 'turnos', 'turnos_texto') GROUP BY name"
+        ).all())
+    for nombre, anterior, actual in (("índice (fecha, hora)", "ux_texto", "ux_entero"), ("tabla turnos", "turnos_texto", "turnos")):
+        print(f"  {nombre + ' (KiB)':<40} anterior: {tamanios[anterior] / 1024:9.0f}    | actual: {tamanios[actual] / 1024:9.0f}")
+    engine.dispose()
+
+    horas = list(settings.HORARIOS_VALIDOS) * 100 + ["25:00"] * 100
+    anterior = medir(lambda: [h in settings.HORARIOS_VALIDOS for h in horas], repeticiones)
+    actual = medir(lambda: [h in settings.INDICE_HORARIO for h in horas], repeticiones)
+    reportar(f"validar {len(horas)} horas", anterior, actual)
+
+
+ESCENARIOS = {
+    "disponibilidad": bench_disponibilidad,
+    "calendario": bench_calendario,
+    "habilitacion": bench_habilitacion,
+    "csv": bench_csv,
+    "pdf": bench_pdf,
+    "artefactos": bench_artefactos,
+    "lote": bench_lote,
+    "importacion": bench_importacion,
+    "concurrencia": bench_concurrencia,
+    "mixta": bench_mixta,
+    "reserva": bench_reserva,
+    "planes": bench_planes,
+    "serializacion": bench_serializacion,
+    "horarios": bench_horarios,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la API de turnos")
+    parser.add_argument("escenarios", nargs="*", help=f"Escenarios a correr: {', '.join(ESCENARIOS)}")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    desconocidos = [e for e in args.escenarios if e not in ESCENARIOS]
+    if desconocidos:
+        parser.error(f"Escenarios desconocidos: {desconocidos}")
+
+    for nombre in args.escenarios or ESCENARIOS:
+        print(f"\n{CYAN}--- {nombre} ---{RESET}")
+        ESCENARIOS[nombre](args.repeticiones)
+
+
+if __name__ == "__main__":
+    main()
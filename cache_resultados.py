@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+from config import settings
+
+
+class VersionDatos:
+    """
+    Contador que crud incrementa con cada escritura confirmada (personas o turnos).
+    Todo lo que se calcula a partir de los datos puede guardarse junto con la versión
+    leída antes de calcular: si la versión cambió, el resultado ya no es válido.
+    Como el índice de ocupación, solo ve las escrituras hechas por este proceso.
+    """
+
+    def __init__(self):
+        self._valor = 0
+        self._lock = threading.Lock()
+
+    def actual(self) -> int:
+        with self._lock:
+            return self._valor
+
+    def incrementar(self):
+        with self._lock:
+            self._valor += 1
+
+
+version_datos = VersionDatos()
+
+
+class CacheResultados:
+    """
+    Cache LRU en memoria de resultados de endpoints de reportes JSON.
+
+    La clave es (endpoint, parámetros normalizados) y cada entrada guarda la versión
+    de los datos con la que se calculó. Una entrada de una versión anterior cuenta
+    como miss y se descarta. Con max_entradas entradas, agregar otra descarta la
+    usada hace más tiempo.
+    """
+
+    def __init__(self, max_entradas: int):
+        self._max_entradas = max_entradas
+        self._entradas: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidaciones = 0
+
+    @staticmethod
+    def _clave(endpoint: str, parametros: dict) -> Hashable:
+        return endpoint, tuple(sorted(parametros.items()))
+
+    def obtener_o_calcular(self, endpoint: str, parametros: dict, calcular: Callable[[], Any]) -> Any:
+        """Devuelve el resultado guardado si es de la versión actual; si no, llama a calcular()"""
+        clave = self._clave(endpoint, parametros)
+        version = version_datos.actual()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == version:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return entrada[1]
+            if entrada is not None:
+                del self._entradas[clave]
+                self.invalidaciones += 1
+            self.misses += 1
+
+        # Se calcula fuera del lock; si hubo una escritura mientras tanto, la entrada
+        # queda con la versión vieja y el próximo pedido la descarta
+        resultado = calcular()
+
+        if self._max_entradas <= 0:
+            return resultado
+        with self._lock:
+            self._entradas[clave] = (version, resultado)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self._max_entradas:
+                self._entradas.popitem(last=False)
+                self.evictions += 1
+        return resultado
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self._max_entradas,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidaciones": self.invalidaciones,
+                "version_datos": version_datos.actual(),
+            }
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_reportes = CacheResultados(settings.REPORTES_CACHE_MAX_ENTRADAS)
@@ -0,0 +1,306 @@
+"""
+Prueba de carga de la API dentro del mismo proceso.
+
+Levanta main.app sobre una base SQLite temporal llenada con populate_db.generar_masivo
+y la recorre con clientes concurrentes (httpx.ASGITransport, sin red de por medio)
+durante un tiempo fijo. Cada cliente elige la próxima operación según los pesos de la
+mezcla. Al final informa, por ruta, pedidos por segundo y latencias p50/p95/p99, y
+guarda el resultado en JSON para comparar corridas entre commits.
+
+Uso:
+    python carga.py                                   # mezcla por defecto, 20 s, 50 clientes
+    python carga.py --segundos 60 --concurrencia 200 --salida actual.json
+    python carga.py --mezcla reserva=5,disponibilidad=10 --comparar anterior.json
+
+Las respuestas 4xx esperables (horario ocupado, turno ya cancelado) cuentan como
+pedidos normales; solo los 5xx y las excepciones cuentan como errores.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# --- CONFIGURACIÓN VISUAL ---
+GREEN = "\033[92m"
+CYAN = "\033[96m"
+YELLOW = "\033[93m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+# Operaciones disponibles: nombre -> (método, ruta tal como está declarada en la API)
+OPERACIONES = {
+    "reserva": ("POST", "/turnos"),
+    "disponibilidad": ("GET", "/turnos-disponibles"),
+    "calendario": ("GET", "/turnos-disponibles/calendario"),
+    "cancelar": ("PUT", "/turnos/{turno_id}/cancelar"),
+    "confirmar": ("PUT", "/turnos/{turno_id}/confirmar"),
+    "reporte_fecha": ("GET", "/reportes/turnos-por-fecha"),
+    "reporte_cancelados": ("GET", "/reportes/turnos-cancelados-por-mes"),
+    "csv": ("GET", "/reportes/csv/turnos-cancelados-por-mes"),
+    "pdf": ("GET", "/reportes/pdf/turnos-por-fecha"),
+}
+
+MEZCLA_POR_DEFECTO = {
+    "reserva": 3,
+    "disponibilidad": 10,
+    "calendario": 1,
+    "cancelar": 1,
+    "confirmar": 1,
+    "reporte_fecha": 2,
+    "reporte_cancelados": 1,
+    "csv": 1,
+    "pdf": 1,
+}
+
+
+class Pedidos:
+    """Arma los pedidos de cada operación con datos que existen en la base generada"""
+
+    def __init__(self, referencia: date, desde: date, dnis: list, ids_activos: list):
+        self.referencia = referencia
+        self.desde = desde
+        self.dnis = dnis
+        self.ids_activos = ids_activos
+
+    def _fecha_pasada(self, rnd: random.Random) -> date:
+        dias = max((self.referencia - self.desde).days, 1)
+        return self.referencia - timedelta(days=rnd.randint(0, min(dias, 365)))
+
+    def _mes_pasado(self, rnd: random.Random) -> str:
+        fecha = self._fecha_pasada(rnd)
+        return f"mes={fecha.month}&anio={max(fecha.year, 2022)}"
+
+    def armar(self, operacion: str, rnd: random.Random):
+        """Devuelve (url, cuerpo JSON o None)"""
+        from config import settings
+
+        if operacion == "reserva":
+            # Hasta un año adelante: los primeros días ya están casi llenos y devuelven 409
+            fecha = self.referencia + timedelta(days=rnd.randint(1, 365))
+            return "/turnos", {
+                "fecha": fecha.isoformat(),
+                "hora": rnd.choice(settings.HORARIOS_VALIDOS),
+                "estado": settings.ESTADO_PENDIENTE,
+                "dni": rnd.choice(self.dnis),
+            }
+        if operacion == "disponibilidad":
+            fecha = self.referencia + timedelta(days=rnd.randint(-30, 60))
+            return f"/turnos-disponibles?fecha={fecha}", None
+        if operacion == "calendario":
+            desde = self.referencia + timedelta(days=rnd.randint(0, 30))
+            return f"/turnos-disponibles/calendario?desde={desde}&hasta={desde + timedelta(days=29)}", None
+        if operacion in ("cancelar", "confirmar"):
+            return f"/turnos/{rnd.choice(self.ids_activos)}/{operacion}", None
+        if operacion == "reporte_fecha":
+            return f"/reportes/turnos-por-fecha?fecha={self._fecha_pasada(rnd)}", None
+        if operacion == "reporte_cancelados":
+            return f"/reportes/turnos-cancelados-por-mes?{self._mes_pasado(rnd)}", None
+        if operacion == "csv":
+            return f"/reportes/csv/turnos-cancelados-por-mes?{self._mes_pasado(rnd)}", None
+        if operacion == "pdf":
+            return f"/reportes/pdf/turnos-por-fecha?fecha={self._fecha_pasada(rnd)}", None
+        raise ValueError(f"Operación desconocida: {operacion}")
+
+
+def leer_mezcla(texto: str) -> dict:
+    """'reserva=3,disponibilidad=10' -> {'reserva': 3, 'disponibilidad': 10}"""
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in OPERACIONES:
+            raise argparse.ArgumentTypeError(f"Operación desconocida: {nombre} (disponibles: {', '.join(OPERACIONES)})")
+        try:
+            mezcla[nombre] = float(peso)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Peso inválido para {nombre}: {peso!r}")
+        if mezcla[nombre] < 0:
+            raise argparse.ArgumentTypeError(f"Peso inválido para {nombre}: {peso!r}")
+    if not any(mezcla.values()):
+        raise argparse.ArgumentTypeError("La mezcla necesita al menos una operación con peso mayor a 0")
+    return mezcla
+
+
+def percentil(ordenadas: list, q: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    return ordenadas[max(math.ceil(q * len(ordenadas)) - 1, 0)]
+
+
+def resumir(muestras: list, segundos: float) -> dict:
+    """muestras: lista de (latencia en segundos, código de estado o None si hubo excepción)"""
+    latencias = sorted(latencia for latencia, _ in muestras)
+    estados = {}
+    for _, estado in muestras:
+        clave = str(estado) if estado is not None else "excepcion"
+        estados[clave] = estados.get(clave, 0) + 1
+    resumen = {
+        "pedidos": len(muestras),
+        "errores": sum(1 for _, estado in muestras if estado is None or estado >= 500),
+        "estados": dict(sorted(estados.items())),
+        "pedidos_por_segundo": round(len(muestras) / segundos, 2),
+    }
+    if latencias:
+        resumen.update({
+            "p50_ms": round(percentil(latencias, 0.50) * 1000, 3),
+            "p95_ms": round(percentil(latencias, 0.95) * 1000, 3),
+            "p99_ms": round(percentil(latencias, 0.99) * 1000, 3),
+            "max_ms": round(latencias[-1] * 1000, 3),
+        })
+    return resumen
+
+
+async def correr(app, pedidos: Pedidos, mezcla: dict, concurrencia: int, segundos: float, seed: int) -> dict:
+    """Corre la mezcla durante `segundos` y devuelve las muestras por operación"""
+    import httpx
+
+    nombres = [nombre for nombre, peso in mezcla.items() if peso > 0]
+    acumulados, total = [], 0.0
+    for nombre in nombres:
+        total += mezcla[nombre]
+        acumulados.append(total)
+    muestras = {nombre: [] for nombre in nombres}
+    fin = time.perf_counter() + segundos
+
+    async def cliente(http, rnd):
+        while time.perf_counter() < fin:
+            operacion = rnd.choices(nombres, cum_weights=acumulados)[0]
+            url, cuerpo = pedidos.armar(operacion, rnd)
+            inicio = time.perf_counter()
+            try:
+                respuesta = await http.request(OPERACIONES[operacion][0], url, json=cuerpo)
+                estado = respuesta.status_code
+            except Exception:
+                estado = None
+            muestras[operacion].append((time.perf_counter() - inicio, estado))
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://carga", timeout=None) as http:
+        await asyncio.gather(*(cliente(http, random.Random(seed * 1000 + i)) for i in range(concurrencia)))
+    return muestras
+
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def preparar_base(personas: int, turnos: int, seed: int, referencia: date) -> Pedidos:
+    """Llena la base de DATABASE_URL (ya apuntada al directorio temporal) y junta los datos de los pedidos"""
+    from sqlalchemy import select
+    import models
+    import populate_db
+    from config import settings
+    from database import engine
+
+    populate_db.init_db()
+    resumen = populate_db.generar_masivo(engine, personas, turnos, seed, referencia)
+    with engine.connect() as conexion:
+        dnis = conexion.execute(
+            select(models.Persona.dni).where(models.Persona.habilitado.is_(True))
+        ).scalars().all()
+        ids_activos = conexion.execute(
+            select(models.Turno.id).where(
+                models.Turno.fecha >= referencia,
+                models.Turno.estado.in_([settings.ESTADO_PENDIENTE, settings.ESTADO_CONFIRMADO]),
+            )
+        ).scalars().all()
+    if not ids_activos:
+        raise ValueError("La base generada no tiene turnos futuros: aumentar --turnos")
+    return Pedidos(referencia, resumen["desde"], list(dnis), list(ids_activos))
+
+
+def imprimir(resultado: dict, anterior: dict = None):
+    rutas_anteriores = (anterior or {}).get("rutas", {})
+    print(f"\n  {'ruta':<52} {'pedidos/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    for ruta, datos in list(resultado["rutas"].items()) + [("TOTAL", resultado["total"])]:
+        color = RED if datos["errores"] else ""
+        print(f"  {ruta:<52} {datos['pedidos_por_segundo']:>10.1f} {datos.get('p50_ms', 0):>9.2f} "
+              f"{datos.get('p95_ms', 0):>9.2f} {datos.get('p99_ms', 0):>9.2f} {color}{datos['errores']:>8}{RESET}")
+        previo = rutas_anteriores.get(ruta) if ruta != "TOTAL" else (anterior or {}).get("total")
+        if previo and previo.get("p95_ms") and datos.get("p95_ms"):
+            print(f"  {'  anterior (' + str(anterior.get('commit')) + ')':<52} {previo['pedidos_por_segundo']:>10.1f} "
+                  f"{previo['p50_ms']:>9.2f} {previo['p95_ms']:>9.2f} {previo['p99_ms']:>9.2f} "
+                  f"{GREEN}x{previo['p95_ms'] / datos['p95_ms']:.1f} p95{RESET}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de turnos")
+    parser.add_argument("--segundos", type=float, default=20)
+    parser.add_argument("--calentamiento", type=float, default=2, help="Segundos que se corren antes de medir")
+    parser.add_argument("--concurrencia", type=int, default=50, help="Clientes simultáneos")
+    parser.add_argument("--mezcla", type=leer_mezcla, default=MEZCLA_POR_DEFECTO,
+                        help=f"Pesos por operación, ej. reserva=3,disponibilidad=10 ({', '.join(OPERACIONES)})")
+    parser.add_argument("--personas", type=int, default=5000)
+    parser.add_argument("--turnos", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--salida", help="Archivo JSON donde guardar el resultado")
+    parser.add_argument("--comparar", help="Resultado JSON de una corrida anterior")
+    args = parser.parse_args(argv)
+    if args.concurrencia < 1 or args.segundos <= 0:
+        parser.error("--concurrencia y --segundos tienen que ser positivos")
+
+    # La base y los PDF van a un directorio temporal: config lee estas variables al importarse
+    directorio = tempfile.mkdtemp(prefix="carga_turnos_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directorio, 'carga.db')}"
+    os.environ["ARTEFACTOS_DIRECTORIO"] = os.path.join(directorio, "artefactos")
+
+    referencia = date.today()
+    print(f"{CYAN}--- Generando {args.personas} personas y {args.turnos} turnos en {directorio} ---{RESET}")
+    pedidos = preparar_base(args.personas, args.turnos, args.seed, referencia)
+
+    import main as api
+
+    print(f"{YELLOW}> {args.concurrencia} clientes durante {args.segundos:g} s "
+          f"(+{args.calentamiento:g} s de calentamiento){RESET}")
+    if args.calentamiento > 0:
+        asyncio.run(correr(api.app, pedidos, args.mezcla, args.concurrencia, args.calentamiento, args.seed + 1))
+    inicio = time.perf_counter()
+    muestras = asyncio.run(correr(api.app, pedidos, args.mezcla, args.concurrencia, args.segundos, args.seed))
+    duracion = time.perf_counter() - inicio
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "configuracion": {
+            "segundos": round(duracion, 3),
+            "concurrencia": args.concurrencia,
+            "mezcla": args.mezcla,
+            "personas": args.personas,
+            "turnos": args.turnos,
+            "seed": args.seed,
+        },
+        "rutas": {
+            f"{OPERACIONES[nombre][0]} {OPERACIONES[nombre][1]}": resumir(lista, duracion)
+            for nombre, lista in muestras.items()
+        },
+        "total": resumir([m for lista in muestras.values() for m in lista], duracion),
+    }
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    imprimir(resultado, anterior)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"\n{GREEN}✅ Resultado guardado en {args.salida}{RESET}")
+
+    api.cola_reportes.cerrar()
+    return resultado
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,47 @@ class Config:
     INICIO = int(os.getenv("HORARIO_INICIO", 9))
     FIN = int(os.getenv("HORARIO_FIN", 17))
     INTERVALO = int(os.getenv("INTERVALO_MINUTOS", 30))
+
+    # Rango máximo (en días) que acepta GET /turnos-disponibles/calendario
+    MAX_DIAS_CALENDARIO = int(os.getenv("MAX_DIAS_CALENDARIO", 62))
+
+    # Base de datos y ajustes de SQLite que se aplican a cada conexión
+    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./turnos.db")
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", 256))
+    SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", 64))
+    # Conexiones de lectura que se mantienen abiertas (la escritura usa una sola)
+    DB_POOL_LECTURA = int(os.getenv("DB_POOL_LECTURA", 10))
+
+    # Headers X-DB-Queries / X-DB-Time-Ms por pedido y aviso cuando una misma consulta
+    # se repite más de SQL_N_MAS_1_UMBRAL veces en un pedido (posible N+1)
+    SQL_DEBUG = os.getenv("SQL_DEBUG", "0").lower() in ("1", "true", "si")
+    SQL_N_MAS_1_UMBRAL = int(os.getenv("SQL_N_MAS_1_UMBRAL", 10))
+
+    # Al migrar una base con horarios que tienen más de un turno activo, cancelar los
+    # más nuevos de cada horario en lugar de detenerse (ver migraciones._horario_unico)
+    MIGRACION_CANCELAR_DUPLICADOS = os.getenv("MIGRACION_CANCELAR_DUPLICADOS", "0").lower() in ("1", "true", "si")
+
+    # Años que aceptan los reportes por mes (endpoints GET y POST /reportes/jobs)
+    ANIO_REPORTES_MIN = 2022
+    ANIO_REPORTES_MAX = 2026
+
+    # Cantidad máxima de turnos por pedido en POST /turnos/lote
+    MAX_TURNOS_LOTE = int(os.getenv("MAX_TURNOS_LOTE", 1000))
+
+    # Cola de reportes asincrónicos (POST /reportes/jobs)
+    REPORTES_WORKERS = int(os.getenv("REPORTES_WORKERS", 2))
+    REPORTES_MAX_PENDIENTES = int(os.getenv("REPORTES_MAX_PENDIENTES", 20))
+    REPORTES_MAX_TERMINADOS = int(os.getenv("REPORTES_MAX_TERMINADOS", 50))
+
+    # Cache LRU de los reportes JSON (0 la desactiva)
+    REPORTES_CACHE_MAX_ENTRADAS = int(os.getenv("REPORTES_CACHE_MAX_ENTRADAS", 256))
+
+    # Reportes PDF ya generados, guardados en disco por hash de su contenido (0 lo desactiva)
+    ARTEFACTOS_DIRECTORIO = os.getenv("ARTEFACTOS_DIRECTORIO", "./artefactos")
+    ARTEFACTOS_MAX_MB = int(os.getenv("ARTEFACTOS_MAX_MB", 200))
     
     _estados_str = os.getenv("ESTADOS", "pendiente,confirmado,cancelado,asistido")
     ESTADOS_VALIDOS = [e.strip().lower() for e in _estados_str.split(",")]
@@ -25,5 +66,8 @@ class Config:
     while _hora_actual < _hora_fin:
         HORARIOS_VALIDOS.append(_hora_actual.strftime("%H:%M"))
         _hora_actual += timedelta(minutes=INTERVALO)
-        
+
+    # Posición de cada horario dentro del día: validar un horario es una búsqueda en un dict
+    INDICE_HORARIO = {hora: i for i, hora in enumerate(HORARIOS_VALIDOS)}
+
 settings = Config()
\ No newline at end of file
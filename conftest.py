@@ -0,0 +1,142 @@
+"""
+Configuración de los tests (pytest).
+
+Los tests corren contra una base SQLite temporal: las variables de entorno se fijan
+antes de importar config, así database.py arma sus engines sobre esa base y no sobre
+turnos.db. Los datos los genera populate_db.generar_masivo con un seed y una fecha de
+referencia fijos, así que son siempre los mismos.
+
+Fixtures:
+    cliente         -- pedidos HTTP a main.app (ClienteASGI)
+    presupuesto     -- presupuesto(n): falla si el bloque hace más de n consultas SQL
+    dni_habilitado  -- DNI de una persona que puede sacar turno
+    dnis_habilitados -- DNIs de todas las personas habilitadas
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+from datetime import date
+import pytest
+
+_DIRECTORIO = tempfile.mkdtemp(prefix="test_turnos_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIRECTORIO, 'turnos.db')}"
+os.environ["ARTEFACTOS_DIRECTORIO"] = os.path.join(_DIRECTORIO, "artefactos")
+# Sin cache de reportes: cada pedido hace sus consultas
+os.environ["REPORTES_CACHE_MAX_ENTRADAS"] = "0"
+
+# Datos generados: la persona 1 (DNI 20000001) es la que más turnos tiene
+REFERENCIA = date(2025, 6, 15)
+PERSONAS = 300
+TURNOS = 5000
+
+
+class ClienteASGI:
+    """
+    Cliente HTTP contra la app, sin servidor. Cada pedido corre como una tarea del
+    event loop del cliente en el hilo del test, y la tarea copia el contexto del test:
+    así presupuesto_consultas (contextvars) cuenta las consultas del endpoint, también
+    las de los handlers sync que AnyIO corre en el threadpool con una copia del contexto.
+    El cuerpo de un StreamingResponse se recibe completo antes de volver.
+    """
+
+    def __init__(self, app):
+        import httpx
+        self._loop = asyncio.new_event_loop()
+        self._http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    def correr(self, corrutina):
+        """Corre una corrutina en el event loop del cliente (el de los engines de /async)"""
+        return self._loop.run_until_complete(corrutina)
+
+    def pedir(self, metodo: str, url: str, **kwargs):
+        return self.correr(self._http.request(metodo, url, **kwargs))
+
+    def get(self, url: str, **kwargs):
+        return self.pedir("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.pedir("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs):
+        return self.pedir("PUT", url, **kwargs)
+
+    def en_paralelo(self, pedidos) -> list:
+        """Hace todos los pedidos (método, url, kwargs) a la vez y devuelve las respuestas en orden"""
+        async def todos():
+            return await asyncio.gather(*(
+                self._http.request(metodo, url, **kwargs) for metodo, url, kwargs in pedidos
+            ))
+        return self.correr(todos())
+
+    def cerrar(self):
+        import database
+        self.correr(self._http.aclose())
+        self.correr(database.async_engine.dispose())
+        self.correr(database.async_engine_lectura.dispose())
+        self._loop.close()
+
+
+@pytest.fixture(scope="session")
+def app():
+    import database
+    import main
+    import populate_db
+    populate_db.generar_masivo(database.engine, PERSONAS, TURNOS, seed=1, referencia=REFERENCIA)
+    yield main.app
+    database.engine.dispose()
+    database.engine_lectura.dispose()
+    shutil.rmtree(_DIRECTORIO, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def cliente(app):
+    cliente = ClienteASGI(app)
+    yield cliente
+    cliente.cerrar()
+
+
+@pytest.fixture
+def dni_habilitado(app) -> str:
+    """DNI de una persona habilitada y sin cancelados, que puede sacar turno"""
+    import database
+    import models
+    from config import settings
+    db = database.SessionLectura()
+    try:
+        cancelados = db.query(models.Turno.persona_id).filter(models.Turno.estado == settings.ESTADO_CANCELADO)
+        persona = (
+            db.query(models.Persona)
+            .filter(models.Persona.habilitado.is_(True), models.Persona.id.not_in(cancelados))
+            .order_by(models.Persona.id)
+            .first()
+        )
+        return persona.dni
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def dnis_habilitados(app) -> list:
+    """DNIs de todas las personas habilitadas"""
+    import database
+    import models
+    db = database.SessionLectura()
+    try:
+        return [dni for dni, in db.query(models.Persona.dni).filter(models.Persona.habilitado.is_(True)).order_by(models.Persona.id)]
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def presupuesto():
+    """
+    Presupuesto de consultas por endpoint. Devuelve el ConteoConsultas para afirmar
+    además un número exacto:
+
+        with presupuesto(2) as conteo:
+            respuesta = cliente.get("/turnos")
+        assert conteo.cantidad == 2
+    """
+    import consultas_sql
+    return consultas_sql.presupuesto_consultas
@@ -0,0 +1,158 @@
+"""
+Conteo de consultas SQL por pedido y detección de N+1.
+
+Los eventos before/after_cursor_execute de cada engine de database.py suman cada
+sentencia al ConteoConsultas activo en el contexto (contextvars). Los handlers sync
+corren en el threadpool con una copia del contexto del pedido, así que ven el mismo
+conteo. Fuera de un conteo activo los eventos no hacen nada más que leer el contextvar.
+
+Con SQL_DEBUG=1 el middleware abre un conteo por pedido. La respuesta lleva
+X-DB-Queries y X-DB-Time-Ms, y se registra un warning si la misma forma de sentencia
+se repitió más de SQL_N_MAS_1_UMBRAL veces. Los headers salen con el inicio de la
+respuesta: en un StreamingResponse no incluyen las consultas que se hacen mientras
+se envía el cuerpo, pero el warning sí.
+
+Para fijar un presupuesto de consultas:
+
+    with consultas_sql.presupuesto_consultas(3):
+        services.estado_personas(db, personas)
+
+En los tests se usa a través del fixture `presupuesto` de conftest.py, alrededor de
+un pedido a la API (tests/test_consultas.py).
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Una lista de parámetros (?, ?, ?) cuenta como una sola forma sin importar su largo
+_LISTA_PARAMETROS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def forma(sentencia: str) -> str:
+    """La sentencia tal como se repite en un N+1: sin espacios extra y sin largo de los IN"""
+    return _LISTA_PARAMETROS.sub("(?, ...)", " ".join(sentencia.split()))
+
+
+class ConteoConsultas:
+    """Sentencias ejecutadas, tiempo total en la base y repeticiones de cada forma"""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.por_forma = Counter()
+        self._lock = threading.Lock()
+
+    def registrar(self, sentencia: str, segundos: float):
+        with self._lock:
+            self.cantidad += 1
+            self.segundos += segundos
+            self.por_forma[forma(sentencia)] += 1
+
+    def repetidas(self, umbral: int) -> list:
+        """[(forma, veces)] de las formas que se ejecutaron más de `umbral` veces"""
+        with self._lock:
+            return [(f, veces) for f, veces in self.por_forma.most_common() if veces > umbral]
+
+
+_conteo_actual: ContextVar[Optional[ConteoConsultas]] = ContextVar("conteo_consultas", default=None)
+
+
+class PresupuestoExcedido(AssertionError):
+    pass
+
+
+@contextmanager
+def contar_consultas():
+    """Cuenta las consultas hechas dentro del bloque en este contexto"""
+    conteo = ConteoConsultas()
+    token = _conteo_actual.set(conteo)
+    try:
+        yield conteo
+    finally:
+        _conteo_actual.reset(token)
+
+@contextmanager
+def presupuesto_consultas(maximo: int):
+    """Falla con PresupuestoExcedido si el bloque hace más de `maximo` consultas"""
+    with contar_consultas() as conteo:
+        yield conteo
+    if conteo.cantidad > maximo:
+        detalle = "; ".join(f"{veces}x {f[:120]}" for f, veces in conteo.por_forma.most_common(3))
+        raise PresupuestoExcedido(f"{conteo.cantidad} consultas (máximo {maximo}). Más repetidas: {detalle}")
+
+
+def instrumentar(engine: Engine):
+    """Registra los eventos de conteo en un engine sync (o en el sync_engine de uno async)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if _conteo_actual.get() is not None:
+            conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        conteo = _conteo_actual.get()
+        inicios = conn.info.get("inicio_consultas")
+        if conteo is not None and inicios:
+            conteo.registrar(statement, time.perf_counter() - inicios.pop())
+
+
+def planes_de_consultas(engine: Engine, funcion) -> list:
+    """Ejecuta funcion() y devuelve el EXPLAIN QUERY PLAN de cada SELECT que hizo (una línea por consulta)"""
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            consultas.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        funcion()
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+    with engine.connect() as conexion:
+        return [
+            " ; ".join(fila[3] for fila in conexion.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, parametros))
+            for sql, parametros in consultas
+        ]
+
+
+class ConsultasMiddleware:
+    """Middleware ASGI (solo con SQL_DEBUG): un conteo por pedido, headers de debug y aviso de N+1"""
+
+    def __init__(self, app, umbral: int = None):
+        self.app = app
+        self.umbral = settings.SQL_N_MAS_1_UMBRAL if umbral is None else umbral
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                headers = list(mensaje.get("headers", []))
+                headers.append((b"x-db-queries", str(conteo.cantidad).encode()))
+                headers.append((b"x-db-time-ms", f"{conteo.segundos * 1000:.2f}".encode()))
+                mensaje = {**mensaje, "headers": headers}
+            await send(mensaje)
+
+        with contar_consultas() as conteo:
+            await self.app(scope, receive, enviar)
+
+        for sentencia, veces in conteo.repetidas(self.umbral):
+            logger.warning(
+                "Posible N+1 en %s %s: la misma consulta se ejecutó %d veces: %s",
+                scope["method"], scope["path"], veces, sentencia[:300]
+            )
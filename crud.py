@@ -1,19 +1,134 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.orm import Session, Query, joinedload
+from typing import Dict, List, Optional, Set, Tuple
 import models, schemas
 from datetime import date
-from sqlalchemy import func
+from sqlalchemy import func, literal, tuple_, Date, Integer, insert, or_
+from sqlalchemy.exc import IntegrityError
+import base64
+from contextlib import contextmanager
+import json
 from config import settings
+from ocupacion import indice_ocupacion
+from cache_resultados import version_datos
+import horarios
+
+# ----------------------
+# Reserva de horarios
+# ----------------------
+
+class HorarioOcupado(Exception):
+    """El horario ya tiene un turno activo (lo rechaza el índice ux_turnos_horario_activo)"""
+
+def es_horario_ocupado(error: IntegrityError) -> bool:
+    return "turnos.fecha, turnos.hora" in str(error.orig)
+
+def mensaje_horario_ocupado(fecha: date, hora: str) -> str:
+    return f"El horario {hora} del {fecha} ya está ocupado"
+
+@contextmanager
+def reservando_horario(db: Session, mensaje: str):
+    """
+    Envuelve el flush/commit de altas y cambios de turnos. No se consulta antes si el
+    horario está libre: si otro pedido lo ocupó, el índice único rechaza el
+    INSERT/UPDATE y se informa con HorarioOcupado(mensaje).
+    """
+    try:
+        yield
+    except IntegrityError as e:
+        db.rollback()
+        if es_horario_ocupado(e):
+            raise HorarioOcupado(mensaje) from e
+        raise
+
+# ----------------------
+# Paginación por cursor (keyset)
+# ----------------------
+
+# Orden estable de los listados: el cursor guarda los valores de la última fila
+ORDEN_TURNOS = (models.Turno.fecha, models.Turno.hora, models.Turno.id)
+ORDEN_PERSONAS = (models.Persona.id,)
+
+def codificar_cursor(valores: tuple) -> str:
+    crudo = json.dumps([v.isoformat() if isinstance(v, date) else v for v in valores])
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+def _valor_cursor(columna, valor):
+    if isinstance(columna.type, Date):
+        return date.fromisoformat(valor)
+    if isinstance(columna.type, horarios.HoraSlot):
+        horarios.a_minutos(valor)  # ValueError si no es HH:MM
+    elif isinstance(columna.type, Integer) and (not isinstance(valor, int) or isinstance(valor, bool)):
+        # Un id "5" compararía como texto contra la columna entera
+        raise ValueError
+    # Con el tipo de la columna: en tuple_(...) > tuple_(...) la hora "09:30" se compara como minutos
+    return literal(valor, columna.type)
+
+def decodificar_cursor(cursor: str, columnas: tuple) -> tuple:
+    """Devuelve los valores del cursor tipados según las columnas; ValueError si es inválido"""
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(crudo)
+        if not isinstance(valores, list) or len(valores) != len(columnas):
+            raise ValueError
+        return tuple(_valor_cursor(col, v) for col, v in zip(columnas, valores))
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+def cursor_turno(turno: models.Turno) -> str:
+    return codificar_cursor((turno.fecha, turno.hora, turno.id))
+
+def cursor_persona(persona: models.Persona) -> str:
+    return codificar_cursor((persona.id,))
+
+def _despues_del_cursor(query: Query, columnas: tuple, cursor: Optional[str]) -> Query:
+    query = query.order_by(*columnas)
+    if cursor is None:
+        return query
+    return query.filter(tuple_(*columnas) > tuple_(*decodificar_cursor(cursor, columnas)))
+
+def _paginar(query: Query, columnas: tuple, skip: int, limit: Optional[int], cursor: Optional[str]) -> Query:
+    """Con cursor pagina por clave (ignora skip); sin cursor usa offset como antes"""
+    query = _despues_del_cursor(query, columnas, cursor)
+    if cursor is None and skip:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
 
 def create_persona(db: Session, persona_in: schemas.PersonaCreate) -> models.Persona:
     persona_db = models.Persona(**persona_in.model_dump())
     db.add(persona_db)
     db.commit()
-    db.refresh(persona_db)
+    version_datos.incrementar()
     return persona_db
 
-def get_personas(db: Session, skip: int = 0, limit: int = 100) -> List[models.Persona]:
-    return db.query(models.Persona).offset(skip).limit(limit).all()
+def create_personas(db: Session, personas: List[dict]):
+    """Inserta las personas con un executemany (sin cargar objetos) y confirma"""
+    if not personas:
+        return
+    db.execute(insert(models.Persona), personas)
+    db.commit()
+    version_datos.incrementar()
+
+def get_emails_dnis_existentes(db: Session, emails: List[str], dnis: List[str]) -> Tuple[Set[str], Set[str]]:
+    """Cuáles de los emails y DNI dados ya están registrados, con una sola consulta"""
+    if not emails and not dnis:
+        return set(), set()
+    filas = db.query(models.Persona.email, models.Persona.dni).filter(
+        or_(models.Persona.email.in_(set(emails)), models.Persona.dni.in_(set(dnis)))
+    ).all()
+    emails_set, dnis_set = set(emails), set(dnis)
+    return (
+        {email for email, _ in filas if email in emails_set},
+        {dni for _, dni in filas if dni in dnis_set},
+    )
+
+def get_personas(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[models.Persona]:
+    return _paginar(db.query(models.Persona), ORDEN_PERSONAS, skip, limit, cursor).all()
+
+def get_personas_filas(db: Session, limit: int = 100, cursor: Optional[str] = None) -> list:
+    """Como get_personas pero filas con las columnas de la tabla, sin armar objetos del ORM"""
+    return _paginar(db.query(*models.Persona.__table__.columns), ORDEN_PERSONAS, 0, limit, cursor).all()
 
 def get_persona(db: Session, persona_id: int) -> Optional[models.Persona]:
     return db.query(models.Persona).filter(models.Persona.id == persona_id).first()
@@ -26,89 +141,221 @@ def update_persona(db: Session, persona_id: int, persona_up: schemas.PersonaUpda
         setattr(persona_db, campo, valor)
     db.add(persona_db)
     db.commit()
-    db.refresh(persona_db)
+    version_datos.incrementar()
     return persona_db
 
 def delete_persona(db: Session, persona_id: int) -> bool:
     persona_a_eliminar = get_persona(db, persona_id)
     if not persona_a_eliminar:
         return False
+    # Los turnos se borran en cascada: liberamos sus fechas del índice de ocupación
+    fechas_afectadas = {t.fecha for t in persona_a_eliminar.turnos}
     db.delete(persona_a_eliminar)
     db.commit()
+    version_datos.incrementar()
+    for fecha in fechas_afectadas:
+        indice_ocupacion.liberar(fecha)
     return True
 
 def create_turno(db: Session, turno_in: schemas.TurnoCreate) -> models.Turno:
     turno_db = models.Turno(**turno_in.model_dump())
     db.add(turno_db)
-    db.commit()
-    db.refresh(turno_db)
+    with reservando_horario(db, mensaje_horario_ocupado(turno_in.fecha, turno_in.hora)):
+        db.commit()
+    version_datos.incrementar()
+    indice_ocupacion.ocupar(turno_db.fecha, turno_db.hora, turno_db.estado)
     return turno_db
 
-def get_turnos(db: Session, skip: int = 0, limit: int = 100) -> List[models.Turno]:
-    return db.query(models.Turno).offset(skip).limit(limit).all()
+def create_turnos(db: Session, turnos_in: List[schemas.TurnoCreate]) -> List[models.Turno]:
+    """Inserta todos los turnos en una sola transacción"""
+    turnos_db = [models.Turno(**t.model_dump()) for t in turnos_in]
+    if not turnos_db:
+        return []
+    db.add_all(turnos_db)
+    with reservando_horario(db, "Alguno de los horarios del lote se ocupó mientras se procesaba"):
+        db.commit()
+    version_datos.incrementar()
+    for turno_db in turnos_db:
+        indice_ocupacion.ocupar(turno_db.fecha, turno_db.hora, turno_db.estado)
+    return turnos_db
+
+def query_turnos_con_persona(db: Session) -> Query:
+    """Turnos con su persona cargada en la misma consulta (evita un get_persona por turno)"""
+    return db.query(models.Turno).options(joinedload(models.Turno.persona))
+
+def get_turnos(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[models.Turno]:
+    return _paginar(query_turnos_con_persona(db), ORDEN_TURNOS, skip, limit, cursor).all()
+
+def get_turnos_filas(db: Session, limit: int = 100, cursor: Optional[str] = None) -> list:
+    """Las columnas de schemas.TurnoOut (con el dni de la persona) en filas, sin objetos del ORM"""
+    query = db.query(
+        models.Turno.id, models.Turno.fecha, models.Turno.hora, models.Turno.estado,
+        models.Turno.persona_id, models.Persona.dni
+    ).join(models.Persona, models.Turno.persona_id == models.Persona.id)
+    return _paginar(query, ORDEN_TURNOS, 0, limit, cursor).all()
 
 def get_turno(db: Session, turno_id: int) -> Optional[models.Turno]:
-    return db.query(models.Turno).filter(models.Turno.id == turno_id).first()
+    return query_turnos_con_persona(db).filter(models.Turno.id == turno_id).first()
 
 def get_persona_por_dni(db: Session, dni: str) -> Optional[models.Persona]:
     return db.query(models.Persona).filter(models.Persona.dni == dni).first()
 
+def get_personas_por_dnis(db: Session, dnis: List[str]) -> Dict[str, models.Persona]:
+    if not dnis:
+        return {}
+    personas = db.query(models.Persona).filter(models.Persona.dni.in_(set(dnis))).all()
+    return {p.dni: p for p in personas}
+
+def get_horarios_ocupados(db: Session, fechas: List[date]) -> Set[Tuple[date, str]]:
+    """(fecha, hora) con algún turno no cancelado entre las fechas dadas"""
+    if not fechas:
+        return set()
+    filas = db.query(models.Turno.fecha, models.Turno.hora).filter(
+        models.Turno.fecha.in_(set(fechas)),
+        models.Turno.estado != settings.ESTADO_CANCELADO,
+    ).all()
+    return {(fecha, hora) for fecha, hora in filas}
+
 def update_turno(db: Session, turno_id: int, turno_up: schemas.TurnoUpdate) -> Optional[models.Turno]:
     turno_db = get_turno(db, turno_id)
     if not turno_db:
         return None
-    for campo, valor in turno_up.model_dump(exclude_unset=True).items():
+    anterior = (turno_db.fecha, turno_db.hora, turno_db.estado)
+    cambios = turno_up.model_dump(exclude_unset=True)
+    for campo, valor in cambios.items():
         setattr(turno_db, campo, valor)
     db.add(turno_db)
-    db.commit()
-    db.refresh(turno_db)
+    with reservando_horario(db, mensaje_horario_ocupado(turno_db.fecha, turno_db.hora)):
+        if "persona_id" in cambios:
+            # La nueva persona se carga antes del commit, sin volver a pedir la conexión después
+            db.flush()
+            db.refresh(turno_db, attribute_names=["persona"])
+        db.commit()
+    version_datos.incrementar()
+    actualizar_ocupacion(anterior, turno_db)
     return turno_db
 
+def actualizar_ocupacion(anterior: tuple, turno_db: models.Turno):
+    """Refleja en el índice de ocupación un turno modificado; anterior = (fecha, hora, estado)"""
+    fecha, hora, estado = anterior
+    estaba_ocupado = estado != settings.ESTADO_CANCELADO
+    sigue_igual = (fecha, hora) == (turno_db.fecha, turno_db.hora) and turno_db.estado != settings.ESTADO_CANCELADO
+    if estaba_ocupado and not sigue_igual:
+        indice_ocupacion.liberar(fecha)
+    indice_ocupacion.ocupar(turno_db.fecha, turno_db.hora, turno_db.estado)
+
 def delete_turno(db: Session, turno_id: int) -> bool:
     turno_a_eliminar = get_turno(db, turno_id)
     if not turno_a_eliminar:
         return False
+    fecha = turno_a_eliminar.fecha
     db.delete(turno_a_eliminar)
     db.commit()
+    version_datos.incrementar()
+    indice_ocupacion.liberar(fecha)
     return 
 
-def get_turnos_por_fecha(db: Session, fecha: date, skip: int = 0, limit: int = None):
+def get_turnos_por_fecha(db: Session, fecha: date, skip: int = 0, limit: int = None, cursor: Optional[str] = None):
     query = (
         db.query(models.Turno, models.Persona.nombre, models.Persona.dni)
         .join(models.Persona, models.Turno.persona_id == models.Persona.id)
         .filter(models.Turno.fecha == fecha)
     )
     
-    if limit is not None:
-        query = query.offset(skip).limit(limit)
-    
-    return query.all()
+    return _paginar(query, ORDEN_TURNOS, skip, limit, cursor).all()
 
-def get_turnos_cancelados_por_mes(db: Session, anio: int, mes: int, skip: int = 0, limit: int = None):
-    query = (
+def rango_mes(anio: int, mes: int) -> Tuple[date, date]:
+    """(primer día del mes, primer día del mes siguiente)"""
+    if mes == 12:
+        return date(anio, 12, 1), date(anio + 1, 1, 1)
+    return date(anio, mes, 1), date(anio, mes + 1, 1)
+
+def query_turnos_cancelados_por_mes(db: Session, anio: int, mes: int) -> Query:
+    # Rango de fechas y no strftime(fecha): así la consulta usa el índice (estado, fecha)
+    desde, hasta = rango_mes(anio, mes)
+    return (
         db.query(models.Turno)
         .filter(
-            func.strftime("%Y", models.Turno.fecha) == str(anio),
-            func.strftime("%m", models.Turno.fecha) == f"{mes:02d}",
             models.Turno.estado == settings.ESTADO_CANCELADO,
+            models.Turno.fecha >= desde,
+            models.Turno.fecha < hasta,
         )
     )
-    
-    if limit is not None:
-        query = query.offset(skip).limit(limit)
-    
-    return query.all()
+
+def get_turnos_cancelados_por_mes(db: Session, anio: int, mes: int, skip: int = 0, limit: int = None, cursor: Optional[str] = None):
+    query = query_turnos_cancelados_por_mes(db, anio, mes)
+    return _paginar(query, ORDEN_TURNOS, skip, limit, cursor).all()
+
+def query_turnos_cancelados(db: Session) -> Query:
+    return db.query(models.Turno).filter(models.Turno.estado == settings.ESTADO_CANCELADO)
+
+def iterar_en_lotes(query: Query, tamanio_lote: int = 1000) -> Query:
+    """
+    Recorre una consulta de turnos trayendo tamanio_lote filas por vez en lugar de
+    materializarla entera. Devuelve filas de columnas (t.id, t.fecha, ...) y no
+    entidades, así la sesión no acumula objetos mientras dura el recorrido.
+    """
+    return (
+        query.with_entities(
+            models.Turno.id,
+            models.Turno.fecha,
+            models.Turno.hora,
+            models.Turno.estado,
+            models.Turno.persona_id,
+        )
+        .order_by(*ORDEN_TURNOS)
+        .yield_per(tamanio_lote)
+    )
     
 def get_persona_por_dni(db: Session, dni: str):
     return db.query(models.Persona).filter(models.Persona.dni == dni).first()
 
-def get_turnos_por_persona_paginado(db: Session, persona_id: int, skip: int = 0, limit: int = 10):
-    return (
+def get_turnos_por_persona_paginado(db: Session, persona_id: int, skip: int = 0, limit: int = 10, cursor: Optional[str] = None):
+    query = (
         db.query(models.Turno, models.Persona.nombre, models.Persona.dni)
         .join(models.Persona, models.Turno.persona_id == models.Persona.id)
         .filter(models.Turno.persona_id == persona_id)
-        .order_by(models.Turno.fecha, models.Turno.hora)
+    )
+    return _paginar(query, ORDEN_TURNOS, skip, limit, cursor).all()
+
+def get_personas_con_cancelados(db: Session, minimo: int, skip: int = 0, limit: int = 5):
+    """
+    Personas con al menos `minimo` turnos cancelados, agrupadas y paginadas en la base.
+    Devuelve (total, [(persona, cantidad_cancelados), ...]) ordenado por el primer cancelado.
+    """
+    cancelados = (
+        db.query(
+            models.Turno.persona_id.label("persona_id"),
+            func.count(models.Turno.id).label("cantidad"),
+            func.min(models.Turno.fecha).label("primera_fecha"),
+        )
+        .filter(models.Turno.estado == settings.ESTADO_CANCELADO)
+        .group_by(models.Turno.persona_id)
+        .having(func.count(models.Turno.id) >= minimo)
+        .subquery()
+    )
+
+    total = db.query(func.count()).select_from(cancelados).scalar()
+
+    pagina = (
+        db.query(models.Persona, cancelados.c.cantidad)
+        .join(cancelados, models.Persona.id == cancelados.c.persona_id)
+        .order_by(cancelados.c.primera_fecha, models.Persona.id)
         .offset(skip)
         .limit(limit)
         .all()
-    )
\ No newline at end of file
+    )
+    return total, pagina
+
+def get_turnos_cancelados_de_personas(db: Session, persona_ids: List[int]) -> List[models.Turno]:
+    if not persona_ids:
+        return []
+    return (
+        db.query(models.Turno)
+        .filter(
+            models.Turno.persona_id.in_(persona_ids),
+            models.Turno.estado == settings.ESTADO_CANCELADO,
+        )
+        .order_by(models.Turno.fecha, models.Turno.id)
+        .all()
+    )
@@ -0,0 +1,74 @@
+"""
+Versión asincrónica (AsyncSession) de las operaciones de crud que usan los endpoints
+de /async. Comparten con crud el orden y los cursores de paginación, el índice de
+ocupación y la versión de los datos, así que ambos caminos pueden convivir.
+"""
+from typing import List, Optional
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+import models, schemas
+from crud import (
+    ORDEN_TURNOS, decodificar_cursor, actualizar_ocupacion,
+    HorarioOcupado, es_horario_ocupado, mensaje_horario_ocupado,
+)
+from ocupacion import indice_ocupacion
+from cache_resultados import version_datos
+
+async def get_persona(db: AsyncSession, persona_id: int) -> Optional[models.Persona]:
+    return await db.get(models.Persona, persona_id)
+
+async def get_persona_por_dni(db: AsyncSession, dni: str) -> Optional[models.Persona]:
+    resultado = await db.execute(select(models.Persona).where(models.Persona.dni == dni))
+    return resultado.scalars().first()
+
+def _select_turnos_con_persona():
+    return select(models.Turno).options(joinedload(models.Turno.persona))
+
+async def get_turno(db: AsyncSession, turno_id: int) -> Optional[models.Turno]:
+    resultado = await db.execute(_select_turnos_con_persona().where(models.Turno.id == turno_id))
+    return resultado.scalars().first()
+
+async def get_turnos(db: AsyncSession, limit: int = 100, cursor: Optional[str] = None) -> List[models.Turno]:
+    consulta = _select_turnos_con_persona().order_by(*ORDEN_TURNOS)
+    if cursor is not None:
+        consulta = consulta.where(tuple_(*ORDEN_TURNOS) > tuple_(*decodificar_cursor(cursor, ORDEN_TURNOS)))
+    resultado = await db.execute(consulta.limit(limit))
+    return list(resultado.scalars().all())
+
+async def _guardar_turno(db: AsyncSession, turno_db: models.Turno, recargar_persona: bool = False):
+    """Flush y commit de un turno; HorarioOcupado si el índice único rechaza el horario"""
+    # Después del rollback el turno queda expirado: el mensaje se arma antes
+    mensaje = mensaje_horario_ocupado(turno_db.fecha, turno_db.hora)
+    try:
+        await db.flush()
+        if recargar_persona:
+            await db.refresh(turno_db, attribute_names=["persona"])
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if es_horario_ocupado(e):
+            raise HorarioOcupado(mensaje) from e
+        raise
+
+async def create_turno(db: AsyncSession, turno_in: schemas.TurnoCreate) -> models.Turno:
+    turno_db = models.Turno(**turno_in.model_dump())
+    db.add(turno_db)
+    await _guardar_turno(db, turno_db)
+    version_datos.incrementar()
+    indice_ocupacion.ocupar(turno_db.fecha, turno_db.hora, turno_db.estado)
+    return turno_db
+
+async def update_turno(db: AsyncSession, turno_id: int, turno_up: schemas.TurnoUpdate) -> Optional[models.Turno]:
+    turno_db = await get_turno(db, turno_id)
+    if not turno_db:
+        return None
+    anterior = (turno_db.fecha, turno_db.hora, turno_db.estado)
+    cambios = turno_up.model_dump(exclude_unset=True)
+    for campo, valor in cambios.items():
+        setattr(turno_db, campo, valor)
+    await _guardar_turno(db, turno_db, recargar_persona="persona_id" in cambios)
+    version_datos.incrementar()
+    actualizar_ocupacion(anterior, turno_db)
+    return turno_db
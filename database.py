@@ -1,15 +1,154 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from config import settings
+from metricas import MedirEsperaConexion
+import consultas_sql
 
-DATABASE_URL = "sqlite:///./turnos.db"
+DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+def _pragmas() -> list:
+    """PRAGMAs que se ejecutan en cada conexión nueva, según config.Config"""
+    journal_mode = settings.SQLITE_JOURNAL_MODE.upper()
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in _JOURNAL_MODES:
+        raise ValueError(f"SQLITE_JOURNAL_MODE inválido: {settings.SQLITE_JOURNAL_MODE}")
+    if synchronous not in _SYNCHRONOUS:
+        raise ValueError(f"SQLITE_SYNCHRONOUS inválido: {settings.SQLITE_SYNCHRONOUS}")
+    return [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_MB) * 1024 * 1024}",
+        # Negativo: tamaño en KiB en lugar de en páginas
+        f"PRAGMA cache_size={-int(settings.SQLITE_CACHE_MB) * 1024}",
+    ]
+
+def configurar_sqlite(engine: Engine, solo_lectura: bool = False):
+    """Aplica los PRAGMAs de config a cada conexión que abra el engine"""
+    pragmas = _pragmas()
+    if solo_lectura:
+        # Un INSERT/UPDATE por una conexión de lectura falla en lugar de competir con el escritor
+        pragmas.append("PRAGMA query_only=ON")
+
+    @event.listens_for(engine, "connect")
+    def _al_conectar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+class PoolMedido(MedirEsperaConexion, QueuePool):
+    """QueuePool que registra la espera por conexión en /metrics"""
+
+class PoolAsyncMedido(MedirEsperaConexion, AsyncAdaptedQueuePool):
+    """Lo mismo para el engine asincrónico"""
+
+def crear_engine_escritura(url=DATABASE_URL) -> Engine:
+    """
+    Una sola conexión para todas las escrituras: SQLite admite un escritor por vez, y
+    con varias conexiones el resto espera busy_timeout o falla con "database is locked".
+    """
+    engine = create_engine(
+        url, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0,
+        poolclass=PoolMedido, pool_logging_name="escritura"
+    )
+    configurar_sqlite(engine)
+    consultas_sql.instrumentar(engine)
+    return engine
+
+def crear_engine_lectura(url=DATABASE_URL) -> Engine:
+    """
+    Pool de lectura: con WAL los lectores no bloquean al escritor ni entre ellos.
+    Se mantienen DB_POOL_LECTURA conexiones abiertas y, si hacen falta más, se abren
+    sin límite: con un tope, los handlers sync pueden quedar esperando una conexión
+    que otro pedido no devuelve hasta conseguir un hilo del threadpool.
+    """
+    engine = create_engine(
+        url, connect_args={"check_same_thread": False},
+        pool_size=settings.DB_POOL_LECTURA, max_overflow=-1,
+        poolclass=PoolMedido, pool_logging_name="lectura"
+    )
+    configurar_sqlite(engine, solo_lectura=True)
+    consultas_sql.instrumentar(engine)
+    return engine
+
+engine = crear_engine_escritura()
+engine_lectura = crear_engine_lectura()
+
+# expire_on_commit=False: el commit devuelve la conexión de escritura al pool y no se
+# vuelve a pedir para recargar los objetos, así otro pedido puede escribir enseguida
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+SessionLectura = sessionmaker(autocommit=False, autoflush=False, bind=engine_lectura)
 Base = declarative_base()
 
+def _url_async(url):
+    return make_url(url).set(drivername="sqlite+aiosqlite")
+
+def crear_async_engine_escritura(url=DATABASE_URL):
+    """
+    Escritor único de los endpoints de /async, con el mismo criterio que
+    crear_engine_escritura. Sigue siendo una segunda conexión de escritura además de
+    la sync: entre las dos se turnan con busy_timeout, pero nunca son más de dos.
+    """
+    engine = create_async_engine(
+        _url_async(url), pool_size=1, max_overflow=0,
+        poolclass=PoolAsyncMedido, pool_logging_name="async_escritura"
+    )
+    configurar_sqlite(engine.sync_engine)
+    consultas_sql.instrumentar(engine.sync_engine)
+    return engine
+
+def crear_async_engine_lectura(url=DATABASE_URL):
+    """
+    Pool de lectura de /async. A diferencia del sync tiene tope: esperar una conexión
+    es un await y no retiene un hilo, así que no se puede trabar como el threadpool.
+    """
+    engine = create_async_engine(
+        _url_async(url), pool_size=settings.DB_POOL_LECTURA, max_overflow=0,
+        poolclass=PoolAsyncMedido, pool_logging_name="async_lectura"
+    )
+    configurar_sqlite(engine.sync_engine, solo_lectura=True)
+    consultas_sql.instrumentar(engine.sync_engine)
+    return engine
+
+# Motores asincrónicos (aiosqlite) sobre la misma base, para los endpoints de /async.
+# expire_on_commit=False: después del commit no se puede recargar un atributo de
+# forma implícita (sería I/O fuera de un await)
+async_engine = crear_async_engine_escritura()
+async_engine_lectura = crear_async_engine_lectura()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncSessionLectura = async_sessionmaker(async_engine_lectura, autoflush=False)
+
 def get_db():
+    """Sesión de escritura, para los endpoints que modifican datos"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_db_lectura():
+    """Sesión de solo lectura (listados, disponibilidad y reportes)"""
+    db = SessionLectura()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """Sesión asincrónica de escritura"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_db_lectura():
+    """Sesión asincrónica de solo lectura"""
+    async with AsyncSessionLectura() as db:
+        yield db
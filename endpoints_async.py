@@ -0,0 +1,227 @@
+"""
+Versión asincrónica de los endpoints más usados, bajo el prefijo /async.
+
+Usan AsyncSession (aiosqlite) en lugar de Session: no ocupan un hilo del threadpool
+mientras esperan a la base, así que con muchas conexiones concurrentes no se encolan
+detrás de los 40 hilos de AnyIO. Las validaciones, los errores y las ETags son los
+mismos que los de main.py, y como ahí las lecturas van al pool de solo lectura y las
+escrituras a una única conexión.
+"""
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+import crud, crud_async, schemas, services
+from config import settings
+from database import get_async_db, get_async_db_lectura
+from ocupacion import indice_ocupacion
+import http_cache
+
+router = APIRouter(prefix="/async", tags=["async"])
+
+
+def _turno_out(turno) -> schemas.TurnoOut:
+    return schemas.TurnoOut(
+        id=turno.id,
+        fecha=turno.fecha,
+        hora=turno.hora,
+        estado=turno.estado,
+        persona_id=turno.persona_id,
+        dni=turno.persona.dni
+    )
+
+@router.get("/personas/{persona_id}", response_model=schemas.PersonaOut)
+async def obtener_persona(
+    persona_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    try:
+        persona_obtenida = await crud_async.get_persona(db, persona_id)
+        if not persona_obtenida:
+            raise HTTPException(status_code=404, detail="Persona no encontrada")
+        edad_calculada = services.calcular_edad(persona_obtenida.fecha_nacimiento)
+
+        etag = http_cache.etag(
+            persona_obtenida.id, persona_obtenida.nombre, persona_obtenida.email, persona_obtenida.dni,
+            persona_obtenida.telefono, persona_obtenida.fecha_nacimiento, persona_obtenida.habilitado,
+            edad_calculada
+        )
+        if http_cache.coincide(if_none_match, etag):
+            return http_cache.no_modificado(etag, http_cache.CACHE_CONTROL_ACTUAL)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = http_cache.CACHE_CONTROL_ACTUAL
+
+        return schemas.PersonaOut(
+            id=persona_obtenida.id,
+            nombre=persona_obtenida.nombre,
+            email=persona_obtenida.email,
+            dni=persona_obtenida.dni,
+            telefono=persona_obtenida.telefono,
+            fecha_nacimiento=persona_obtenida.fecha_nacimiento,
+            habilitado=persona_obtenida.habilitado,
+            edad=edad_calculada
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@router.get("/turnos-disponibles")
+async def turnos_disponibles(
+    fecha: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    try:
+        try:
+            fecha_obj = date.fromisoformat(fecha)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Fecha inválida. Formato esperado: YYYY-MM-DD")
+
+        etag = http_cache.etag(fecha_obj, await indice_ocupacion.bitmap_async(db, fecha_obj), *settings.HORARIOS_VALIDOS)
+        politica = http_cache.cache_control(fecha_obj)
+        if http_cache.coincide(if_none_match, etag):
+            return http_cache.no_modificado(etag, politica)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = politica
+
+        disponibles = await services.turnos_disponibles_async(db, fecha_obj)
+        return {"fecha": fecha_obj, "horarios_disponibles": disponibles}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@router.post("/turnos", response_model=schemas.TurnoOut)
+async def crear_turno(turno: schemas.TurnoCreateConDNI, db: AsyncSession = Depends(get_async_db)):
+    try:
+        persona = await crud_async.get_persona_por_dni(db, turno.dni)
+        if not persona:
+            raise HTTPException(status_code=404, detail="Persona no encontrada")
+        if not persona.habilitado:
+            raise HTTPException(status_code=400, detail="Persona inhabilitada para sacar turno")
+        if not await services.puede_sacar_turno_async(db, persona.id):
+            raise HTTPException(status_code=400, detail="La persona tiene 5 o más cancelados en los últimos 6 meses")
+
+        turno_data = schemas.TurnoCreate(
+            fecha=turno.fecha,
+            hora=turno.hora,
+            estado=turno.estado,
+            persona_id=persona.id
+        )
+        turno_creado = await crud_async.create_turno(db, turno_data)
+        return schemas.TurnoOut(
+            id=turno_creado.id,
+            fecha=turno_creado.fecha,
+            hora=turno_creado.hora,
+            estado=turno_creado.estado,
+            persona_id=turno_creado.persona_id,
+            dni=persona.dni
+        )
+    except HTTPException:
+        raise
+    except crud.HorarioOcupado as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@router.get("/turnos", response_model=list[schemas.TurnoOut])
+async def listar_turnos(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    try:
+        try:
+            turnos_db = await crud_async.get_turnos(db, limit=limit + 1, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if len(turnos_db) > limit:
+            turnos_db = turnos_db[:limit]
+            response.headers["X-Next-Cursor"] = crud.cursor_turno(turnos_db[-1])
+        return [_turno_out(turno) for turno in turnos_db]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@router.get("/turnos/{turno_id}", response_model=schemas.TurnoOut)
+async def obtener_turno(
+    turno_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    try:
+        turno_obtenido = await crud_async.get_turno(db, turno_id)
+        if not turno_obtenido:
+            raise HTTPException(status_code=404, detail="Turno no encontrado")
+
+        etag = http_cache.etag(
+            turno_obtenido.id, turno_obtenido.fecha, turno_obtenido.hora, turno_obtenido.estado,
+            turno_obtenido.persona_id, turno_obtenido.persona.dni
+        )
+        if http_cache.coincide(if_none_match, etag):
+            return http_cache.no_modificado(etag, http_cache.CACHE_CONTROL_ACTUAL)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = http_cache.CACHE_CONTROL_ACTUAL
+
+        return _turno_out(turno_obtenido)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@router.put("/turnos/{turno_id}/cancelar", response_model=schemas.TurnoOut)
+async def cancelar_turno(turno_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        turno = await crud_async.get_turno(db, turno_id)
+        if not turno:
+            raise HTTPException(status_code=404, detail="Turno no encontrado")
+
+        estado_invalido = services.validar_estado_modificable(turno)
+
+        if estado_invalido == settings.ESTADO_ASISTIDO:
+            raise HTTPException(status_code=400, detail=f"No se puede cancelar un turno que ya fue '{settings.ESTADO_ASISTIDO}'")
+
+        if estado_invalido == settings.ESTADO_CANCELADO:
+            raise HTTPException(status_code=400, detail=f"El turno ya se encuentra '{settings.ESTADO_CANCELADO}'")
+
+        turno_actualizado = await crud_async.update_turno(db, turno_id, schemas.TurnoUpdate(estado=settings.ESTADO_CANCELADO))
+        if not turno_actualizado:
+            raise HTTPException(status_code=500, detail="Error al actualizar turno")
+
+        return _turno_out(turno_actualizado)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@router.put("/turnos/{turno_id}/confirmar", response_model=schemas.TurnoOut)
+async def confirmar_turno(turno_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        turno = await crud_async.get_turno(db, turno_id)
+        if not turno:
+            raise HTTPException(status_code=404, detail="Turno no encontrado")
+
+        estado_invalido = services.validar_estado_modificable(turno)
+
+        if estado_invalido == settings.ESTADO_ASISTIDO:
+            raise HTTPException(status_code=400, detail=f"No se puede confirmar un turno que ya fue '{settings.ESTADO_ASISTIDO}'")
+
+        if estado_invalido == settings.ESTADO_CANCELADO:
+            raise HTTPException(status_code=400, detail=f"No se puede confirmar un turno que está '{settings.ESTADO_CANCELADO}'")
+
+        turno_actualizado = await crud_async.update_turno(db, turno_id, schemas.TurnoUpdate(estado=settings.ESTADO_CONFIRMADO))
+        if not turno_actualizado:
+            raise HTTPException(status_code=500, detail="Error al actualizar el turno")
+
+        return _turno_out(turno_actualizado)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
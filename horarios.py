@@ -0,0 +1,48 @@
+"""
+Horarios de turno guardados como enteros.
+
+La API sigue recibiendo y devolviendo "HH:MM", pero la columna turnos.hora guarda los
+minutos desde la medianoche (09:30 -> 570): un SMALLINT ocupa menos que el texto en la
+tabla y en el índice (fecha, hora), se compara como número y el horario siguiente es
+sumar INTERVALO. Se guardan minutos y no la posición dentro de HORARIOS_VALIDOS para
+que cambiar HORARIO_INICIO o INTERVALO_MINUTOS no cambie el significado de las filas
+que ya existen.
+"""
+import re
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+_FORMATO = re.compile(r"([01]\d|2[0-3]):([0-5]\d)")
+
+
+def a_minutos(hora: str) -> int:
+    """"09:30" -> 570; ValueError si no es una hora HH:MM"""
+    coincidencia = _FORMATO.fullmatch(hora) if isinstance(hora, str) else None
+    if coincidencia is None:
+        raise ValueError(f"Hora inválida: {hora!r}")
+    return int(coincidencia.group(1)) * 60 + int(coincidencia.group(2))
+
+def a_texto(minutos: int) -> str:
+    """570 -> "09:30\""""
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+class HoraSlot(TypeDecorator):
+    """Columna SMALLINT con los minutos del horario; del lado de Python es "HH:MM\""""
+    impl = SmallInteger
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return str
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        return a_minutos(value)
+
+    def process_result_value(self, value, dialect):
+        # Una base todavía sin migrar (migraciones anteriores a la de la hora) devuelve texto
+        if value is None or isinstance(value, str):
+            return value
+        return a_texto(value)
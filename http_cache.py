@@ -0,0 +1,63 @@
+import hashlib
+import uuid
+from datetime import date
+from typing import Mapping, Optional
+from fastapi import Response
+from cache_resultados import version_datos
+
+# version_datos vuelve a 0 al reiniciar el proceso: el token distingue las ETags de
+# cada arranque para que una ETag vieja nunca coincida con datos distintos
+TOKEN_ARRANQUE = uuid.uuid4().hex[:12]
+
+# Datos de días ya pasados: casi no cambian, se pueden reutilizar por un día sin revalidar
+CACHE_CONTROL_PASADO = "private, max-age=86400"
+# Datos de hoy o futuros: se guardan pero se revalidan siempre con If-None-Match
+CACHE_CONTROL_ACTUAL = "private, no-cache"
+
+
+def etag(*partes) -> str:
+    """ETag fuerte a partir de los valores que definen el contenido de la respuesta"""
+    crudo = "\x1f".join("" if p is None else str(p) for p in partes)
+    return '"' + hashlib.sha256(crudo.encode("utf-8")).hexdigest()[:32] + '"'
+
+def etag_version_datos(*partes) -> str:
+    """ETag de algo calculado a partir de todos los datos (reportes)"""
+    return etag(TOKEN_ARRANQUE, version_datos.actual(), *partes)
+
+def coincide(if_none_match: Optional[str], etag_actual: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidata in if_none_match.split(","):
+        candidata = candidata.strip()
+        # If-None-Match usa comparación débil: W/"x" coincide con "x"
+        if candidata == "*" or candidata.removeprefix("W/") == etag_actual:
+            return True
+    return False
+
+def cache_control(fecha_hasta: Optional[date]) -> str:
+    """Política según la última fecha que abarca la respuesta (None: sin fecha, revalidar)"""
+    if fecha_hasta is not None and fecha_hasta < date.today():
+        return CACHE_CONTROL_PASADO
+    return CACHE_CONTROL_ACTUAL
+
+def no_modificado(etag_actual: str, politica: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag_actual, "Cache-Control": politica})
+
+def fecha_hasta_reporte(parametros: Mapping[str, str]) -> Optional[date]:
+    """
+    Última fecha cubierta por un reporte según sus parámetros de query: fecha, hasta,
+    o mes/anio. None si el reporte no está acotado a un período (p. ej. estado-personas).
+    """
+    try:
+        if "hasta" in parametros:
+            return date.fromisoformat(parametros["hasta"])
+        if "fecha" in parametros:
+            return date.fromisoformat(parametros["fecha"])
+        if "mes" in parametros and "anio" in parametros:
+            mes, anio = int(parametros["mes"]), int(parametros["anio"])
+            if mes == 12:
+                return date(anio, 12, 31)
+            return date.fromordinal(date(anio, mes + 1, 1).toordinal() - 1)
+    except ValueError:
+        return None
+    return None
@@ -0,0 +1,184 @@
+"""
+Importación masiva de personas desde un CSV.
+
+El archivo se recorre por bloques: cada bloque se valida con schemas.PersonaCreate,
+los emails/DNI repetidos se buscan con una sola consulta y las filas válidas se
+insertan con un executemany. Nunca hay más de un bloque en memoria.
+
+Columnas (con encabezado): nombre, email, dni, fecha_nacimiento (YYYY-MM-DD) y,
+opcionalmente, telefono y habilitado (true/false, 1/0, si/no; por defecto true).
+
+Uso:
+    python importar_personas.py personas.csv
+    python importar_personas.py personas.csv --separador ";" --bloque 5000
+"""
+import argparse
+import csv
+import itertools
+from typing import Iterable, List
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import crud, schemas
+
+# --- CONFIGURACIÓN VISUAL ---
+GREEN = "\033[92m"
+CYAN = "\033[96m"
+YELLOW = "\033[93m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+TAMANIO_BLOQUE = 1000
+# Errores que se detallan en el reporte; del resto solo se informa la cantidad
+MAX_ERRORES_REPORTADOS = 1000
+
+_VALORES_HABILITADO = {
+    "": True, "1": True, "true": True, "si": True, "sí": True,
+    "0": False, "false": False, "no": False,
+}
+
+
+def _mensaje_validacion(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+def _parsear_fila(fila: dict) -> dict:
+    """Fila del CSV -> datos validados por PersonaCreate (ValueError si no son válidos)"""
+    if None in fila:
+        raise ValueError("La fila tiene más columnas que el encabezado")
+    datos = {k.strip(): (v or "").strip() for k, v in fila.items() if k}
+
+    habilitado = datos.pop("habilitado", "").lower()
+    if habilitado not in _VALORES_HABILITADO:
+        raise ValueError(f"habilitado: valor inválido '{habilitado}'")
+    datos["habilitado"] = _VALORES_HABILITADO[habilitado]
+    datos["telefono"] = datos.get("telefono") or None
+
+    try:
+        return schemas.PersonaCreate(**datos).model_dump()
+    except ValidationError as e:
+        raise ValueError(_mensaje_validacion(e))
+
+
+class ReporteImportacion:
+    def __init__(self):
+        self.leidas = 0
+        self.importadas = 0
+        self.rechazadas = 0
+        self.errores: List[dict] = []
+
+    def rechazar(self, fila: int, error: str):
+        self.rechazadas += 1
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append({"fila": fila, "error": error})
+
+    def resumen(self) -> dict:
+        return {
+            "leidas": self.leidas,
+            "importadas": self.importadas,
+            "rechazadas": self.rechazadas,
+            "errores": sorted(self.errores, key=lambda e: e["fila"]),
+            "errores_no_detallados": self.rechazadas - len(self.errores),
+        }
+
+
+def _importar_bloque(db: Session, bloque: List[tuple], reporte: ReporteImportacion):
+    """bloque: [(número de línea, fila del CSV)]"""
+    validas = []
+    for linea, fila in bloque:
+        try:
+            validas.append((linea, _parsear_fila(fila)))
+        except ValueError as e:
+            reporte.rechazar(linea, str(e))
+
+    emails_existentes, dnis_existentes = crud.get_emails_dnis_existentes(
+        db, [p["email"] for _, p in validas], [p["dni"] for _, p in validas]
+    )
+
+    a_insertar = []
+    for linea, persona in validas:
+        if persona["email"] in emails_existentes:
+            reporte.rechazar(linea, "Email ya registrado")
+        elif persona["dni"] in dnis_existentes:
+            reporte.rechazar(linea, "DNI ya registrado")
+        else:
+            # También cuenta como registrado para las filas siguientes del mismo bloque
+            emails_existentes.add(persona["email"])
+            dnis_existentes.add(persona["dni"])
+            a_insertar.append((linea, persona))
+
+    try:
+        crud.create_personas(db, [p for _, p in a_insertar])
+        reporte.importadas += len(a_insertar)
+    except IntegrityError:
+        # Alguien registró los mismos datos mientras tanto: se reintenta fila por fila
+        db.rollback()
+        for linea, persona in a_insertar:
+            try:
+                crud.create_personas(db, [persona])
+                reporte.importadas += 1
+            except IntegrityError:
+                db.rollback()
+                reporte.rechazar(linea, "Email o DNI ya registrado")
+
+
+def importar_personas(
+    db: Session,
+    lineas: Iterable[str],
+    separador: str = ",",
+    tamanio_bloque: int = TAMANIO_BLOQUE,
+) -> dict:
+    """
+    Importa las personas de un CSV. `lineas` es cualquier iterable de líneas de texto
+    (un archivo abierto con newline=""), que se consume de a un bloque por vez.
+    """
+    lector = csv.DictReader(lineas, delimiter=separador)
+    faltantes = {"nombre", "email", "dni", "fecha_nacimiento"} - {c.strip() for c in lector.fieldnames or []}
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el encabezado: {sorted(faltantes)}")
+
+    reporte = ReporteImportacion()
+    filas = ((lector.line_num, fila) for fila in lector)
+    while True:
+        bloque = list(itertools.islice(filas, tamanio_bloque))
+        if not bloque:
+            break
+        reporte.leidas += len(bloque)
+        _importar_bloque(db, bloque, reporte)
+    return reporte.resumen()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa personas desde un CSV")
+    parser.add_argument("archivo")
+    parser.add_argument("--separador", default=",")
+    parser.add_argument("--bloque", type=int, default=TAMANIO_BLOQUE)
+    args = parser.parse_args()
+
+    from database import SessionLocal, engine, Base
+    import migraciones
+    Base.metadata.create_all(bind=engine)
+    migraciones.aplicar(engine)
+
+    print(f"{CYAN}--- Importando personas de {args.archivo} ---{RESET}")
+    db = SessionLocal()
+    try:
+        with open(args.archivo, encoding="utf-8-sig", newline="") as archivo:
+            resumen = importar_personas(db, archivo, args.separador, args.bloque)
+    except ValueError as e:
+        print(f"{RED}Error: {e}{RESET}")
+        raise SystemExit(1)
+    finally:
+        db.close()
+
+    for error in resumen["errores"]:
+        print(f"  {YELLOW}Fila {error['fila']}:{RESET} {error['error']}")
+    if resumen["errores_no_detallados"]:
+        print(f"  {YELLOW}... y {resumen['errores_no_detallados']} errores más{RESET}")
+    print(f"\n{GREEN}✅ Leídas: {resumen['leidas']} | Importadas: {resumen['importadas']} | "
+          f"Rechazadas: {resumen['rechazadas']}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
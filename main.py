@@ -1,14 +1,72 @@
-from fastapi import FastAPI, Depends, HTTPException ,Query
+from fastapi import FastAPI, Depends, HTTPException ,Query, Header, Request
+from typing import Optional
 from sqlalchemy.orm import Session
-from database import Base, engine, get_db
+from database import Base, engine, get_db, get_db_lectura, SessionLectura, async_engine, async_engine_lectura
 import crud, schemas, models, services
 from datetime import date
 from config import settings
 from fastapi.responses import Response, StreamingResponse
-import asyncio
+import io
+import tempfile
+from fastapi.concurrency import run_in_threadpool
+import importar_personas
+from reportes_jobs import cola_reportes, ColaReportesLlena, MEDIA_TYPES
+from cache_resultados import cache_reportes
+import http_cache
+import endpoints_async
+import migraciones
+import metricas
+import consultas_sql
+from respuesta_json import RespuestaJSON, lista_json, PERSONAS_OUT, TURNOS_OUT
 
 Base.metadata.create_all(bind=engine)
+migraciones.aplicar(engine)
 app = FastAPI(title="TP - API de Turnos")
+app.include_router(endpoints_async.router)
+
+@app.on_event("shutdown")
+def cerrar_cola_reportes():
+    cola_reportes.cerrar()
+
+@app.on_event("shutdown")
+async def cerrar_async_engine():
+    await async_engine.dispose()
+    await async_engine_lectura.dispose()
+
+@app.middleware("http")
+async def etag_reportes(request: Request, call_next):
+    """
+    ETag y Cache-Control para los GET de /reportes. La ETag sale de la versión de los
+    datos, así que un If-None-Match que coincide se responde con 304 antes de llegar
+    al endpoint: no se consulta la base ni se arma el PDF/CSV.
+    """
+    ruta = request.url.path
+    if (request.method != "GET" or not ruta.startswith("/reportes/")
+            or ruta.startswith(("/reportes/jobs", "/reportes/cache"))):
+        return await call_next(request)
+
+    # La fecha entra en la ETag: hay reportes que dependen de hoy (mes actual, estado de personas)
+    etag = http_cache.etag_version_datos(ruta, sorted(request.query_params.multi_items()), date.today())
+    politica = http_cache.cache_control(http_cache.fecha_hasta_reporte(request.query_params))
+    if http_cache.coincide(request.headers.get("if-none-match"), etag):
+        return http_cache.no_modificado(etag, politica)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = politica
+    return response
+
+if settings.SQL_DEBUG:
+    app.add_middleware(consultas_sql.ConsultasMiddleware)
+
+# Agregado último: envuelve a los demás middlewares y mide también los 304 de ETags
+app.add_middleware(metricas.MetricasMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def exponer_metricas():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(content=metricas.registro.exponer(), media_type=metricas.CONTENT_TYPE)
 
 @app.get("/", include_in_schema=False)
 def root():
@@ -41,34 +99,98 @@ def crear_persona(persona: schemas.PersonaCreate, db: Session = Depends(get_db))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
+@app.post("/personas/importar")
+async def importar_personas_csv(
+    request: Request,
+    separador: str = Query(",", min_length=1, max_length=1),
+    db: Session = Depends(get_db)
+):
+    """
+    Importa personas desde un CSV enviado como cuerpo del pedido (Content-Type: text/csv),
+    con las columnas nombre, email, dni, fecha_nacimiento y opcionalmente telefono y
+    habilitado. El cuerpo se vuelca a un archivo temporal a medida que llega y se importa
+    por bloques; devuelve cuántas filas se importaron y el error de cada fila rechazada.
+    """
+    try:
+        # Hasta 8 MB queda en memoria; más grande pasa a disco
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as archivo:
+            async for parte in request.stream():
+                archivo.write(parte)
+            archivo.seek(0)
+            texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+            try:
+                return await run_in_threadpool(importar_personas.importar_personas, db, texto, separador)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"CSV inválido: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importando personas: {str(e)}")
+
+def _stream_con_sesion(generar):
+    """
+    Recorre generar(db) con una sesión propia que vive mientras dura el streaming:
+    la sesión de get_db_lectura se cierra antes de que StreamingResponse consuma el iterador.
+    """
+    db = SessionLectura()
+    try:
+        yield from generar(db)
+    finally:
+        db.close()
+
+def _recortar_pagina(filas: list, limit: int, cursor_de, response: Response) -> list:
+    """Las consultas piden limit + 1 filas: si sobra una, hay página siguiente y se informa su cursor"""
+    if len(filas) > limit:
+        filas = filas[:limit]
+        response.headers["X-Next-Cursor"] = cursor_de(filas[-1])
+    return filas
+
 @app.get("/personas", response_model=list[schemas.PersonaOut])
-def listar_personas(db: Session = Depends(get_db)):
+def listar_personas(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db_lectura)
+):
     try:
-        personas = crud.get_personas(db)
-        lista_de_personas = []
-        for persona_db in personas:
-            edad_calculada = services.calcular_edad(persona_db.fecha_nacimiento)
-            lista_de_personas.append(schemas.PersonaOut(
-                id=persona_db.id,
-                nombre=persona_db.nombre,
-                email=persona_db.email,
-                dni=persona_db.dni,
-                telefono=persona_db.telefono,
-                fecha_nacimiento=persona_db.fecha_nacimiento,
-                habilitado=persona_db.habilitado,
-                edad=edad_calculada
-            ))
-        return lista_de_personas
+        try:
+            personas = crud.get_personas_filas(db, limit=limit + 1, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        personas = _recortar_pagina(personas, limit, crud.cursor_persona, response)
+        filas = [
+            {**persona._mapping, "edad": services.calcular_edad(persona.fecha_nacimiento)}
+            for persona in personas
+        ]
+        return lista_json(PERSONAS_OUT, filas, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.get("/personas/{persona_id}", response_model=schemas.PersonaOut)
-def obtener_persona(persona_id: int, db: Session = Depends(get_db)):
+def obtener_persona(
+    persona_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db_lectura)
+):
     try:
         persona_obtenida = crud.get_persona(db, persona_id)
         if not persona_obtenida:
             raise HTTPException(status_code=404, detail="Persona no encontrada")
         edad_calculada = services.calcular_edad(persona_obtenida.fecha_nacimiento)
+
+        etag = http_cache.etag(
+            persona_obtenida.id, persona_obtenida.nombre, persona_obtenida.email, persona_obtenida.dni,
+            persona_obtenida.telefono, persona_obtenida.fecha_nacimiento, persona_obtenida.habilitado,
+            edad_calculada
+        )
+        if http_cache.coincide(if_none_match, etag):
+            return http_cache.no_modificado(etag, http_cache.CACHE_CONTROL_ACTUAL)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = http_cache.CACHE_CONTROL_ACTUAL
+
         return schemas.PersonaOut(
             id=persona_obtenida.id,
             nombre=persona_obtenida.nombre,
@@ -125,12 +247,26 @@ def eliminar_persona(persona_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.get("/turnos-disponibles")
-def turnos_disponibles(fecha: str, db: Session = Depends(get_db)):
+def turnos_disponibles(
+    fecha: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db_lectura)
+):
     try:
         try:
             fecha_obj = date.fromisoformat(fecha)
         except Exception:
             raise HTTPException(status_code=400, detail="Fecha inválida. Formato esperado: YYYY-MM-DD")
+
+        # La ETag sale del bitmap de ocupación de la fecha
+        etag = http_cache.etag(fecha_obj, services.ocupacion_fecha(db, fecha_obj), *settings.HORARIOS_VALIDOS)
+        politica = http_cache.cache_control(fecha_obj)
+        if http_cache.coincide(if_none_match, etag):
+            return http_cache.no_modificado(etag, politica)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = politica
+
         disponibles = services.turnos_disponibles(db, fecha_obj)
         return {"fecha": fecha_obj, "horarios_disponibles": disponibles}
     except HTTPException:
@@ -138,6 +274,30 @@ def turnos_disponibles(fecha: str, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
+@app.get("/turnos-disponibles/calendario")
+def calendario_turnos_disponibles(desde: str, hasta: str, db: Session = Depends(get_db_lectura)):
+    """
+    Horarios disponibles de cada día entre desde y hasta (inclusive), resuelto con una
+    sola consulta. El rango máximo es settings.MAX_DIAS_CALENDARIO días (62 por defecto).
+    """
+    try:
+        try:
+            fecha_desde = date.fromisoformat(desde)
+            fecha_hasta = date.fromisoformat(hasta)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD.")
+
+        try:
+            dias = services.calendario_disponibles(db, fecha_desde, fecha_hasta)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return {"desde": fecha_desde, "hasta": fecha_hasta, "dias": dias}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
 @app.post("/turnos", response_model=schemas.TurnoOut)
 def crear_turno(turno: schemas.TurnoCreateConDNI, db: Session = Depends(get_db)):
     try:
@@ -166,42 +326,83 @@ def crear_turno(turno: schemas.TurnoCreateConDNI, db: Session = Depends(get_db))
         )
     except HTTPException:
         raise
+    except crud.HorarioOcupado as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@app.post("/turnos/lote", response_model=schemas.TurnoLoteOut)
+def crear_turnos_lote(turnos: list[schemas.TurnoCreateConDNI], db: Session = Depends(get_db)):
+    """
+    Crea varios turnos en un solo pedido. Cada turno se valida igual que en POST /turnos
+    y además se rechaza si su horario ya está ocupado (en la base o por un turno
+    anterior del mismo lote). Los aceptados se guardan juntos en una transacción.
+    """
+    try:
+        if len(turnos) > settings.MAX_TURNOS_LOTE:
+            raise HTTPException(status_code=400, detail=f"El lote no puede superar los {settings.MAX_TURNOS_LOTE} turnos")
+
+        resultados = services.crear_turnos_lote(db, turnos)
+        aceptados = sum(1 for r in resultados if r["aceptado"])
+        return {
+            "aceptados": aceptados,
+            "rechazados": len(resultados) - aceptados,
+            "resultados": resultados
+        }
+    except HTTPException:
+        raise
+    except crud.HorarioOcupado as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.get("/turnos", response_model=list[schemas.TurnoOut])
-def listar_turnos(db: Session = Depends(get_db)):
+def listar_turnos(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db_lectura)
+):
     try:
-        turnos_db = crud.get_turnos(db)
-        lista_de_turnos = []
-        for turno in turnos_db:
-            persona = crud.get_persona(db, turno.persona_id)
-            lista_de_turnos.append(schemas.TurnoOut(
-                id=turno.id,
-                fecha=turno.fecha,
-                hora=turno.hora,
-                estado=turno.estado,
-                persona_id=turno.persona_id,
-                dni=persona.dni
-            ))
-        return lista_de_turnos
+        try:
+            turnos = crud.get_turnos_filas(db, limit=limit + 1, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        turnos = _recortar_pagina(turnos, limit, crud.cursor_turno, response)
+        return lista_json(TURNOS_OUT, turnos, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.get("/turnos/{turno_id}", response_model=schemas.TurnoOut)
-def obtener_turno(turno_id: int, db: Session = Depends(get_db)):
+def obtener_turno(
+    turno_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db_lectura)
+):
     try:
         turno_obtenido = crud.get_turno(db, turno_id)
         if not turno_obtenido:
             raise HTTPException(status_code=404, detail="Turno no encontrado")
-        persona = crud.get_persona(db, turno_obtenido.persona_id)
+
+        etag = http_cache.etag(
+            turno_obtenido.id, turno_obtenido.fecha, turno_obtenido.hora, turno_obtenido.estado,
+            turno_obtenido.persona_id, turno_obtenido.persona.dni
+        )
+        if http_cache.coincide(if_none_match, etag):
+            return http_cache.no_modificado(etag, http_cache.CACHE_CONTROL_ACTUAL)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = http_cache.CACHE_CONTROL_ACTUAL
+
         return schemas.TurnoOut(
             id=turno_obtenido.id,
             fecha=turno_obtenido.fecha,
             hora=turno_obtenido.hora,
             estado=turno_obtenido.estado,
             persona_id=turno_obtenido.persona_id,
-            dni=persona.dni
+            dni=turno_obtenido.persona.dni
         )
     except HTTPException:
         raise
@@ -235,6 +436,8 @@ def actualizar_turno(turno_id: int, turno_up: schemas.TurnoUpdate, db: Session =
         )
     except HTTPException:
         raise
+    except crud.HorarioOcupado as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
@@ -257,14 +460,13 @@ def cancelar_turno(turno_id: int, db: Session = Depends(get_db)):
         if not turno_actualizado:
             raise HTTPException(status_code=500, detail="Error al actualizar turno")
         
-        persona = crud.get_persona(db, turno_actualizado.persona_id)
         return schemas.TurnoOut(
             id=turno_actualizado.id,
             fecha=turno_actualizado.fecha,
             hora=turno_actualizado.hora,
             estado=turno_actualizado.estado,
             persona_id=turno_actualizado.persona_id,
-            dni=persona.dni
+            dni=turno_actualizado.persona.dni
         )
     except HTTPException:
         raise
@@ -291,14 +493,13 @@ def confirmar_turno(turno_id: int, db: Session = Depends(get_db)):
         if not turno_actualizado:
             raise HTTPException(status_code=500, detail="Error al actualizar el turno")
         
-        persona = crud.get_persona(db, turno_actualizado.persona_id)
         return schemas.TurnoOut(
             id=turno_actualizado.id,
             fecha=turno_actualizado.fecha,
             hora=turno_actualizado.hora,
             estado=turno_actualizado.estado,
             persona_id=turno_actualizado.persona_id,
-            dni=persona.dni
+            dni=turno_actualizado.persona.dni
         )
     except HTTPException:
         raise
@@ -306,8 +507,8 @@ def confirmar_turno(turno_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.get("/reportes/turnos-por-fecha")
-def turnos_por_fecha(fecha: date, db: Session = Depends(get_db)):
-    try:
+def turnos_por_fecha(fecha: date, db: Session = Depends(get_db_lectura)):
+    def calcular():
         turnos = crud.get_turnos_por_fecha(db, fecha)
 
         if not turnos:
@@ -333,6 +534,9 @@ def turnos_por_fecha(fecha: date, db: Session = Depends(get_db)):
 
         return list(resultado.values())
 
+    try:
+        return RespuestaJSON(cache_reportes.obtener_o_calcular("turnos-por-fecha", {"fecha": fecha}, calcular))
+
     except HTTPException:
         raise
     except Exception as e:
@@ -341,32 +545,37 @@ def turnos_por_fecha(fecha: date, db: Session = Depends(get_db)):
 @app.get("/reportes/turnos-cancelados-por-mes")
 def turnos_cancelados_por_mes(
     mes: int = Query(None, ge=1, le=12, description="Número del mes (1-12)"),
-    anio: int = Query(None, ge=2022, le=2026, description="Año (ej. 2025)"),
-    db: Session = Depends(get_db)
+    anio: int = Query(None, ge=settings.ANIO_REPORTES_MIN, le=settings.ANIO_REPORTES_MAX, description="Año (ej. 2025)"),
+    db: Session = Depends(get_db_lectura)
 ):
     try:
         hoy = date.today()
         mes = mes or hoy.month
         anio = anio or hoy.year
 
-        turnos = crud.get_turnos_cancelados_por_mes(db, anio, mes)
-        nombre_mes = services.nombre_mes(mes).capitalize()
+        def calcular():
+            turnos = crud.get_turnos_cancelados_por_mes(db, anio, mes)
+            nombre_mes = services.nombre_mes(mes).capitalize()
+
+            return {
+                "anio": anio,
+                "mes": nombre_mes,
+                "cantidad": len(turnos),
+                "turnos": [
+                    {
+                        "id": t.id,
+                        "persona_id": t.persona_id,
+                        "fecha": t.fecha,
+                        "hora": t.hora,
+                        "estado": t.estado,
+                    }
+                    for t in turnos
+                ],
+            }
 
-        return {
-            "anio": anio,
-            "mes": nombre_mes,
-            "cantidad": len(turnos),
-            "turnos": [
-                {
-                    "id": t.id,
-                    "persona_id": t.persona_id,
-                    "fecha": t.fecha,
-                    "hora": t.hora,
-                    "estado": t.estado,
-                }
-                for t in turnos
-            ],
-        }
+        return RespuestaJSON(cache_reportes.obtener_o_calcular(
+            "turnos-cancelados-por-mes", {"anio": anio, "mes": mes}, calcular
+        ))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
@@ -375,7 +584,8 @@ def turnos_por_persona(
     dni: str,
     page: int = Query(1, ge=1),
     size: int = Query(5, ge=1, le=20),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la respuesta anterior (reemplaza a page)"),
+    db: Session = Depends(get_db_lectura)
 ):
     try:
         persona = crud.get_persona_por_dni(db, dni)
@@ -384,15 +594,23 @@ def turnos_por_persona(
 
         skip = (page - 1) * size
 
-        turnos_paginados = crud.get_turnos_por_persona_paginado(
-            db, persona.id, skip=skip, limit=size
-        )
+        try:
+            # Una fila de más: si aparece, hay página siguiente
+            turnos_paginados = crud.get_turnos_por_persona_paginado(
+                db, persona.id, skip=skip, limit=size + 1, cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        siguiente_cursor = None
+        if len(turnos_paginados) > size:
+            turnos_paginados = turnos_paginados[:size]
+            siguiente_cursor = crud.cursor_turno(turnos_paginados[-1].Turno)
 
         total_turnos = db.query(models.Turno).filter(
             models.Turno.persona_id == persona.id
         ).count()
 
-        return {
+        respuesta = {
             "persona": {
                 "id": persona.id,
                 "nombre": persona.nombre,
@@ -402,6 +620,7 @@ def turnos_por_persona(
             "tamanio": size,
             "total": total_turnos,
             "total_paginas": (total_turnos + size - 1) // size,
+            "siguiente_cursor": siguiente_cursor,
             "turnos": [
                 {
                     "id": t.Turno.id,
@@ -412,6 +631,10 @@ def turnos_por_persona(
                 for t in turnos_paginados
             ],
         }
+        if cursor is not None:
+            # Paginando por cursor el número de página no significa nada
+            del respuesta["pagina"]
+        return RespuestaJSON(respuesta)
 
     except HTTPException:
         raise
@@ -419,51 +642,37 @@ def turnos_por_persona(
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.get("/reportes/turnos-cancelados")
-def reportes_turnos_cancelados(min: int = 5, page: int = 1, db: Session = Depends(get_db)):
-    try:
-        
-        turnos_cancelados = (
-            db.query(models.Turno)
-            .filter(models.Turno.estado == settings.ESTADO_CANCELADO)
-            .order_by(models.Turno.fecha)
-            .all()
+def reportes_turnos_cancelados(min: int = 5, page: int = 1, db: Session = Depends(get_db_lectura)):
+    por_pagina = 5
+
+    def calcular():
+        total, personas_pagina = crud.get_personas_con_cancelados(
+            db, min, skip=(page - 1) * por_pagina, limit=por_pagina
         )
+        total_paginas = (total + por_pagina - 1) // por_pagina
 
         personas_dict = {}
-        for turno in turnos_cancelados:
-            persona = crud.get_persona(db, turno.persona_id)
-
-            if persona.id not in personas_dict:
-                personas_dict[persona.id] = {
-                    "id": persona.id,
-                    "nombre": persona.nombre,
-                    "dni": persona.dni,
-                    "email": persona.email,
-                    "telefono": persona.telefono,
-                    "cantidad_cancelados": 0,
-                    "detalle_turnos_cancelados": []
-                }
+        for persona, cantidad in personas_pagina:
+            personas_dict[persona.id] = {
+                "id": persona.id,
+                "nombre": persona.nombre,
+                "dni": persona.dni,
+                "email": persona.email,
+                "telefono": persona.telefono,
+                "cantidad_cancelados": cantidad,
+                "detalle_turnos_cancelados": []
+            }
 
-            personas_dict[persona.id]["cantidad_cancelados"] += 1
-            personas_dict[persona.id]["detalle_turnos_cancelados"].append({
+        # Solo se cargan los cancelados de las personas de esta página
+        for turno in crud.get_turnos_cancelados_de_personas(db, list(personas_dict)):
+            personas_dict[turno.persona_id]["detalle_turnos_cancelados"].append({
                 "id": turno.id,
                 "fecha": turno.fecha,
                 "hora": turno.hora,
                 "estado": turno.estado
             })
 
-        resultado = [
-            data for data in personas_dict.values()
-            if data["cantidad_cancelados"] >= min
-        ]
-
-        por_pagina = 5
-        total = len(resultado)
-        total_paginas = (total + por_pagina - 1) // por_pagina
-
-        inicio = (page - 1) * por_pagina
-        fin = inicio + por_pagina
-        resultados_paginados = resultado[inicio:fin]
+        resultados_paginados = list(personas_dict.values())
 
         return {
             "total": total,
@@ -473,6 +682,9 @@ def reportes_turnos_cancelados(min: int = 5, page: int = 1, db: Session = Depend
             "resultados": resultados_paginados
         }
 
+    try:
+        return RespuestaJSON(cache_reportes.obtener_o_calcular("turnos-cancelados", {"min": min, "page": page}, calcular))
+
     except HTTPException:
         raise
     except Exception as e:
@@ -487,7 +699,7 @@ def reportes_turnos_confirmados_periodos(
     hasta: str,
     pagina: int = 1,
     por_pagina: int = 5,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     try:
         # Validar formato de fechas
@@ -497,23 +709,21 @@ def reportes_turnos_confirmados_periodos(
         except Exception:
             raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD.")
 
-        # Obtener lista de turnos confirmados usando services.py
+        # Obtener la página de turnos confirmados (paginada en la base) usando services.py
         try:
-            turnos_confirmados = services.obtener_turnos_confirmados_periodos(db, fecha_desde, fecha_hasta)
+            total, turnos_pagina = services.obtener_turnos_confirmados_periodos(
+                db, fecha_desde, fecha_hasta, skip=(pagina - 1) * por_pagina, limit=por_pagina
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
         # Paginación
-        total = len(turnos_confirmados)
         total_paginas = (total + por_pagina - 1) // por_pagina
-        inicio = (pagina - 1) * por_pagina
-        fin = inicio + por_pagina
-        turnos_pagina = turnos_confirmados[inicio:fin]
 
        
         resultados = []
         for turno in turnos_pagina:
-            persona = crud.get_persona(db, turno.persona_id)
+            persona = turno.persona
             resultados.append({
                 "id": turno.id,
                 "fecha": turno.fecha,
@@ -527,13 +737,13 @@ def reportes_turnos_confirmados_periodos(
                 }
             })
 
-        return {
+        return RespuestaJSON({
             "total": total,
             "pagina_actual": pagina,
             "por_pagina": por_pagina,
             "total_paginas": total_paginas,
             "resultados": resultados
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -543,10 +753,9 @@ def reportes_turnos_confirmados_periodos(
 def reporte_estado_personas(
     pagina: int = 1,
     por_pagina: int = 5,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
-    try:
-        
+    def calcular():
         personas = crud.get_personas(db)
         total = len(personas)
 
@@ -555,21 +764,7 @@ def reporte_estado_personas(
         fin = inicio + por_pagina
         personas_pagina = personas[inicio:fin]
 
-        resultado = []
-        for persona in personas_pagina:
-            puede_sacar = services.puede_sacar_turno(db, persona.id)
-            estado = "habilitado" if persona.habilitado and puede_sacar else "inhabilitado"
-
-            resultado.append({
-                "id": persona.id,
-                "nombre": persona.nombre,
-                "dni": persona.dni,
-                "email": persona.email,
-                "telefono": persona.telefono,
-                "habilitado": persona.habilitado,
-                "puede_sacar_turno": puede_sacar,
-                "estado_general": estado
-            })
+        resultado = services.estado_personas(db, personas_pagina)
 
         return {
             "total": total,
@@ -579,6 +774,11 @@ def reporte_estado_personas(
             "resultados": resultado
         }
 
+    try:
+        # El estado depende de la ventana de 6 meses hacia atrás desde hoy
+        parametros = {"pagina": pagina, "por_pagina": por_pagina, "hoy": date.today()}
+        return RespuestaJSON(cache_reportes.obtener_o_calcular("estado-personas", parametros, calcular))
+
     except HTTPException:
         raise
     except Exception as e:
@@ -587,9 +787,17 @@ def reporte_estado_personas(
             detail=f"Error interno del servidor: {str(e)}"
         )    
     
+@app.get("/reportes/cache")
+def estadisticas_cache_reportes():
+    """Hits, misses y evictions de la cache de reportes JSON"""
+    try:
+        return cache_reportes.estadisticas()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
 #Reportes PDF - CSV
 @app.get("/reportes/csv/turnos-por-fecha")
-def reporte_csv_turnos_fecha(fecha: date, pagina: int = Query(1, ge=1), cantidad: int = Query(10, ge=1), db: Session = Depends(get_db)):
+def reporte_csv_turnos_fecha(fecha: date, pagina: int = Query(1, ge=1), cantidad: int = Query(10, ge=1), db: Session = Depends(get_db_lectura)):
     try:
         skip_calculado = (pagina - 1) * cantidad
         # Reutilizamos la query existente en crud
@@ -598,10 +806,10 @@ def reporte_csv_turnos_fecha(fecha: date, pagina: int = Query(1, ge=1), cantidad
             raise HTTPException(status_code=404, detail="No hay turnos para esa fecha")
         
         # Generamos el CSV usando services
-        csv_buffer = services.generar_csv_turnos_fecha(turnos)
+        csv_stream = services.generar_csv_turnos_fecha(turnos)
         
         # Devolvemos StreamingResponse para descargar el archivo
-        response = StreamingResponse(iter([csv_buffer.getvalue()]), media_type="text/csv")
+        response = StreamingResponse(csv_stream, media_type="text/csv")
         response.headers["Content-Disposition"] = f"attachment; filename=turnos_{fecha}_pagina{pagina}.csv"
         return response
 
@@ -610,18 +818,31 @@ def reporte_csv_turnos_fecha(fecha: date, pagina: int = Query(1, ge=1), cantidad
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generando CSV: {str(e)}")
 
+# Los GET de PDF arman el documento en el hilo del threadpool que atiende el pedido y
+# lo ocupan mientras dura el armado (salvo que el PDF ya esté en almacen_artefactos).
+# Para reportes grandes, como los completos, está POST /reportes/jobs, que los arma en
+# otro proceso.
 @app.get("/reportes/pdf/turnos-por-fecha")
-def reporte_pdf_turnos_fecha(fecha: date, pagina: int = Query(1, ge=1), cantidad: int = Query(10, ge=1),  db: Session = Depends(get_db)):
+def reporte_pdf_turnos_fecha(
+    fecha: date,
+    pagina: int = Query(1, ge=1),
+    cantidad: int = Query(10, ge=1),
+    completo: bool = Query(False, description="Todo el día en un solo documento (ignora pagina y cantidad)"),
+    db: Session = Depends(get_db_lectura)
+):
     try:
-        skip_calculado = (pagina - 1) * cantidad
-        
-        turnos = crud.get_turnos_por_fecha(db, fecha, skip=skip_calculado, limit=cantidad)
+        if completo:
+            turnos = crud.get_turnos_por_fecha(db, fecha)
+        else:
+            skip_calculado = (pagina - 1) * cantidad
+            turnos = crud.get_turnos_por_fecha(db, fecha, skip=skip_calculado, limit=cantidad)
         if not turnos:
             raise HTTPException(status_code=404, detail="No hay turnos para esa fecha")
         
         pdf_buffer = services.generar_pdf_turnos_fecha(turnos, fecha)
         
-        headers = {'Content-Disposition': f'attachment; filename="turnos_{fecha}_pagina{pagina}.pdf"'}
+        sufijo = "" if completo else f"_pagina{pagina}"
+        headers = {'Content-Disposition': f'attachment; filename="turnos_{fecha}{sufijo}.pdf"'}
         return Response(content=pdf_buffer.getvalue(), headers=headers, media_type='application/pdf')
 
     except HTTPException:
@@ -632,24 +853,28 @@ def reporte_pdf_turnos_fecha(fecha: date, pagina: int = Query(1, ge=1), cantidad
 @app.get("/reportes/pdf/turnos-cancelados-por-mes")
 def reporte_pdf_turnos_cancelados_mes(
     mes: int = Query(None, ge=1, le=12),
-    anio: int = Query(None, ge=2022, le=2026),
+    anio: int = Query(None, ge=settings.ANIO_REPORTES_MIN, le=settings.ANIO_REPORTES_MAX),
     pagina: int = Query(1, ge=1),
     cantidad: int = Query(10, ge=1),
-    db: Session = Depends(get_db)
+    completo: bool = Query(False, description="Todo el mes en un solo documento (ignora pagina y cantidad)"),
+    db: Session = Depends(get_db_lectura)
 ):
     try:
         hoy = date.today()
         mes = mes or hoy.month
         anio = anio or hoy.year
         
-        skip_calculado = (pagina - 1) * cantidad
-
-        turnos = crud.get_turnos_cancelados_por_mes(db, anio, mes, skip=skip_calculado, limit=cantidad)
+        if completo:
+            turnos = crud.get_turnos_cancelados_por_mes(db, anio, mes)
+        else:
+            skip_calculado = (pagina - 1) * cantidad
+            turnos = crud.get_turnos_cancelados_por_mes(db, anio, mes, skip=skip_calculado, limit=cantidad)
         nombre_mes = services.nombre_mes(mes).capitalize()
 
         pdf_buffer = services.generar_pdf_cancelados_mes(turnos, nombre_mes, anio)
 
-        headers = {'Content-Disposition': f'attachment; filename="cancelados_{nombre_mes}_{anio}_pagina{pagina}.pdf"'}
+        sufijo = "" if completo else f"_pagina{pagina}"
+        headers = {'Content-Disposition': f'attachment; filename="cancelados_{nombre_mes}_{anio}{sufijo}.pdf"'}
         return Response(content=pdf_buffer.getvalue(), headers=headers, media_type='application/pdf')
 
     except Exception as e:
@@ -658,25 +883,29 @@ def reporte_pdf_turnos_cancelados_mes(
 @app.get("/reportes/csv/turnos-cancelados-por-mes")
 def turnos_cancelados_por_mes_csv(
     mes: int = Query(None, ge=1, le=12, description="Número del mes (1-12)"),
-    anio: int = Query(None, ge=2022, le=2026, description="Año (ej. 2025)"),
-    db: Session = Depends(get_db)
+    anio: int = Query(None, ge=settings.ANIO_REPORTES_MIN, le=settings.ANIO_REPORTES_MAX, description="Año (ej. 2025)"),
+    db: Session = Depends(get_db_lectura)
 ):
     try:
         hoy = date.today()
         mes = mes or hoy.month
         anio = anio or hoy.year
 
-        # Obtener turnos
-        turnos = crud.get_turnos_cancelados_por_mes(db, anio, mes)
         nombre_mes_str = services.nombre_mes(mes).capitalize()
 
-        # Generar CSV
-        csv_buffer = services.generar_csv_turnos_cancelados_mes(turnos, nombre_mes_str, anio)
+        # Generar CSV a medida que se leen los turnos
+        csv_stream = _stream_con_sesion(
+            lambda sesion: services.generar_csv_turnos_cancelados_mes(
+                crud.iterar_en_lotes(crud.query_turnos_cancelados_por_mes(sesion, anio, mes)),
+                nombre_mes_str,
+                anio
+            )
+        )
 
         # Devolver CSV como streaming
         filename = f"turnos_cancelados_{nombre_mes_str}_{anio}.csv"
         return StreamingResponse(
-            iter([csv_buffer.getvalue()]),
+            csv_stream,
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -692,7 +921,7 @@ def turnos_por_persona_pdf(
     dni: str,
     page: int = Query(1, ge=1),
     size: int = Query(5, ge=1, le=20),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     try:
         persona = crud.get_persona_por_dni(db, dni)
@@ -746,7 +975,7 @@ def turnos_por_persona_csv(
     dni: str,
     page: int = Query(1, ge=1),
     size: int = Query(5, ge=1, le=20),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     try:
         persona = crud.get_persona_por_dni(db, dni)
@@ -768,7 +997,7 @@ def turnos_por_persona_csv(
 
         total_paginas = (total_turnos + size - 1) // size
 
-        csv_buffer = services.generar_csv_turnos_persona_paginado(
+        csv_stream = services.generar_csv_turnos_persona_paginado(
             turnos=turnos_paginados,
             persona=persona,
             pagina=page,
@@ -778,7 +1007,7 @@ def turnos_por_persona_csv(
         )
 
         return StreamingResponse(
-            iter([csv_buffer.getvalue()]),
+            csv_stream,
             media_type="text/csv",
             headers={
                 "Content-Disposition":
@@ -795,7 +1024,7 @@ def turnos_por_persona_csv(
         )
     
 @app.get("/reportes/turnos-cancelados/pdf")
-async def reporte_pdf_turnos_cancelados(db: Session = Depends(get_db)):
+def reporte_pdf_turnos_cancelados(db: Session = Depends(get_db_lectura)):
     try:
         turnos = (
             db.query(models.Turno)
@@ -803,10 +1032,7 @@ async def reporte_pdf_turnos_cancelados(db: Session = Depends(get_db)):
             .all()
         )
 
-        pdf_buffer = await asyncio.to_thread(
-            services.generar_pdf_turnos_cancelados,
-            turnos
-        )
+        pdf_buffer = services.generar_pdf_turnos_cancelados(turnos)
 
         headers = {"Content-Disposition": 'attachment; filename="turnos_cancelados.pdf"'}
         return Response(
@@ -822,21 +1048,19 @@ async def reporte_pdf_turnos_cancelados(db: Session = Depends(get_db)):
         )
     
 @app.get("/reportes/turnos-cancelados/csv")
-def reporte_csv_turnos_cancelados(db: Session = Depends(get_db)):
+def reporte_csv_turnos_cancelados(db: Session = Depends(get_db_lectura)):
     try:
-        turnos = (
-            db.query(models.Turno)
-            .filter(models.Turno.estado == settings.ESTADO_CANCELADO)
-            .all()
-        )
-
-        if not turnos:
+        if not crud.query_turnos_cancelados(db).first():
             raise HTTPException(status_code=404, detail="No hay turnos cancelados")
 
-        csv_buffer = services.generar_csv_turnos_cancelados(turnos)
+        csv_stream = _stream_con_sesion(
+            lambda sesion: services.generar_csv_turnos_cancelados(
+                crud.iterar_en_lotes(crud.query_turnos_cancelados(sesion))
+            )
+        )
 
         response = StreamingResponse(
-            iter([csv_buffer.getvalue()]),
+            csv_stream,
             media_type="text/csv"
         )
         response.headers["Content-Disposition"] = "attachment; filename=turnos_cancelados.csv"
@@ -851,27 +1075,12 @@ def reporte_csv_turnos_cancelados(db: Session = Depends(get_db)):
         )    
     
 @app.get("/reportes/estado-personas/pdf")
-async def reporte_pdf_estado_personas(db: Session = Depends(get_db)):
+def reporte_pdf_estado_personas(db: Session = Depends(get_db_lectura)):
     try:
         personas = crud.get_personas(db)
-        resultado = []
-
-        for persona in personas:
-            puede_sacar = services.puede_sacar_turno(db, persona.id)
-            estado = "habilitado" if persona.habilitado and puede_sacar else "inhabilitado"
-
-            resultado.append({
-                "id": persona.id,
-                "nombre": persona.nombre,
-                "dni": persona.dni,
-                "email": persona.email,
-                "estado_general": estado
-            })
+        resultado = services.estado_personas(db, personas)
 
-        pdf_buffer = await asyncio.to_thread(
-            services.generar_pdf_estado_personas,
-            resultado
-        )
+        pdf_buffer = services.generar_pdf_estado_personas(resultado)
 
         headers = {"Content-Disposition": 'attachment; filename="estado_personas.pdf"'}
         return Response(
@@ -891,7 +1100,7 @@ async def reporte_pdf_estado_personas(db: Session = Depends(get_db)):
 def reporte_csv_estado_personas(
     pagina: int = Query(1, ge=1),
     por_pagina: int = Query(5, ge=1),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Endpoint para descargar reporte de estado de personas en formato CSV
@@ -906,27 +1115,13 @@ def reporte_csv_estado_personas(
         fin = inicio + por_pagina
         personas_pagina = personas[inicio:fin]
         
-        resultado = []
-        for persona in personas_pagina:
-            puede_sacar = services.puede_sacar_turno(db, persona.id)
-            estado = "habilitado" if persona.habilitado and puede_sacar else "inhabilitado"
-            
-            resultado.append({
-                "id": persona.id,
-                "nombre": persona.nombre,
-                "dni": persona.dni,
-                "email": persona.email,
-                "telefono": persona.telefono,
-                "habilitado": persona.habilitado,
-                "puede_sacar_turno": puede_sacar,
-                "estado_general": estado
-            })
+        resultado = services.estado_personas(db, personas_pagina)
         
         # Generar CSV usando la nueva función
-        csv_buffer = services.generar_csv_estado_personas(resultado, pagina, total_paginas)
+        csv_stream = services.generar_csv_estado_personas(resultado, pagina, total_paginas)
         
         response = StreamingResponse(
-            iter([csv_buffer.getvalue()]),
+            csv_stream,
             media_type="text/csv"
         )
         response.headers["Content-Disposition"] = f"attachment; filename=estado_personas_pagina_{pagina}.csv"
@@ -942,12 +1137,12 @@ def reporte_csv_estado_personas(
 
 
 @app.get("/reportes/turnos-confirmados-periodos/pdf")
-def reporte_pdf_turnos_confirmados_periodos(  # ← QUITAR 'async'
+def reporte_pdf_turnos_confirmados_periodos(
     desde: str,
     hasta: str,
     pagina: int = Query(1, ge=1),
     por_pagina: int = Query(5, ge=1),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Endpoint para descargar reporte de turnos confirmados en formato PDF
@@ -960,35 +1155,20 @@ def reporte_pdf_turnos_confirmados_periodos(  # ← QUITAR 'async'
         except Exception:
             raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD.")
         
-        # Obtener turnos confirmados
+        # Obtener la página de turnos confirmados
         try:
-            turnos_confirmados = services.obtener_turnos_confirmados_periodos(db, fecha_desde, fecha_hasta)
+            total, turnos_pagina = services.obtener_turnos_confirmados_periodos(
+                db, fecha_desde, fecha_hasta, skip=(pagina - 1) * por_pagina, limit=por_pagina
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         
         # Paginación
-        total = len(turnos_confirmados)
         total_paginas = (total + por_pagina - 1) // por_pagina
-        inicio = (pagina - 1) * por_pagina
-        fin = inicio + por_pagina
-        turnos_pagina = turnos_confirmados[inicio:fin]
         
         # Preparar datos para el PDF
-        resultados = []
-        for turno in turnos_pagina:
-            persona = crud.get_persona(db, turno.persona_id)
-            resultados.append({
-                "id": turno.id,
-                "fecha": turno.fecha,
-                "hora": turno.hora,
-                "estado": turno.estado,
-                "persona_id": turno.persona_id,
-                "nombre_persona": persona.nombre,
-                "dni_persona": persona.dni,
-                "email_persona": persona.email
-            })
+        resultados = services.filas_turnos_confirmados(turnos_pagina)
         
-        # CORRECCIÓN: Generar PDF directamente, SIN asyncio.to_thread
         pdf_buffer = services.generar_pdf_turnos_confirmados_periodos(
             resultados, fecha_desde, fecha_hasta, pagina, total_paginas, total
         )
@@ -1014,7 +1194,7 @@ def reporte_csv_turnos_confirmados_periodos(
     hasta: str,
     pagina: int = Query(1, ge=1),
     por_pagina: int = Query(5, ge=1),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Endpoint para descargar reporte de turnos confirmados en formato CSV
@@ -1027,41 +1207,27 @@ def reporte_csv_turnos_confirmados_periodos(
         except Exception:
             raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD.")
         
-        # Obtener turnos confirmados (misma lógica que el endpoint JSON)
+        # Obtener la página de turnos confirmados (misma lógica que el endpoint JSON)
         try:
-            turnos_confirmados = services.obtener_turnos_confirmados_periodos(db, fecha_desde, fecha_hasta)
+            total, turnos_pagina = services.obtener_turnos_confirmados_periodos(
+                db, fecha_desde, fecha_hasta, skip=(pagina - 1) * por_pagina, limit=por_pagina
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         
         # Paginación (misma lógica que el endpoint JSON)
-        total = len(turnos_confirmados)
         total_paginas = (total + por_pagina - 1) // por_pagina
-        inicio = (pagina - 1) * por_pagina
-        fin = inicio + por_pagina
-        turnos_pagina = turnos_confirmados[inicio:fin]
         
         # Preparar datos para el CSV (similar al endpoint JSON)
-        resultados = []
-        for turno in turnos_pagina:
-            persona = crud.get_persona(db, turno.persona_id)
-            resultados.append({
-                "id": turno.id,
-                "fecha": turno.fecha,
-                "hora": turno.hora,
-                "estado": turno.estado,
-                "persona_id": turno.persona_id,
-                "nombre_persona": persona.nombre,
-                "dni_persona": persona.dni,
-                "email_persona": persona.email
-            })
+        resultados = services.filas_turnos_confirmados(turnos_pagina)
         
         # Generar CSV usando función
-        csv_buffer = services.generar_csv_turnos_confirmados_periodos(
+        csv_stream = services.generar_csv_turnos_confirmados_periodos(
             resultados, fecha_desde, fecha_hasta, pagina, total_paginas, total
         )
         
         response = StreamingResponse(
-            iter([csv_buffer.getvalue()]),
+            csv_stream,
             media_type="text/csv"
         )
         response.headers["Content-Disposition"] = (
@@ -1072,4 +1238,59 @@ def reporte_csv_turnos_confirmados_periodos(
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generando CSV: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error generando CSV: {str(e)}")
+
+
+#Reportes asincrónicos
+@app.post("/reportes/jobs", status_code=202)
+def encolar_reporte(job: schemas.ReporteJobCreate):
+    """
+    Encola un reporte PDF/CSV completo para armarlo en segundo plano.
+    Devuelve el id del trabajo: consultar GET /reportes/jobs/{id} y, cuando esté
+    "listo", descargarlo de GET /reportes/jobs/{id}/descarga.
+    """
+    try:
+        try:
+            trabajo = cola_reportes.encolar(job.reporte, job.formato, job.parametros)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except ColaReportesLlena as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        return trabajo.resumen()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error encolando reporte: {str(e)}")
+
+@app.get("/reportes/jobs/{job_id}")
+def estado_reporte(job_id: str):
+    try:
+        trabajo = cola_reportes.obtener(job_id)
+        if not trabajo:
+            raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+        return trabajo.resumen()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@app.get("/reportes/jobs/{job_id}/descarga")
+def descargar_reporte(job_id: str):
+    try:
+        trabajo = cola_reportes.obtener(job_id)
+        if not trabajo:
+            raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+        estado = trabajo.estado
+        if estado == "error":
+            raise HTTPException(status_code=500, detail=f"Error generando reporte: {trabajo.resumen()['error']}")
+        if estado != "listo":
+            raise HTTPException(status_code=409, detail=f"El reporte todavía está '{estado}'")
+
+        contenido, nombre_archivo = trabajo.resultado()
+        headers = {"Content-Disposition": f'attachment; filename="{nombre_archivo}"'}
+        return Response(content=contenido, headers=headers, media_type=MEDIA_TYPES[trabajo.formato])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
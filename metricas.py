@@ -0,0 +1,316 @@
+"""
+Métricas de la API en el formato de texto de Prometheus (GET /metrics).
+
+Sin dependencias externas: contadores, medidores e histogramas en memoria del proceso,
+protegidos con un lock porque se actualizan desde el event loop y desde los hilos del
+threadpool. Las etiquetas solo toman valores de conjuntos acotados (rutas declaradas
+en la app, métodos HTTP, códigos de estado, nombres de pools y de funciones), nunca
+la URL cruda ni parámetros, para que la cantidad de series no crezca con el tráfico.
+"""
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+from starlette.routing import Match
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONEXION = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+METODOS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+SIN_RUTA = "sin_ruta"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _formatear(valor: float) -> str:
+    valor = float(valor)
+    if valor == float("inf"):
+        return "+Inf"
+    return str(int(valor)) if valor.is_integer() else repr(valor)
+
+
+class Registro:
+    """Conjunto de métricas que se exponen juntas"""
+
+    def __init__(self):
+        self._metricas = []
+
+    def agregar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exponer(self) -> str:
+        lineas = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.lineas())
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+        registro.agregar(self)
+
+    def _clave(self, valores: tuple) -> tuple:
+        if len(valores) != len(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+        return tuple(str(v) for v in valores)
+
+    def _etiquetas(self, clave: tuple, extra: str = "") -> str:
+        partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(self.etiquetas, clave)]
+        if extra:
+            partes.append(extra)
+        return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def incrementar(self, *valores, cantidad: float = 1):
+        clave = self._clave(valores)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def lineas(self) -> list:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f"{self.nombre}{self._etiquetas(clave)} {_formatear(valor)}" for clave, valor in valores]
+
+
+class Medidor(_Metrica):
+    """Valor que sube y baja. Con `funcion` se calcula en el momento de exponerlo"""
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (), funcion: Callable[[], float] = None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._funcion = funcion
+        if not self.etiquetas:
+            self._valores[()] = 0
+
+    def sumar(self, *valores, cantidad: float = 1):
+        clave = self._clave(valores)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def lineas(self) -> list:
+        if self._funcion is not None:
+            return [f"{self.nombre} {_formatear(self._funcion())}"]
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f"{self.nombre}{self._etiquetas(clave)} {_formatear(valor)}" for clave, valor in valores]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observar(self, valor: float, *valores):
+        clave = self._clave(valores)
+        with self._lock:
+            serie = self._valores.get(clave)
+            if serie is None:
+                # [cuenta por bucket (no acumulada)..., suma, cantidad]
+                serie = self._valores[clave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def lineas(self) -> list:
+        with self._lock:
+            valores = sorted((clave, list(serie)) for clave, serie in self._valores.items())
+        lineas = []
+        for clave, serie in valores:
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets, serie):
+                acumulado += cuenta
+                le = f'le="{_formatear(limite)}"'
+                lineas.append(f"{self.nombre}_bucket{self._etiquetas(clave, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{self._etiquetas(clave)} {_formatear(serie[-2])}")
+            lineas.append(f"{self.nombre}_count{self._etiquetas(clave)} {serie[-1]}")
+        return lineas
+
+
+# =========================================================================
+# MÉTRICAS DE LA API
+# =========================================================================
+
+def _threadpool(campo: str) -> Callable[[], float]:
+    # Hilos del threadpool de AnyIO donde corren los endpoints sync. Se lee desde el
+    # event loop (GET /metrics es async), que es donde la API de AnyIO está permitida
+    def leer() -> float:
+        from anyio.to_thread import current_default_thread_limiter
+        return getattr(current_default_thread_limiter().statistics(), campo)
+    return leer
+
+pedidos = Contador(
+    "http_requests_total", "Pedidos HTTP terminados por ruta y código de estado",
+    ("method", "route", "status")
+)
+latencia = Histograma(
+    "http_request_duration_seconds", "Duración de los pedidos HTTP, hasta el último byte de la respuesta",
+    ("method", "route")
+)
+pedidos_en_curso = Medidor("http_requests_in_flight", "Pedidos HTTP que se están atendiendo")
+hilos_en_uso = Medidor("threadpool_threads_in_use", "Hilos del threadpool ocupados", funcion=_threadpool("borrowed_tokens"))
+hilos_total = Medidor("threadpool_threads_total", "Tamaño del threadpool", funcion=_threadpool("total_tokens"))
+hilos_en_espera = Medidor(
+    "threadpool_tasks_waiting", "Endpoints sync esperando un hilo libre", funcion=_threadpool("tasks_waiting")
+)
+espera_conexion = Histograma(
+    "db_connection_checkout_seconds", "Tiempo hasta obtener una conexión del pool (incluye abrirla si hace falta)",
+    ("pool",), buckets=BUCKETS_CONEXION
+)
+tiempo_render = Histograma(
+    "report_render_seconds", "Tiempo de armado de cada PDF o CSV (en los CSV, sumando cada bloque entregado)",
+    ("function",)
+)
+
+
+def _ruta(scope) -> str:
+    """Plantilla de la ruta (/turnos/{turno_id}), no la URL pedida"""
+    ruta = scope.get("route")
+    if ruta is None:
+        # Respuestas que no llegaron al router (p. ej. un 304 del middleware de ETags)
+        app = scope.get("app")
+        for candidata in getattr(getattr(app, "router", None), "routes", ()):
+            coincidencia, _ = candidata.matches(scope)
+            if coincidencia == Match.FULL:
+                ruta = candidata
+                break
+    return getattr(ruta, "path", SIN_RUTA)
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI: cuenta pedidos en curso y, al terminar la respuesta (incluido el
+    cuerpo de un StreamingResponse), registra la duración y el código por ruta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        pedidos_en_curso.sumar()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            pedidos_en_curso.sumar(cantidad=-1)
+            metodo = scope["method"] if scope["method"] in METODOS else "OTRO"
+            ruta = _ruta(scope)
+            latencia.observar(time.perf_counter() - inicio, metodo, ruta)
+            pedidos.incrementar(metodo, ruta, estado)
+
+
+# Tiempos de render del bloque capturar_render() en curso, si lo hay
+_render_capturado: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("render_capturado", default=None)
+
+def _observar_render(duracion: float, nombre: str):
+    tiempo_render.observar(duracion, nombre)
+    capturado = _render_capturado.get()
+    if capturado is not None:
+        capturado.append((nombre, duracion))
+
+@contextmanager
+def capturar_render():
+    """
+    Junta en una lista los (función, segundos) que registra medir_render dentro del
+    bloque. Los procesos del pool de reportes la devuelven con el resultado: sus
+    métricas quedan en el proceso hijo y GET /metrics las expone el proceso de la API.
+    """
+    tiempos: List[Tuple[str, float]] = []
+    token = _render_capturado.set(tiempos)
+    try:
+        yield tiempos
+    finally:
+        _render_capturado.reset(token)
+
+def registrar_render(tiempos: Iterable[Tuple[str, float]]):
+    """Registra en este proceso los tiempos de render medidos en otro (ver capturar_render)"""
+    for nombre, duracion in tiempos:
+        tiempo_render.observar(duracion, nombre)
+
+
+def medir_render(funcion):
+    """
+    Decorador para los generar_pdf_* y generar_csv_* de services. Si la función
+    devuelve un iterador (CSV por streaming) se mide el tiempo dentro de cada next(),
+    no el que tarda el cliente en recibir los bloques.
+    """
+    nombre = funcion.__name__
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = funcion(*args, **kwargs)
+        if inspect.isgenerator(resultado):
+            return _iterar_midiendo(resultado, nombre, time.perf_counter() - inicio)
+        _observar_render(time.perf_counter() - inicio, nombre)
+        return resultado
+
+    return envoltura
+
+def _iterar_midiendo(bloques, nombre: str, acumulado: float):
+    try:
+        while True:
+            inicio = time.perf_counter()
+            try:
+                bloque = next(bloques)
+            except StopIteration:
+                return
+            finally:
+                acumulado += time.perf_counter() - inicio
+            yield bloque
+    finally:
+        bloques.close()
+        _observar_render(acumulado, nombre)
+
+
+class MedirEsperaConexion:
+    """
+    Mezcla para clases de pool de SQLAlchemy: registra cuánto tarda connect(), es
+    decir, la espera por una conexión libre. La etiqueta `pool` es el
+    pool_logging_name del engine.
+    """
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            espera_conexion.observar(time.perf_counter() - inicio, getattr(self, "logging_name", None) or "otro")
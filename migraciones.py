@@ -0,0 +1,126 @@
+"""
+Cambios de esquema sobre bases ya existentes.
+
+Base.metadata.create_all crea las tablas que faltan con todo lo que declaran los
+modelos, pero no modifica las que ya existen. Cada migración lleva una base creada
+con una versión anterior al esquema actual; PRAGMA user_version guarda cuántas se
+aplicaron. Todas deben poder correr sobre una base recién creada sin cambiar nada.
+"""
+import logging
+from sqlalchemy import exists, func, select, text, update
+from sqlalchemy.engine import Connection, Engine
+import models
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorMigracion(RuntimeError):
+    pass
+
+
+def _indice(nombre: str):
+    return next(i for i in models.Turno.__table__.indexes if i.name == nombre)
+
+def _cancelar_duplicados(conexion: Connection) -> int:
+    """En cada horario con más de un turno activo deja el más viejo (menor id) y cancela el resto"""
+    turnos = models.Turno.__table__
+    anterior = turnos.alias("anterior")
+    activo = turnos.c.estado != settings.ESTADO_CANCELADO
+    return conexion.execute(
+        update(turnos)
+        .where(
+            activo,
+            exists().where(
+                anterior.c.fecha == turnos.c.fecha,
+                anterior.c.hora == turnos.c.hora,
+                anterior.c.estado != settings.ESTADO_CANCELADO,
+                anterior.c.id < turnos.c.id,
+            ),
+        )
+        .values(estado=settings.ESTADO_CANCELADO)
+    ).rowcount
+
+def _horario_unico(conexion: Connection):
+    """Índice único parcial (fecha, hora) de los turnos no cancelados"""
+    turnos = models.Turno.__table__
+    duplicados = conexion.execute(
+        select(turnos.c.fecha, turnos.c.hora, func.count())
+        .where(turnos.c.estado != settings.ESTADO_CANCELADO)
+        .group_by(turnos.c.fecha, turnos.c.hora)
+        .having(func.count() > 1)
+        .order_by(turnos.c.fecha, turnos.c.hora)
+    ).all()
+    if duplicados and settings.MIGRACION_CANCELAR_DUPLICADOS:
+        cancelados = _cancelar_duplicados(conexion)
+        logger.warning("Se cancelaron %d turnos duplicados en %d horarios", cancelados, len(duplicados))
+    elif duplicados:
+        # Por defecto no se elige qué turno conservar: los tiene que cancelar o mover alguien
+        detalle = ", ".join(f"{fecha} {hora} ({cantidad})" for fecha, hora, cantidad in duplicados[:10])
+        raise ErrorMigracion(
+            f"Hay {len(duplicados)} horarios con más de un turno activo: {detalle}. "
+            "Cancelar o mover los turnos sobrantes y volver a iniciar, o iniciar con "
+            "MIGRACION_CANCELAR_DUPLICADOS=1 para cancelar los más nuevos de cada horario."
+        )
+    _indice("ux_turnos_horario_activo").create(conexion, checkfirst=True)
+
+
+def _indices_reportes(conexion: Connection):
+    """Índices (estado, fecha) y (persona_id, estado, fecha) de los reportes"""
+    _indice("ix_turnos_estado_fecha").create(conexion, checkfirst=True)
+    _indice("ix_turnos_persona_estado_fecha").create(conexion, checkfirst=True)
+
+
+def _hora_entera(conexion: Connection):
+    """turnos.hora pasa de texto "HH:MM" a minutos desde la medianoche (horarios.HoraSlot)"""
+    columnas = {fila[1]: fila[2] for fila in conexion.exec_driver_sql("PRAGMA table_info(turnos)")}
+    if "INT" in columnas["hora"].upper():
+        return
+
+    invalidas = conexion.exec_driver_sql(
+        "SELECT DISTINCT hora FROM turnos WHERE hora NOT GLOB '[0-2][0-9]:[0-5][0-9]' "
+        "OR CAST(substr(hora, 1, 2) AS INTEGER) > 23 LIMIT 10"
+    ).scalars().all()
+    if invalidas:
+        raise ErrorMigracion(
+            f"Hay turnos con horas que no son HH:MM: {', '.join(map(repr, invalidas))}. "
+            "Corregirlas y volver a iniciar."
+        )
+
+    # SQLite no cambia el tipo de una columna: se reconstruye la tabla con el esquema de
+    # models (columnas e índices) y se copian las filas convirtiendo la hora
+    for (indice,) in conexion.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'turnos' AND sql IS NOT NULL"
+    ).all():
+        conexion.exec_driver_sql(f'DROP INDEX "{indice}"')
+    conexion.exec_driver_sql("ALTER TABLE turnos RENAME TO turnos_hora_texto")
+    models.Turno.__table__.create(conexion)
+    conexion.exec_driver_sql(
+        "INSERT INTO turnos (id, fecha, hora, estado, persona_id) "
+        "SELECT id, fecha, CAST(substr(hora, 1, 2) AS INTEGER) * 60 + CAST(substr(hora, 4, 2) AS INTEGER), "
+        "estado, persona_id FROM turnos_hora_texto"
+    )
+    conexion.exec_driver_sql("DROP TABLE turnos_hora_texto")
+
+
+# En orden; nunca se modifica ni se quita una ya publicada, solo se agregan al final
+MIGRACIONES = [
+    _horario_unico,
+    _indices_reportes,
+    _hora_entera,
+]
+
+
+def aplicar(engine: Engine) -> int:
+    """Aplica las migraciones pendientes y devuelve cuántas se aplicaron"""
+    with engine.connect() as conexion:
+        version = conexion.execute(text("PRAGMA user_version")).scalar()
+    for numero, migracion in enumerate(MIGRACIONES[version:], start=version + 1):
+        with engine.begin() as conexion:
+            # pysqlite solo abre la transacción antes de un INSERT/UPDATE/DELETE: con un
+            # BEGIN explícito el DDL y user_version también se deshacen si algo falla
+            conexion.exec_driver_sql("BEGIN")
+            migracion(conexion)
+            conexion.execute(text(f"PRAGMA user_version = {numero}"))
+    return max(len(MIGRACIONES) - version, 0)
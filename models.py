@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import date
 from config import settings
+from horarios import HoraSlot
 
 
 class Persona(Base):
@@ -23,7 +24,22 @@ class Turno(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     fecha = Column(Date, nullable=False, index=True)
-    hora = Column(String, nullable=False)
+    # Minutos desde la medianoche; en Python sigue siendo "HH:MM" (ver horarios.HoraSlot)
+    hora = Column(HoraSlot, nullable=False)
     estado = Column(String, default= settings.ESTADO_PENDIENTE, nullable=False)
     persona_id = Column(Integer, ForeignKey("personas.id"), nullable=False)
-    persona = relationship("Persona", back_populates="turnos")
\ No newline at end of file
+    persona = relationship("Persona", back_populates="turnos")
+
+# Un horario no puede tener dos turnos activos: la base rechaza el segundo INSERT/UPDATE
+# (IntegrityError) sin consultar antes si está ocupado. Los cancelados no cuentan.
+Index(
+    "ux_turnos_horario_activo",
+    Turno.fecha,
+    Turno.hora,
+    unique=True,
+    sqlite_where=Turno.estado != settings.ESTADO_CANCELADO,
+)
+
+# Reportes y habilitación: filtran por estado y un rango de fechas, y por persona
+Index("ix_turnos_estado_fecha", Turno.estado, Turno.fecha)
+Index("ix_turnos_persona_estado_fecha", Turno.persona_id, Turno.estado, Turno.fecha)
@@ -0,0 +1,137 @@
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import models
+from config import settings
+
+# Posición de cada horario dentro de HORARIOS_VALIDOS (bit del bitmap)
+_POSICION_HORARIO = settings.INDICE_HORARIO
+
+
+def horarios_libres(bitmap: int) -> List[str]:
+    return [h for i, h in enumerate(settings.HORARIOS_VALIDOS) if not bitmap >> i & 1]
+
+
+class IndiceOcupacion:
+    """
+    Índice en memoria de los horarios ocupados por fecha.
+
+    Cada fecha guarda un entero usado como bitmap: el bit i está encendido si el
+    horario settings.HORARIOS_VALIDOS[i] tiene algún turno no cancelado.
+    Las fechas se cargan desde la base la primera vez que se consultan y después
+    se mantienen con las escrituras de crud. El índice vive en el proceso, por lo
+    que solo es válido si todas las escrituras pasan por este mismo proceso.
+    """
+
+    def __init__(self):
+        self._bitmaps: Dict[date, int] = {}
+        self._lock = threading.Lock()
+        # Cambia con cada escritura: evita guardar un bitmap leído antes de un commit
+        self._version = 0
+
+    @staticmethod
+    def _consulta(fecha: date):
+        return select(models.Turno.hora).where(
+            models.Turno.fecha == fecha,
+            models.Turno.estado != settings.ESTADO_CANCELADO,
+        )
+
+    @staticmethod
+    def _armar_bitmap(horas) -> int:
+        bitmap = 0
+        for (hora,) in horas:
+            posicion = _POSICION_HORARIO.get(hora)
+            if posicion is not None:
+                bitmap |= 1 << posicion
+        return bitmap
+
+    def _leer(self, fecha: date):
+        with self._lock:
+            return self._bitmaps.get(fecha), self._version
+
+    def _guardar(self, fecha: date, bitmap: int, version: int) -> int:
+        with self._lock:
+            # Si hubo escrituras mientras consultábamos, respondemos sin guardar
+            if self._version == version:
+                self._bitmaps.setdefault(fecha, bitmap)
+        return bitmap
+
+    def bitmap(self, db: Session, fecha: date) -> int:
+        bitmap, version = self._leer(fecha)
+        if bitmap is not None:
+            return bitmap
+        return self._guardar(fecha, self._armar_bitmap(db.execute(self._consulta(fecha))), version)
+
+    async def bitmap_async(self, db: AsyncSession, fecha: date) -> int:
+        bitmap, version = self._leer(fecha)
+        if bitmap is not None:
+            return bitmap
+        return self._guardar(fecha, self._armar_bitmap(await db.execute(self._consulta(fecha))), version)
+
+    def bitmaps_rango(self, db: Session, desde: date, hasta: date) -> Dict[date, int]:
+        """
+        Bitmaps de todas las fechas entre desde y hasta (inclusive).
+        Si falta alguna fecha en el índice, se leen todas con una sola consulta por rango.
+        """
+        fechas = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+        with self._lock:
+            cacheados = {f: self._bitmaps[f] for f in fechas if f in self._bitmaps}
+            version = self._version
+        if len(cacheados) == len(fechas):
+            return cacheados
+
+        ocupados_rows = db.query(models.Turno.fecha, models.Turno.hora).filter(
+            models.Turno.fecha >= desde,
+            models.Turno.fecha <= hasta,
+            models.Turno.estado != settings.ESTADO_CANCELADO,
+        ).all()
+
+        bitmaps = dict.fromkeys(fechas, 0)
+        for fecha, hora in ocupados_rows:
+            posicion = _POSICION_HORARIO.get(hora)
+            if posicion is not None:
+                bitmaps[fecha] |= 1 << posicion
+
+        with self._lock:
+            if self._version == version:
+                for fecha, bitmap in bitmaps.items():
+                    self._bitmaps.setdefault(fecha, bitmap)
+        return bitmaps
+
+    def disponibles(self, db: Session, fecha: date) -> List[str]:
+        return horarios_libres(self.bitmap(db, fecha))
+
+    async def disponibles_async(self, db: AsyncSession, fecha: date) -> List[str]:
+        return horarios_libres(await self.bitmap_async(db, fecha))
+
+    def ocupar(self, fecha: date, hora: str, estado: Optional[str]):
+        """Marca el horario como ocupado si el turno no está cancelado"""
+        posicion = _POSICION_HORARIO.get(hora)
+        if posicion is None or estado == settings.ESTADO_CANCELADO:
+            return
+        with self._lock:
+            self._version += 1
+            # Si la fecha no está cargada no hay nada que actualizar: se leerá de la base
+            if fecha in self._bitmaps:
+                self._bitmaps[fecha] |= 1 << posicion
+
+    def liberar(self, fecha: date):
+        """
+        Descarta la fecha del índice para que se vuelva a leer de la base.
+        Un bitmap no sabe cuántos turnos comparten un horario, así que al quitar uno
+        no podemos apagar el bit sin consultar si queda otro.
+        """
+        with self._lock:
+            self._version += 1
+            self._bitmaps.pop(fecha, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._version += 1
+            self._bitmaps.clear()
+
+
+indice_ocupacion = IndiceOcupacion()
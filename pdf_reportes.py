@@ -0,0 +1,227 @@
+import hashlib
+import io
+from typing import Iterable, List, Optional, Sequence, Tuple
+from borb.pdf import Document, Page, PDF
+from borb.io.read.types import Dictionary, Name
+from borb.pdf.canvas.font.simple_font.font_type_1 import StandardType1Font
+from borb.license.async_usage_statistics import AsyncUsageStatistics
+from artefactos import almacen_artefactos
+
+# borb envía estadísticas de uso en cada PDF.dumps y la primera vez registra handlers
+# de señales, lo que falla ("signal only works in main thread") si el primer PDF del
+# proceso se genera desde el threadpool de FastAPI.
+AsyncUsageStatistics.disable()
+
+# Medidas en puntos (A4, la página por defecto de borb)
+MARGEN = 40
+TAMANIO_FUENTE_TABLA = 9
+ALTO_FILA = TAMANIO_FUENTE_TABLA + 8
+PADDING_CELDA = 3
+
+# Forma parte de la clave de los PDF guardados: cambiarla al modificar el diseño
+# hace que no se sirvan documentos armados con el diseño anterior
+VERSION_DISENO = 1
+
+
+class ReportePDF:
+    """
+    Arma un PDF de varias páginas con una tabla que se corta en páginas de tamaño fijo.
+
+    Cada página repite el título y los encabezados de la tabla. En lugar de un
+    FixedColumnWidthTable con un Paragraph por celda (que para borb implica medir y
+    maquetar cada celda, y recomprimir el contenido de la página en cada paint), cada
+    página se escribe con un único bloque de operadores PDF. Los textos que no entran
+    en su columna se recortan con "...".
+
+    agregar_filas() sólo convierte las filas a texto y las suma a un hash del tipo de
+    reporte, los parámetros, el título y las filas. generar() usa ese hash como clave
+    en almacen_artefactos: si el mismo contenido ya se generó, devuelve el archivo
+    guardado sin crear el documento ni pintar páginas. Sólo si no está se arma el PDF,
+    página por página, y se guarda. Las filas quedan en memoria hasta generar(), igual
+    que en los llamadores, que ya las tienen en listas.
+
+    Uso:
+        reporte = ReportePDF([("Título", 14)], ["ID", "Nombre"], anchos=[1, 3],
+                             tipo="personas", parametros={"pagina": 1})
+        reporte.agregar_filas(filas)
+        buffer = reporte.generar()
+    """
+
+    def __init__(
+        self,
+        titulo: Sequence[Tuple[str, int]],
+        encabezados: Sequence[str],
+        anchos: Optional[Sequence[float]] = None,
+        tipo: str = "",
+        parametros: Optional[dict] = None,
+    ):
+        self._titulo = list(titulo)
+        self._encabezados = [str(e) for e in encabezados]
+        self._anchos_proporcionales = list(anchos) if anchos else None
+        self._documento: Optional[Document] = None
+        self._numero_pagina = 0
+        self._filas: List[List[str]] = []
+
+        self._hash = hashlib.sha256()
+        self._agregar_al_hash([str(VERSION_DISENO), tipo])
+        self._agregar_al_hash(f"{k}={v}" for k, v in sorted((parametros or {}).items()))
+        self._agregar_al_hash(f"{tamanio}:{texto}" for texto, tamanio in self._titulo)
+        self._agregar_al_hash(self._encabezados)
+        self._agregar_al_hash(str(a) for a in self._anchos_proporcionales or [])
+
+        self._anchos_glifos = {}
+
+        ancho_pagina, alto_pagina = 595, 842
+        self._alto_pagina = alto_pagina
+        proporciones = list(anchos) if anchos else [1] * len(self._encabezados)
+        self._ancho_util = ancho_pagina - 2 * MARGEN
+        total = sum(proporciones)
+        self._anchos = [self._ancho_util * p / total for p in proporciones]
+
+        alto_titulo = sum(tamanio * 1.4 for _, tamanio in self._titulo) + TAMANIO_FUENTE_TABLA * 1.4
+        alto_tabla = alto_pagina - 2 * MARGEN - alto_titulo - ALTO_FILA
+        self.filas_por_pagina = max(1, int(alto_tabla // ALTO_FILA))
+
+    def _agregar_al_hash(self, valores: Iterable[str]):
+        # Separadores de unidad y registro de ASCII: no aparecen en los datos
+        self._hash.update(("\x1f".join(valores) + "\x1e").encode("utf-8"))
+
+    # ----------------------
+    # Texto
+    # ----------------------
+
+    def _ancho_texto(self, texto: str, fuente, tamanio: float) -> float:
+        clave = id(fuente)
+        anchos = self._anchos_glifos.setdefault(clave, {})
+        total = 0
+        for c in texto:
+            ancho = anchos.get(c)
+            if ancho is None:
+                cid = fuente.unicode_to_character_identifier(c)
+                ancho = float(fuente.get_width(cid) or 500) if cid is not None else 500.0
+                anchos[c] = ancho
+            total += ancho
+        return total * tamanio / 1000
+
+    def _recortar(self, texto: str, ancho_disponible: float, fuente, tamanio: float) -> str:
+        if self._ancho_texto(texto, fuente, tamanio) <= ancho_disponible:
+            return texto
+        while texto and self._ancho_texto(texto + "...", fuente, tamanio) > ancho_disponible:
+            texto = texto[:-1]
+        return texto + "..."
+
+    @staticmethod
+    def _hex(texto: str, fuente) -> str:
+        codigos = []
+        for c in texto:
+            cid = fuente.unicode_to_character_identifier(c)
+            codigos.append("%02x" % (cid if cid is not None and cid < 256 else ord("?")))
+        return "<" + "".join(codigos) + ">"
+
+    def _texto(self, texto: str, recurso: str, fuente, tamanio: float, x: float, y: float) -> str:
+        return "BT /%s %g Tf %.2f %.2f Td %s Tj ET" % (recurso, tamanio, x, y, self._hex(texto, fuente))
+
+    # ----------------------
+    # Páginas
+    # ----------------------
+
+    def _registrar_fuentes(self, pagina: Page) -> Tuple[str, str]:
+        pagina[Name("Resources")] = Dictionary().set_parent(pagina)
+        pagina["Resources"][Name("Font")] = Dictionary()
+        pagina["Resources"]["Font"][Name("F1")] = self._fuente
+        pagina["Resources"]["Font"][Name("F2")] = self._fuente_negrita
+        return "F1", "F2"
+
+    def _pintar_pagina(self, filas: List[List[str]], mensaje: Optional[str] = None):
+        pagina = Page()
+        self._documento.add_page(pagina)
+        self._numero_pagina += 1
+        normal, negrita = self._registrar_fuentes(pagina)
+
+        operadores = []
+        y = self._alto_pagina - MARGEN
+
+        for texto, tamanio in self._titulo:
+            y -= tamanio * 1.4
+            texto = self._recortar(str(texto), self._ancho_util, self._fuente, tamanio)
+            operadores.append(self._texto(texto, normal, self._fuente, tamanio, MARGEN, y))
+        y -= TAMANIO_FUENTE_TABLA * 1.4
+        operadores.append(self._texto(f"Hoja {self._numero_pagina}", normal, self._fuente,
+                                      TAMANIO_FUENTE_TABLA, MARGEN, y))
+
+        if mensaje is not None:
+            y -= TAMANIO_FUENTE_TABLA * 2
+            operadores.append(self._texto(mensaje, normal, self._fuente, TAMANIO_FUENTE_TABLA + 1, MARGEN, y))
+            pagina.append_to_content_stream("\n".join(["q"] + operadores + ["Q"]))
+            return
+
+        # Encabezados + filas, con una grilla de líneas
+        tope = y - 4
+        for i, fila in enumerate([self._encabezados] + filas):
+            es_encabezado = i == 0
+            fuente = self._fuente_negrita if es_encabezado else self._fuente
+            recurso = negrita if es_encabezado else normal
+            base = tope - (i + 1) * ALTO_FILA + 5
+            x = MARGEN
+            for valor, ancho in zip(fila, self._anchos):
+                texto = self._recortar(valor, ancho - 2 * PADDING_CELDA, fuente, TAMANIO_FUENTE_TABLA)
+                operadores.append(self._texto(texto, recurso, fuente, TAMANIO_FUENTE_TABLA, x + PADDING_CELDA, base))
+                x += ancho
+
+        piso = tope - (len(filas) + 1) * ALTO_FILA
+        derecha = MARGEN + sum(self._anchos)
+        grilla = ["0.5 w"]
+        for i in range(len(filas) + 2):
+            yl = tope - i * ALTO_FILA
+            grilla.append("%.2f %.2f m %.2f %.2f l" % (MARGEN, yl, derecha, yl))
+        x = MARGEN
+        for ancho in [0] + self._anchos:
+            x += ancho
+            grilla.append("%.2f %.2f m %.2f %.2f l" % (x, tope, x, piso))
+        grilla.append("S")
+
+        # Una sola escritura por página: borb recomprime el contenido en cada append
+        pagina.append_to_content_stream("\n".join(["q"] + grilla + operadores + ["Q"]))
+
+    def agregar_filas(self, filas: Iterable[Sequence]):
+        """Agrega filas al reporte y al hash; las páginas se pintan en generar()"""
+        for fila in filas:
+            celdas = ["" if v is None else str(v) for v in fila]
+            self._agregar_al_hash(celdas)
+            self._filas.append(celdas)
+
+    @property
+    def clave(self) -> str:
+        return self._hash.hexdigest()
+
+    def _armar(self, mensaje_vacio: Optional[str]) -> io.BytesIO:
+        self._documento = Document()
+        # Las fuentes se crean por documento: borb les asigna referencias al escribir
+        self._fuente = StandardType1Font("Helvetica")
+        self._fuente_negrita = StandardType1Font("Helvetica-Bold")
+
+        if not self._filas:
+            self._pintar_pagina([], mensaje=mensaje_vacio)
+        for inicio in range(0, len(self._filas), self.filas_por_pagina):
+            self._pintar_pagina(self._filas[inicio:inicio + self.filas_por_pagina])
+        self._filas = []
+
+        buffer = io.BytesIO()
+        PDF.dumps(buffer, self._documento)
+        return buffer
+
+    def generar(self, mensaje_vacio: Optional[str] = None) -> io.BytesIO:
+        """Devuelve el PDF, guardado o recién armado. Sin filas, muestra mensaje_vacio en lugar de la tabla"""
+        if not self._filas and mensaje_vacio:
+            self._agregar_al_hash([mensaje_vacio])
+        clave = self.clave
+
+        guardado = almacen_artefactos.leer(clave)
+        if guardado is not None:
+            self._filas = []
+            return io.BytesIO(guardado)
+
+        buffer = self._armar(mensaje_vacio)
+        almacen_artefactos.guardar(clave, buffer.getvalue())
+        buffer.seek(0)
+        return buffer
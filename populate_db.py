@@ -1,8 +1,13 @@
+import argparse
+import itertools
 import random
+import time
 from datetime import date, timedelta
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine, Base
 import models
+import migraciones
 from config import settings
 
 # --- CONFIGURACIÓN VISUAL ---
@@ -15,6 +20,7 @@ RESET = "\033[0m"
 def init_db():
     print(f"{CYAN}--- Inicializando Esquema de Base de Datos ---{RESET}")
     Base.metadata.create_all(bind=engine)
+    migraciones.aplicar(engine)
 
 def get_or_create_persona(db: Session, nombre, apellido, dni, habilitado=True):
     """
@@ -75,17 +81,26 @@ def generar_datos_prueba(db: Session):
     CANTIDAD_A_GENERAR = 25
     
     for i in range(CANTIDAD_A_GENERAR):
-        # 1. Ciclamos los horarios: si hay 16 horarios y i=17, vuelve a empezar (simula turno simultáneo)
+        # 1. Ciclamos los horarios: si hay 16 horarios y i=17, vuelve a empezar
         horario = horarios[i % len(horarios)]
         
         # 2. Elegimos persona al azar
         persona = random.choice(pool_personas)
         
-        # 3. Elegimos estado al azar
-        estado = random.choice(estados_validos)
+        # 3. Elegimos estado al azar. Un horario admite un solo turno activo: los que
+        # repiten horario quedan cancelados (un turno cancelado no ocupa el horario)
+        if i < len(horarios):
+            estado = random.choice(estados_validos)
+        else:
+            estado = settings.ESTADO_CANCELADO
         
-        # Evitamos duplicados exactos (misma persona a la misma hora)
-        if not db.query(models.Turno).filter_by(fecha=hoy, hora=horario, persona_id=persona.id).first():
+        # Evitamos duplicados exactos (misma persona a la misma hora) y horarios ya ocupados
+        ocupado = estado != settings.ESTADO_CANCELADO and db.query(models.Turno).filter(
+            models.Turno.fecha == hoy,
+            models.Turno.hora == horario,
+            models.Turno.estado != settings.ESTADO_CANCELADO,
+        ).first()
+        if not ocupado and not db.query(models.Turno).filter_by(fecha=hoy, hora=horario, persona_id=persona.id).first():
             t = models.Turno(
                 fecha=hoy,
                 hora=horario,
@@ -95,6 +110,9 @@ def generar_datos_prueba(db: Session):
             db.add(t)
             turnos_creados += 1
 
+    # La sesión no hace autoflush: los siguientes escenarios consultan lo ya agregado
+    db.flush()
+
     # =========================================================================
     # ESCENARIO B: Historial Lucas (Paginación por Persona)
     # =========================================================================
@@ -112,6 +130,9 @@ def generar_datos_prueba(db: Session):
             db.add(t)
             turnos_creados += 1
 
+    # La sesión no hace autoflush: los siguientes escenarios consultan lo ya agregado
+    db.flush()
+
     # =========================================================================
     # ESCENARIO C: Cancelaciones Sofia (Bloqueo Lógico y Reporte Mensual)
     # =========================================================================
@@ -132,6 +153,9 @@ def generar_datos_prueba(db: Session):
             db.add(t)
             turnos_creados += 1
 
+    # La sesión no hace autoflush: los siguientes escenarios consultan lo ya agregado
+    db.flush()
+
     # =========================================================================
     # ESCENARIO D: Confirmados Periodo (Reporte Giovanni)
     # =========================================================================
@@ -148,7 +172,139 @@ def generar_datos_prueba(db: Session):
     db.commit()
     print(f"{GREEN}✅ Base de datos actualizada. Total nuevos insertados: {turnos_creados}{RESET}")
 
-def main():
+# =========================================================================
+# MODO GENERADOR: datos sintéticos en volumen (para benchmarks)
+# =========================================================================
+
+NOMBRES = ["Lucas", "Sofia", "Miguel", "Ana", "Carlos", "Elena", "Diego", "Valentina", "Facundo",
+           "Jimena", "Pablo", "Martina", "Juan", "Camila", "Mateo", "Lucia", "Tomas", "Julieta"]
+APELLIDOS = ["Rodriguez", "Martinez", "Torres", "Gomez", "Fernandez", "Lopez", "Diaz", "Perez",
+             "Sanchez", "Romero", "Sosa", "Alvarez", "Ruiz", "Benitez", "Acosta", "Medina"]
+
+TAMANIO_LOTE = 50_000
+DIAS_FUTUROS = 60          # Los turnos llegan hasta 60 días después de la fecha de referencia
+DIAS_HISTORIA = 3 * 365    # y, como mucho, hasta tres años antes
+OCUPACION = 0.75           # Probabilidad de que un horario tenga un turno activo
+CANCELACION = 0.12         # Probabilidad de que además tenga un turno cancelado
+INHABILITADAS = 0.03       # Proporción de personas inhabilitadas
+
+# Estado de los turnos activos según la fecha ya haya pasado o no (pesos acumulados)
+ESTADOS_PASADOS = ([settings.ESTADO_ASISTIDO, settings.ESTADO_CONFIRMADO, settings.ESTADO_PENDIENTE], [0.85, 0.90, 1.0])
+ESTADOS_FUTUROS = ([settings.ESTADO_PENDIENTE, settings.ESTADO_CONFIRMADO], [0.6, 1.0])
+
+_NACIMIENTO_DESDE = date(1940, 1, 1).toordinal()
+_NACIMIENTO_HASTA = date(2010, 12, 31).toordinal()
+
+
+def _personas_sinteticas(rnd: random.Random, cantidad: int):
+    for i in range(1, cantidad + 1):
+        nombre, apellido = rnd.choice(NOMBRES), rnd.choice(APELLIDOS)
+        yield {
+            "id": i,
+            "nombre": f"{nombre} {apellido}",
+            "email": f"{nombre.lower()}.{apellido.lower()}.{i}@email.com",
+            "dni": f"{20_000_000 + i:08d}",
+            "telefono": f"11{rnd.randint(40000000, 99999999)}",
+            "fecha_nacimiento": date.fromordinal(rnd.randint(_NACIMIENTO_DESDE, _NACIMIENTO_HASTA)),
+            "habilitado": rnd.random() >= INHABILITADAS,
+        }
+
+def _turnos_sinteticos(rnd: random.Random, personas: int, cantidad: int, referencia: date, dias_historia: int):
+    """
+    Recorre los días hacia atrás desde referencia + DIAS_FUTUROS hasta llegar a la
+    cantidad pedida: así los meses recientes siempre tienen datos. Cada horario tiene
+    a lo sumo un turno activo (índice ux_turnos_horario_activo) y, aparte, quizás uno
+    cancelado. Unas pocas personas concentran muchos turnos, como los pacientes frecuentes.
+
+    Si con esa densidad la cantidad no entra en dias_historia días hacia atrás, cada
+    horario suma más turnos cancelados (los únicos que pueden repetir horario) para que
+    las fechas no se vayan siglos atrás.
+    """
+    horarios = settings.HORARIOS_VALIDOS
+    fecha = referencia + timedelta(days=DIAS_FUTUROS)
+    por_horario = cantidad / ((DIAS_FUTUROS + dias_historia) * len(horarios))
+    cancelados = max(CANCELACION, por_horario - OCUPACION)
+    cancelados_fijos, cancelado_extra = int(cancelados), cancelados % 1
+
+    def cancelado(fecha, hora):
+        return {
+            "fecha": fecha,
+            "hora": hora,
+            "estado": settings.ESTADO_CANCELADO,
+            "persona_id": int(personas * rnd.random() ** 2) + 1,
+        }
+
+    generados = 0
+    while True:
+        estados, pesos = ESTADOS_PASADOS if fecha < referencia else ESTADOS_FUTUROS
+        for hora in horarios:
+            if rnd.random() < OCUPACION:
+                yield {
+                    "fecha": fecha,
+                    "hora": hora,
+                    "estado": rnd.choices(estados, cum_weights=pesos)[0],
+                    "persona_id": int(personas * rnd.random() ** 2) + 1,
+                }
+                generados += 1
+                if generados == cantidad:
+                    return
+            for _ in range(cancelados_fijos + (rnd.random() < cancelado_extra)):
+                yield cancelado(fecha, hora)
+                generados += 1
+                if generados == cantidad:
+                    return
+        fecha -= timedelta(days=1)
+
+def _insertar_en_lotes(conexion, tabla, filas, tamanio_lote: int) -> int:
+    total = 0
+    while True:
+        lote = list(itertools.islice(filas, tamanio_lote))
+        if not lote:
+            return total
+        conexion.execute(insert(tabla), lote)
+        total += len(lote)
+        print(f"  {tabla.name}: {total}", end="\r", flush=True)
+
+def generar_masivo(engine, personas: int, turnos: int, seed: int = 1, referencia: date = None,
+                   tamanio_lote: int = TAMANIO_LOTE, dias_historia: int = DIAS_HISTORIA) -> dict:
+    """
+    Llena una base vacía con `personas` personas y `turnos` turnos sintéticos en una
+    sola transacción, insertando de a tamanio_lote filas. Los turnos van desde unos
+    dias_historia días antes de la fecha de referencia (hoy por defecto) hasta
+    DIAS_FUTUROS días después. El mismo seed, la misma fecha de referencia y los mismos
+    dias_historia generan exactamente los mismos datos.
+    """
+    if personas < 1 or turnos < 0:
+        raise ValueError("Se necesita al menos una persona y una cantidad de turnos no negativa")
+    if dias_historia < 1:
+        raise ValueError("dias_historia tiene que ser al menos 1")
+    referencia = referencia or date.today()
+    rnd = random.Random(seed)
+    tabla_personas, tabla_turnos = models.Persona.__table__, models.Turno.__table__
+
+    with engine.begin() as conexion:
+        for tabla in (tabla_personas, tabla_turnos):
+            if conexion.execute(select(func.count()).select_from(tabla)).scalar():
+                raise ValueError(f"La tabla {tabla.name} ya tiene datos (usar --reiniciar)")
+
+        # Es más rápido armar los índices una vez al final que mantenerlos fila por fila
+        indices = list(tabla_turnos.indexes)
+        for indice in indices:
+            indice.drop(conexion)
+        try:
+            _insertar_en_lotes(conexion, tabla_personas, _personas_sinteticas(rnd, personas), tamanio_lote)
+            print()
+            _insertar_en_lotes(conexion, tabla_turnos, _turnos_sinteticos(rnd, personas, turnos, referencia, dias_historia), tamanio_lote)
+            print()
+        finally:
+            print(f"{YELLOW}> Armando índices...{RESET}")
+            for indice in indices:
+                indice.create(conexion, checkfirst=True)
+
+        desde, hasta = conexion.execute(select(func.min(tabla_turnos.c.fecha), func.max(tabla_turnos.c.fecha))).one()
+    return {"personas": personas, "turnos": turnos, "desde": desde, "hasta": hasta}
+
+def cargar_casos_de_prueba():
     db = SessionLocal()
     try:
         init_db()
@@ -165,5 +321,39 @@ def main():
     finally:
         db.close()
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sin argumentos carga los casos de prueba; con --personas y --turnos genera datos sintéticos"
+    )
+    parser.add_argument("--personas", type=int)
+    parser.add_argument("--turnos", type=int)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--referencia", type=date.fromisoformat, help="Fecha de referencia YYYY-MM-DD (por defecto hoy)")
+    parser.add_argument("--lote", type=int, default=TAMANIO_LOTE, help="Filas por INSERT")
+    parser.add_argument("--dias-historia", type=int, default=DIAS_HISTORIA,
+                        help=f"Días antes de la referencia que pueden tener turnos (por defecto {DIAS_HISTORIA})")
+    parser.add_argument("--reiniciar", action="store_true", help="Borra todas las tablas antes de generar")
+    args = parser.parse_args(argv)
+
+    if args.personas is None and args.turnos is None:
+        cargar_casos_de_prueba()
+        return
+    if args.personas is None or args.turnos is None:
+        parser.error("--personas y --turnos van juntos")
+
+    if args.reiniciar:
+        Base.metadata.drop_all(bind=engine)
+    init_db()
+    print(f"{CYAN}--- Generando {args.personas} personas y {args.turnos} turnos (seed {args.seed}) ---{RESET}")
+    inicio = time.perf_counter()
+    try:
+        resumen = generar_masivo(engine, args.personas, args.turnos, args.seed, args.referencia, args.lote,
+                                 args.dias_historia)
+    except ValueError as e:
+        print(f"{RED}Error: {e}{RESET}")
+        raise SystemExit(1)
+    print(f"{GREEN}✅ {resumen['personas']} personas y {resumen['turnos']} turnos entre {resumen['desde']} "
+          f"y {resumen['hasta']} en {time.perf_counter() - inicio:.0f} s{RESET}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,287 @@
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from database import SessionLectura
+from metricas import capturar_render, registrar_render
+import crud, models, services
+from config import settings
+
+MEDIA_TYPES = {"pdf": "application/pdf", "csv": "text/csv"}
+
+
+class ColaReportesLlena(Exception):
+    """Se alcanzó settings.REPORTES_MAX_PENDIENTES reportes sin terminar"""
+
+
+# ----------------------
+# Armado de cada reporte (corre dentro de los procesos del pool)
+# ----------------------
+# Cada función recibe una sesión propia del proceso y los parámetros ya validados,
+# y devuelve (contenido, nombre_de_archivo). A diferencia de los endpoints GET, los
+# reportes encolados siempre son completos: no se paginan.
+
+def _turnos_por_fecha(db: Session, formato: str, fecha: date) -> Tuple[bytes, str]:
+    turnos = crud.get_turnos_por_fecha(db, fecha)
+    if formato == "pdf":
+        return services.generar_pdf_turnos_fecha(turnos, fecha).getvalue(), f"turnos_{fecha}.pdf"
+    return b"".join(services.generar_csv_turnos_fecha(turnos)), f"turnos_{fecha}.csv"
+
+def _turnos_cancelados_por_mes(db: Session, formato: str, mes: int, anio: int) -> Tuple[bytes, str]:
+    nombre_mes = services.nombre_mes(mes).capitalize()
+    if formato == "pdf":
+        turnos = crud.get_turnos_cancelados_por_mes(db, anio, mes)
+        pdf = services.generar_pdf_cancelados_mes(turnos, nombre_mes, anio)
+        return pdf.getvalue(), f"cancelados_{nombre_mes}_{anio}.pdf"
+    turnos = crud.iterar_en_lotes(crud.query_turnos_cancelados_por_mes(db, anio, mes))
+    csv = services.generar_csv_turnos_cancelados_mes(turnos, nombre_mes, anio)
+    return b"".join(csv), f"turnos_cancelados_{nombre_mes}_{anio}.csv"
+
+def _turnos_por_persona(db: Session, formato: str, dni: str) -> Tuple[bytes, str]:
+    persona = crud.get_persona_por_dni(db, dni)
+    if not persona:
+        raise ValueError("Persona no encontrada")
+    turnos = crud.get_turnos_por_persona_paginado(db, persona.id, limit=None)
+    argumentos = dict(
+        turnos=turnos,
+        persona=persona,
+        pagina=1,
+        tamanio=len(turnos),
+        total_paginas=1,
+        total_turnos=len(turnos)
+    )
+    if formato == "pdf":
+        return services.generar_pdf_turnos_persona_paginado(**argumentos).getvalue(), f"turnos_{dni}.pdf"
+    return b"".join(services.generar_csv_turnos_persona_paginado(**argumentos)), f"turnos_{dni}.csv"
+
+def _turnos_cancelados(db: Session, formato: str) -> Tuple[bytes, str]:
+    if formato == "pdf":
+        turnos = crud.query_turnos_cancelados(db).all()
+        return services.generar_pdf_turnos_cancelados(turnos).getvalue(), "turnos_cancelados.pdf"
+    turnos = crud.iterar_en_lotes(crud.query_turnos_cancelados(db))
+    return b"".join(services.generar_csv_turnos_cancelados(turnos)), "turnos_cancelados.csv"
+
+def _estado_personas(db: Session, formato: str) -> Tuple[bytes, str]:
+    personas = db.query(models.Persona).order_by(models.Persona.id).all()
+    resultado = services.estado_personas(db, personas)
+    if formato == "pdf":
+        return services.generar_pdf_estado_personas(resultado).getvalue(), "estado_personas.pdf"
+    return b"".join(services.generar_csv_estado_personas(resultado, 1, 1)), "estado_personas.csv"
+
+def _turnos_confirmados_periodos(db: Session, formato: str, desde: date, hasta: date) -> Tuple[bytes, str]:
+    total, turnos = services.obtener_turnos_confirmados_periodos(db, desde, hasta)
+    resultados = services.filas_turnos_confirmados(turnos)
+    nombre = f"turnos_confirmados_{desde}_a_{hasta}.{formato}"
+    if formato == "pdf":
+        pdf = services.generar_pdf_turnos_confirmados_periodos(resultados, desde, hasta, 1, 1, total)
+        return pdf.getvalue(), nombre
+    csv = services.generar_csv_turnos_confirmados_periodos(resultados, desde, hasta, 1, 1, total)
+    return b"".join(csv), nombre
+
+# Reportes disponibles: nombre -> (función, parámetros obligatorios)
+REPORTES = {
+    "turnos-por-fecha": (_turnos_por_fecha, ("fecha",)),
+    "turnos-cancelados-por-mes": (_turnos_cancelados_por_mes, ("mes", "anio")),
+    "turnos-por-persona": (_turnos_por_persona, ("dni",)),
+    "turnos-cancelados": (_turnos_cancelados, ()),
+    "estado-personas": (_estado_personas, ()),
+    "turnos-confirmados-periodos": (_turnos_confirmados_periodos, ("desde", "hasta")),
+}
+
+def _renderizar(reporte: str, formato: str, parametros: dict) -> Tuple[bytes, str, List[Tuple[str, float]]]:
+    """
+    Punto de entrada en el proceso del pool: abre su propia sesión y arma el reporte.
+    Devuelve además los tiempos de medir_render, para registrarlos en el proceso de la API.
+    """
+    funcion, _ = REPORTES[reporte]
+    db = SessionLectura()
+    try:
+        with capturar_render() as tiempos:
+            contenido, nombre_archivo = funcion(db, formato, **parametros)
+        return contenido, nombre_archivo, tiempos
+    finally:
+        db.close()
+
+def _registrar_tiempos(future):
+    if not future.cancelled() and future.exception() is None:
+        registrar_render(future.result()[2])
+
+
+# ----------------------
+# Validación de parámetros (en el proceso de la API, antes de encolar)
+# ----------------------
+
+def _parsear_fecha(valor) -> date:
+    try:
+        return date.fromisoformat(str(valor))
+    except ValueError:
+        raise ValueError(f"Fecha inválida '{valor}'. Formato esperado: YYYY-MM-DD")
+
+def _parsear_mes(valor) -> int:
+    mes = int(valor)
+    if not 1 <= mes <= 12:
+        raise ValueError("El mes debe estar entre 1 y 12")
+    return mes
+
+def _parsear_anio(valor) -> int:
+    anio = int(valor)
+    if not settings.ANIO_REPORTES_MIN <= anio <= settings.ANIO_REPORTES_MAX:
+        raise ValueError(f"El año debe estar entre {settings.ANIO_REPORTES_MIN} y {settings.ANIO_REPORTES_MAX}")
+    return anio
+
+_CONVERSORES = {
+    "fecha": _parsear_fecha,
+    "desde": _parsear_fecha,
+    "hasta": _parsear_fecha,
+    "mes": _parsear_mes,
+    "anio": _parsear_anio,
+    "dni": str,
+}
+
+def validar_parametros(reporte: str, formato: str, parametros: dict) -> dict:
+    """Devuelve los parámetros convertidos a sus tipos; ValueError si no son válidos"""
+    if reporte not in REPORTES:
+        raise ValueError(f"Reporte desconocido. Disponibles: {list(REPORTES)}")
+    if formato not in MEDIA_TYPES:
+        raise ValueError(f"Formato inválido. Permitidos: {list(MEDIA_TYPES)}")
+
+    _, nombres = REPORTES[reporte]
+    parametros = dict(parametros)
+    # mes y anio son opcionales como en los endpoints GET: por defecto el mes actual
+    if reporte == "turnos-cancelados-por-mes":
+        hoy = date.today()
+        parametros.setdefault("mes", hoy.month)
+        parametros.setdefault("anio", hoy.year)
+
+    sobrantes = set(parametros) - set(nombres)
+    if sobrantes:
+        raise ValueError(f"Parámetros no admitidos para '{reporte}': {sorted(sobrantes)}")
+    faltantes = [n for n in nombres if parametros.get(n) is None]
+    if faltantes:
+        raise ValueError(f"Faltan parámetros para '{reporte}': {faltantes}")
+
+    try:
+        convertidos = {n: _CONVERSORES[n](parametros[n]) for n in nombres}
+    except (TypeError, ValueError) as e:
+        raise ValueError(str(e))
+    if "desde" in convertidos and convertidos["desde"] > convertidos["hasta"]:
+        raise ValueError("La fecha inicial no puede ser posterior a la final")
+    return convertidos
+
+
+# ----------------------
+# Cola
+# ----------------------
+
+class TrabajoReporte:
+    def __init__(self, reporte: str, formato: str, parametros: dict, future):
+        self.id = uuid.uuid4().hex
+        self.reporte = reporte
+        self.formato = formato
+        self.parametros = parametros
+        self.creado = datetime.now()
+        self.future = future
+
+    @property
+    def estado(self) -> str:
+        if not self.future.done():
+            return "procesando" if self.future.running() else "pendiente"
+        if self.future.cancelled() or self.future.exception() is not None:
+            return "error"
+        return "listo"
+
+    def resultado(self) -> Tuple[bytes, str]:
+        """(contenido, nombre_de_archivo) de un trabajo listo"""
+        contenido, nombre_archivo, _ = self.future.result()
+        return contenido, nombre_archivo
+
+    def resumen(self) -> dict:
+        resumen = {
+            "id": self.id,
+            "reporte": self.reporte,
+            "formato": self.formato,
+            "parametros": self.parametros,
+            "estado": self.estado,
+            "creado": self.creado,
+        }
+        if resumen["estado"] == "error":
+            resumen["error"] = "Cancelado" if self.future.cancelled() else str(self.future.exception())
+        return resumen
+
+
+class ColaReportes:
+    """
+    Arma los reportes PDF/CSV en un ProcessPoolExecutor, fuera del proceso que atiende
+    las requests: generar un PDF grande ocupa CPU y, en un thread, compite por el GIL
+    con el resto de los endpoints. Los tiempos de armado medidos en cada proceso se
+    registran en las métricas de este al terminar el trabajo.
+
+    La cola está acotada: con settings.REPORTES_MAX_PENDIENTES trabajos sin terminar,
+    encolar() lanza ColaReportesLlena. De los terminados se guardan en memoria los
+    últimos settings.REPORTES_MAX_TERMINADOS para poder descargarlos.
+    """
+
+    def __init__(self, workers: int, max_pendientes: int, max_terminados: int):
+        self._workers = workers
+        self._max_pendientes = max_pendientes
+        self._max_terminados = max_terminados
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._trabajos: Dict[str, TrabajoReporte] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Se crea recién con el primer reporte; "spawn" evita heredar con fork el
+        # engine, las conexiones y los locks de los threads del proceso de la API
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _descartar_terminados(self):
+        terminados = [t for t in self._trabajos.values() if t.future.done()]
+        # Los dict conservan el orden de inserción: los primeros son los más viejos
+        for trabajo in terminados[:max(0, len(terminados) - self._max_terminados)]:
+            del self._trabajos[trabajo.id]
+
+    def encolar(self, reporte: str, formato: str, parametros: dict) -> TrabajoReporte:
+        parametros = validar_parametros(reporte, formato, parametros)
+        with self._lock:
+            pendientes = sum(1 for t in self._trabajos.values() if not t.future.done())
+            if pendientes >= self._max_pendientes:
+                raise ColaReportesLlena(
+                    f"Hay {pendientes} reportes en proceso. Intente nuevamente en unos segundos."
+                )
+            try:
+                future = self._pool().submit(_renderizar, reporte, formato, parametros)
+            except BrokenProcessPool:
+                # Un proceso murió (p. ej. sin memoria): el pool queda inutilizable y se rearma
+                self._executor = None
+                future = self._pool().submit(_renderizar, reporte, formato, parametros)
+            future.add_done_callback(_registrar_tiempos)
+            trabajo = TrabajoReporte(reporte, formato, parametros, future)
+            self._trabajos[trabajo.id] = trabajo
+            self._descartar_terminados()
+        return trabajo
+
+    def obtener(self, trabajo_id: str) -> Optional[TrabajoReporte]:
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def cerrar(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+cola_reportes = ColaReportes(
+    workers=settings.REPORTES_WORKERS,
+    max_pendientes=settings.REPORTES_MAX_PENDIENTES,
+    max_terminados=settings.REPORTES_MAX_TERMINADOS,
+)
@@ -0,0 +1,36 @@
+"""
+Serialización de las respuestas JSON grandes (listados y reportes).
+
+Por defecto FastAPI vuelve a validar lo que devuelve el endpoint contra response_model
+y después lo pasa por jsonable_encoder y json.dumps, todo en Python. Acá las filas se
+validan una sola vez contra el esquema de salida con un TypeAdapter de la lista entera
+y se serializan con pydantic-core, sin objetos intermedios por campo.
+"""
+from typing import Any, List, Optional
+import pydantic_core
+from fastapi import Response
+from pydantic import TypeAdapter
+import schemas
+
+PERSONAS_OUT = TypeAdapter(List[schemas.PersonaOut])
+TURNOS_OUT = TypeAdapter(List[schemas.TurnoOut])
+
+
+class RespuestaJSON(Response):
+    """Como JSONResponse, pero codificada con pydantic_core.to_json (fechas incluidas)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return pydantic_core.to_json(content)
+
+
+def lista_json(adaptador: TypeAdapter, filas: list, response: Optional[Response] = None) -> RespuestaJSON:
+    """
+    Valida las filas (objetos o filas de una consulta, por atributos) y las devuelve como
+    JSON. Copia los headers puestos en `response`, el parámetro del endpoint: al devolver
+    una Response propia FastAPI no los agrega.
+    """
+    cuerpo = adaptador.dump_json(adaptador.validate_python(filas, from_attributes=True))
+    return RespuestaJSON(cuerpo, headers=dict(response.headers) if response is not None else None)
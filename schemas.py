@@ -1,11 +1,11 @@
 from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import date
 from config import settings
 
 def validar_existencia_horaria(hora_str: str) -> str:
-    """Valida que la hora exista en la lista generada por config"""
-    if hora_str not in settings.HORARIOS_VALIDOS:
+    """Valida que la hora exista en los horarios generados por config"""
+    if hora_str not in settings.INDICE_HORARIO:
         raise ValueError(
             f"Horario inválido. Los turnos son de {settings.INICIO} a {settings.FIN} "
             f"cada {settings.INTERVALO} minutos. Ejemplos: {settings.HORARIOS_VALIDOS[:3]}..."
@@ -114,4 +114,24 @@ class TurnoOut(TurnoBase):
     class Config:
         from_attributes = True
 
+class TurnoLoteResultado(BaseModel):
+    indice: int
+    aceptado: bool
+    turno: Optional[TurnoOut] = None
+    error: Optional[str] = None
+
+class TurnoLoteOut(BaseModel):
+    aceptados: int
+    rechazados: int
+    resultados: List[TurnoLoteResultado]
+
+# ----------------------
+# Reportes asincrónicos
+# ----------------------
+
+class ReporteJobCreate(BaseModel):
+    reporte: str
+    formato: str = "pdf"
+    parametros: Dict[str, Any] = {}
+
 PersonaOut.model_rebuild()
\ No newline at end of file
@@ -1,19 +1,25 @@
 from sqlalchemy.orm import Session
 from datetime import date, timedelta
-from typing import List
-import models
+from typing import Dict, Iterable, Iterator, List
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models, crud, schemas
 from config import settings
-import pandas as pd
+from ocupacion import indice_ocupacion, horarios_libres
+import csv
 import io
-from decimal import Decimal
-from borb.pdf import Document, Page, SingleColumnLayout, Paragraph, PDF
-from borb.pdf import FixedColumnWidthTable, TableCell
+from pdf_reportes import ReportePDF
+from metricas import medir_render
 
 
 def calcular_edad(fecha_nacimiento: date) -> int:
     today = date.today()
     return today.year - fecha_nacimiento.year - ((today.month, today.day) < (fecha_nacimiento.month, fecha_nacimiento.day))
 
+MAX_CANCELADOS_SEMESTRE = 5
+# Por encima de esta cantidad de ids no se filtra con IN: se agrupa toda la ventana
+_MAX_IDS_FILTRO_IN = 900
+
 def puede_sacar_turno(db: Session, persona_id: int) -> bool:
     seis_meses = date.today() - timedelta(days=182)
     cancelados = db.query(models.Turno).filter(
@@ -21,19 +27,113 @@ def puede_sacar_turno(db: Session, persona_id: int) -> bool:
         models.Turno.estado == settings.ESTADO_CANCELADO,
         models.Turno.fecha >= seis_meses,
     ).count()
-    return cancelados < 5
+    return cancelados < MAX_CANCELADOS_SEMESTRE
+
+async def puede_sacar_turno_async(db: AsyncSession, persona_id: int) -> bool:
+    seis_meses = date.today() - timedelta(days=182)
+    cancelados = await db.scalar(
+        select(func.count(models.Turno.id)).where(
+            models.Turno.persona_id == persona_id,
+            models.Turno.estado == settings.ESTADO_CANCELADO,
+            models.Turno.fecha >= seis_meses,
+        )
+    )
+    return cancelados < MAX_CANCELADOS_SEMESTRE
+
+def puede_sacar_turno_bulk(db: Session, persona_ids: Iterable[int]) -> Dict[int, bool]:
+    """Igual que puede_sacar_turno pero para muchas personas con un único GROUP BY"""
+    ids = set(persona_ids)
+    if not ids:
+        return {}
+
+    seis_meses = date.today() - timedelta(days=182)
+    query = db.query(models.Turno.persona_id, func.count(models.Turno.id)).filter(
+        models.Turno.estado == settings.ESTADO_CANCELADO,
+        models.Turno.fecha >= seis_meses,
+    )
+    if len(ids) <= _MAX_IDS_FILTRO_IN:
+        query = query.filter(models.Turno.persona_id.in_(ids))
+
+    cancelados = dict(query.group_by(models.Turno.persona_id).all())
+    return {pid: cancelados.get(pid, 0) < MAX_CANCELADOS_SEMESTRE for pid in ids}
+
+def crear_turnos_lote(db: Session, turnos: List[schemas.TurnoCreateConDNI]) -> List[dict]:
+    """
+    Valida y crea un lote de turnos con consultas por conjunto: un IN por los DNI, un
+    GROUP BY para la habilitación y un IN por las fechas para los horarios ocupados.
+    Los turnos aceptados se insertan en una sola transacción.
+    Devuelve un resultado por turno, en el mismo orden: {"indice", "aceptado", "turno" | "error"}.
+    """
+    personas = crud.get_personas_por_dnis(db, [t.dni for t in turnos])
+    habilitaciones = puede_sacar_turno_bulk(db, (p.id for p in personas.values()))
+    ocupados = crud.get_horarios_ocupados(db, [t.fecha for t in turnos])
+
+    resultados = []
+    aceptados = []
+    for indice, turno in enumerate(turnos):
+        persona = personas.get(turno.dni)
+        error = None
+        if not persona:
+            error = "Persona no encontrada"
+        elif not persona.habilitado:
+            error = "Persona inhabilitada para sacar turno"
+        elif not habilitaciones[persona.id]:
+            error = "La persona tiene 5 o más cancelados en los últimos 6 meses"
+        elif turno.estado != settings.ESTADO_CANCELADO:
+            horario = (turno.fecha, turno.hora)
+            if horario in ocupados:
+                error = crud.mensaje_horario_ocupado(turno.fecha, turno.hora)
+            else:
+                # Los siguientes del lote para el mismo horario quedan rechazados
+                ocupados.add(horario)
+
+        if error:
+            resultados.append({"indice": indice, "aceptado": False, "error": error})
+            continue
+        resultado = {"indice": indice, "aceptado": True}
+        resultados.append(resultado)
+        aceptados.append((resultado, turno.dni, schemas.TurnoCreate(
+            fecha=turno.fecha,
+            hora=turno.hora,
+            estado=turno.estado,
+            persona_id=persona.id
+        )))
+
+    creados = crud.create_turnos(db, [turno_data for _, _, turno_data in aceptados])
+    for (resultado, dni, _), turno_creado in zip(aceptados, creados):
+        resultado["turno"] = schemas.TurnoOut(
+            id=turno_creado.id,
+            fecha=turno_creado.fecha,
+            hora=turno_creado.hora,
+            estado=turno_creado.estado,
+            persona_id=turno_creado.persona_id,
+            dni=dni
+        )
+    return resultados
 
 def turnos_disponibles(db: Session, fecha: date) -> List[str]:
-    horarios_totales = settings.HORARIOS_VALIDOS.copy()
-    
-    ocupados_rows = db.query(models.Turno.hora).filter(
-        models.Turno.fecha == fecha,
-        models.Turno.estado != settings.ESTADO_CANCELADO,
-    ).all()
-    
-    ocupados = [r[0] for r in ocupados_rows]
-    disponibles = [h for h in horarios_totales if h not in ocupados]
-    return disponibles 
+    # El índice solo consulta la base la primera vez que se pide la fecha
+    return indice_ocupacion.disponibles(db, fecha)
+
+async def turnos_disponibles_async(db: AsyncSession, fecha: date) -> List[str]:
+    return await indice_ocupacion.disponibles_async(db, fecha)
+
+def ocupacion_fecha(db: Session, fecha: date) -> int:
+    """Bitmap de horarios ocupados de la fecha (ver ocupacion.IndiceOcupacion)"""
+    return indice_ocupacion.bitmap(db, fecha)
+
+def calendario_disponibles(db: Session, desde: date, hasta: date) -> List[dict]:
+    if desde > hasta:
+        raise ValueError("La fecha inicial no puede ser posterior a la final")
+    dias = (hasta - desde).days + 1
+    if dias > settings.MAX_DIAS_CALENDARIO:
+        raise ValueError(f"El rango no puede superar los {settings.MAX_DIAS_CALENDARIO} días")
+
+    bitmaps = indice_ocupacion.bitmaps_rango(db, desde, hasta)
+    return [
+        {"fecha": fecha, "horarios_disponibles": horarios_libres(bitmap)}
+        for fecha, bitmap in sorted(bitmaps.items())
+    ]
 
 def validar_estado_modificable(turno: models.Turno) -> str:
     
@@ -45,23 +145,66 @@ def validar_estado_modificable(turno: models.Turno) -> str:
     
     return None
 
-def obtener_turnos_confirmados_periodos(db, desde: date, hasta: date):
+def obtener_turnos_confirmados_periodos(db, desde: date, hasta: date, skip: int = 0, limit: int = None):
+    """
+    Turnos confirmados entre desde y hasta, paginados en la base.
+    Devuelve (total, turnos_de_la_pagina); sin limit devuelve todos.
+    """
     if desde > hasta:
         raise ValueError("La fecha inicial no puede ser posterior a la final")
 
-    turnos_confirmados = (
-        db.query(models.Turno)
-        .filter(
-            models.Turno.estado == settings.ESTADO_CONFIRMADO,
-            models.Turno.fecha >= desde,
-            models.Turno.fecha <= hasta
-        )
-        #offset limit/size
-        .order_by(models.Turno.fecha)
-        .all()
+    filtros = (
+        models.Turno.estado == settings.ESTADO_CONFIRMADO,
+        models.Turno.fecha >= desde,
+        models.Turno.fecha <= hasta,
     )
 
-    return turnos_confirmados
+    total = db.query(func.count(models.Turno.id)).filter(*filtros).scalar()
+
+    query = (
+        crud.query_turnos_con_persona(db)
+        .filter(*filtros)
+        .order_by(models.Turno.fecha, models.Turno.hora, models.Turno.id)
+    )
+    if limit is not None:
+        query = query.offset(max(skip, 0)).limit(limit)
+
+    return total, query.all()
+
+def filas_turnos_confirmados(turnos: Iterable[models.Turno]) -> List[dict]:
+    """Filas de los reportes PDF/CSV de turnos confirmados (turnos con la persona cargada)"""
+    return [
+        {
+            "id": turno.id,
+            "fecha": turno.fecha,
+            "hora": turno.hora,
+            "estado": turno.estado,
+            "persona_id": turno.persona_id,
+            "nombre_persona": turno.persona.nombre,
+            "dni_persona": turno.persona.dni,
+            "email_persona": turno.persona.email
+        }
+        for turno in turnos
+    ]
+
+def estado_personas(db: Session, personas: List[models.Persona]) -> List[dict]:
+    """Estado general de cada persona (habilitada y sin exceso de cancelados)"""
+    habilitaciones = puede_sacar_turno_bulk(db, (p.id for p in personas))
+    resultado = []
+    for persona in personas:
+        puede_sacar = habilitaciones[persona.id]
+        estado = "habilitado" if persona.habilitado and puede_sacar else "inhabilitado"
+        resultado.append({
+            "id": persona.id,
+            "nombre": persona.nombre,
+            "dni": persona.dni,
+            "email": persona.email,
+            "telefono": persona.telefono,
+            "habilitado": persona.habilitado,
+            "puede_sacar_turno": puede_sacar,
+            "estado_general": estado
+        })
+    return resultado
 
 def nombre_mes(mes: int) -> str:
     MESES = {
@@ -72,105 +215,76 @@ def nombre_mes(mes: int) -> str:
     return MESES.get(mes, "mes desconocido")
 
 #-------- LÓGICA PARA REPORTES PDF CSV
-def generar_csv_turnos_fecha(lista_turnos: list) -> io.StringIO:
-    contenido_csv = []
-    for turno in lista_turnos:
-        contenido_csv.append({
-            "ID Turno": turno.Turno.id,
-            "Fecha": turno.Turno.fecha,
-            "Hora": turno.Turno.hora,
-            "Estado": turno.Turno.estado,
-            "Nombre Persona": turno.nombre,
-            "DNI Persona": turno.dni
-        })
 
-    df = pd.DataFrame(contenido_csv)
+# Filas que se acumulan antes de entregar un bloque al StreamingResponse
+FILAS_POR_BLOQUE_CSV = 500
 
-    stream = io.StringIO()
-    df.to_csv(stream, index=False, sep=";")
-    return stream
+def _csv_stream(encabezados: list, filas: Iterable, preambulo: str = "", bom: bool = False) -> Iterator[bytes]:
+    """
+    Escribe el CSV (separador ';') a medida que se consumen las filas y lo entrega en
+    bloques de bytes UTF-8, así la memoria no depende del tamaño del reporte.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+
+    if bom:
+        buffer.write("\ufeff")
+    buffer.write(preambulo)
+    writer.writerow(encabezados)
+
+    for i, fila in enumerate(filas, start=1):
+        writer.writerow(fila)
+        if i % FILAS_POR_BLOQUE_CSV == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+@medir_render
+def generar_csv_turnos_fecha(lista_turnos: list) -> Iterator[bytes]:
+    filas = (
+        (t.Turno.id, t.Turno.fecha, t.Turno.hora, t.Turno.estado, t.nombre, t.dni)
+        for t in lista_turnos
+    )
+    return _csv_stream(
+        ["ID Turno", "Fecha", "Hora", "Estado", "Nombre Persona", "DNI Persona"],
+        filas
+    )
 
+@medir_render
 def generar_pdf_turnos_fecha(lista_turnos: list, fecha: date) -> io.BytesIO:
-    #Configuración de Borb
-    pdf_buffer = io.BytesIO()
-    documento = Document()
-    pagina = Page()
-    documento.add_page(pagina)
-    layout = SingleColumnLayout(pagina)
-    
-    #Titulo
-    layout.add(Paragraph(f"Reporte de turnos del día: {fecha}", font_size=Decimal(14)))
-    
-    table = FixedColumnWidthTable(number_of_rows=len(lista_turnos) +1, number_of_columns=5)
-    encabezados = ["ID", "Hora", "Estado", "Nombre", "DNI"]
-    for encabezado in encabezados:
-        table.add(TableCell(Paragraph(encabezado, font="Helvetica-Bold"), background_color=None))
-
-    for turno in lista_turnos:
-        table.add(TableCell(Paragraph(str(turno.Turno.id))))
-        table.add(TableCell(Paragraph(str(turno.Turno.hora))))
-        table.add(TableCell(Paragraph(str(turno.Turno.estado))))
-        table.add(TableCell(Paragraph(str(turno.nombre))))
-        table.add(TableCell(Paragraph(str(turno.dni))))
-
-    layout.add(table)
-    
-    PDF.dumps(pdf_buffer, documento)
-    pdf_buffer.seek(0)
-    return pdf_buffer
+    reporte = ReportePDF(
+        [(f"Reporte de turnos del día: {fecha}", 14)],
+        ["ID", "Hora", "Estado", "Nombre", "DNI"],
+        tipo="turnos-por-fecha",
+        parametros={"fecha": fecha}
+    )
+    reporte.agregar_filas(
+        (turno.Turno.id, turno.Turno.hora, turno.Turno.estado, turno.nombre, turno.dni)
+        for turno in lista_turnos
+    )
+    return reporte.generar()
 
+@medir_render
 def generar_pdf_cancelados_mes(lista_turnos: list, mes: str, anio: int) -> io.BytesIO:
-    pdf_buffer = io.BytesIO()
-    documento = Document()
-    pagina = Page()
-    documento.add_page(pagina)
-    layout = SingleColumnLayout(pagina)
-    
-    layout.add(Paragraph(f"Turnos Cancelados - {mes} {anio}", font_size=Decimal(14)))
-    layout.add(Paragraph(f"Total cancelados: {len(lista_turnos)}", font_size=Decimal(10)))
-    
-    if lista_turnos:
-        # Tabla: ID, Fecha, Hora (3 columnas)
-        table = FixedColumnWidthTable(number_of_rows=len(lista_turnos) + 1, number_of_columns=3)
-        
-        # Encabezados
-        for encabezado in ["ID Turno", "Fecha", "Hora"]:
-            table.add(TableCell(Paragraph(encabezado, font="Helvetica-Bold")))
-
-        # Filas
-        for turno in lista_turnos:
-            table.add(TableCell(Paragraph(str(turno.id))))
-            table.add(TableCell(Paragraph(str(turno.fecha))))
-            table.add(TableCell(Paragraph(str(turno.hora))))
-
-        layout.add(table)
-    else:
-        layout.add(Paragraph("No hay turnos cancelados en este período."))
-
-    PDF.dumps(pdf_buffer, documento)
-    pdf_buffer.seek(0)
-    return pdf_buffer
-
-def generar_csv_turnos_cancelados_mes(turnos: list, mes: str, anio: int) -> io.StringIO:
-
-    data = []
-    for t in turnos:
-        data.append({
-            "ID Turno": t.id,
-            "Persona ID": t.persona_id,
-            "Fecha": t.fecha,
-            "Hora": t.hora,
-            "Estado": t.estado
-        })
-
-    df = pd.DataFrame(data)
+    # Tabla: ID, Fecha, Hora (3 columnas)
+    reporte = ReportePDF(
+        [(f"Turnos Cancelados - {mes} {anio}", 14), (f"Total cancelados: {len(lista_turnos)}", 10)],
+        ["ID Turno", "Fecha", "Hora"],
+        tipo="turnos-cancelados-por-mes",
+        parametros={"mes": mes, "anio": anio}
+    )
+    reporte.agregar_filas((turno.id, turno.fecha, turno.hora) for turno in lista_turnos)
+    return reporte.generar(mensaje_vacio="No hay turnos cancelados en este período.")
 
-    buffer = io.StringIO()
-    df.to_csv(buffer, index=False, sep=";")
-    buffer.seek(0)
-    return buffer
+@medir_render
+def generar_csv_turnos_cancelados_mes(turnos: Iterable, mes: str, anio: int) -> Iterator[bytes]:
+    filas = ((t.id, t.persona_id, t.fecha, t.hora, t.estado) for t in turnos)
+    return _csv_stream(["ID Turno", "Persona ID", "Fecha", "Hora", "Estado"], filas)
 
 
+@medir_render
 def generar_csv_turnos_persona_paginado(
     turnos,
     persona,
@@ -178,38 +292,24 @@ def generar_csv_turnos_persona_paginado(
     tamanio: int,
     total_paginas: int,
     total_turnos: int
-) -> io.StringIO:
+) -> Iterator[bytes]:
 
-    buffer = io.StringIO()
-
-    buffer.write("# Reporte de Turnos por Persona\n")
-    buffer.write(
+    preambulo = (
+        "# Reporte de Turnos por Persona\n"
         f"# Persona: {persona.nombre} - DNI {persona.dni}\n"
-    )
-    buffer.write(
         f"# Pagina: {pagina} de {total_paginas} "
         f"- Tamanio pagina: {tamanio} "
         f"- Total turnos: {total_turnos}\n"
     )
 
-
-    data = []
-    for turno, nombre, dni in turnos:
-        data.append({
-            "Nombre": nombre,
-            "DNI": dni,
-            "Fecha": turno.fecha,
-            "Hora": turno.hora,
-            "Estado": turno.estado
-        })
-
-    df = pd.DataFrame(data)
-
-    df.to_csv(buffer, index=False, sep=";")
-    buffer.seek(0)
-    return buffer
+    filas = (
+        (nombre, dni, turno.fecha, turno.hora, turno.estado)
+        for turno, nombre, dni in turnos
+    )
+    return _csv_stream(["Nombre", "DNI", "Fecha", "Hora", "Estado"], filas, preambulo=preambulo)
 
 
+@medir_render
 def generar_pdf_turnos_persona_paginado(
     turnos,
     persona,
@@ -218,265 +318,120 @@ def generar_pdf_turnos_persona_paginado(
     total_paginas: int,
     total_turnos: int
 ):
-    buffer = io.BytesIO()
-    doc = Document()
-
-    page = Page()
-    doc.add_page(page)
-    layout = SingleColumnLayout(page)
-
-    layout.add(
-        Paragraph(
-            f"Reporte de Turnos - {persona.nombre} (DNI {persona.dni})",
-            font_size=Decimal(14)
-        )
-    )
-
-    layout.add(
-        Paragraph(
-            f"Página {pagina} de {total_paginas} | "
-            f"Tamaño página: {tamanio} | "
-            f"Total turnos: {total_turnos}",
-            font_size=Decimal(9)
-        )
+    reporte = ReportePDF(
+        [
+            (f"Reporte de Turnos - {persona.nombre} (DNI {persona.dni})", 14),
+            (f"Página {pagina} de {total_paginas} | "
+             f"Tamaño página: {tamanio} | "
+             f"Total turnos: {total_turnos}", 9),
+        ],
+        ["Nombre", "DNI", "Fecha", "Hora", "Estado"],
+        tipo="turnos-por-persona",
+        parametros={"dni": persona.dni, "pagina": pagina, "tamanio": tamanio}
     )
-
-    table = FixedColumnWidthTable(
-        number_of_rows=len(turnos) + 1,
-        number_of_columns=5
+    reporte.agregar_filas(
+        (nombre, dni, turno.fecha, turno.hora, turno.estado)
+        for turno, nombre, dni in turnos
     )
+    return reporte.generar()
 
-    headers = ["Nombre", "DNI", "Fecha", "Hora", "Estado"]
-    for h in headers:
-        table.add(TableCell(Paragraph(h, font="Helvetica-Bold")))
-
-    for turno, nombre, dni in turnos:
-        table.add(TableCell(Paragraph(nombre)))
-        table.add(TableCell(Paragraph(str(dni))))
-        table.add(TableCell(Paragraph(str(turno.fecha))))
-        table.add(TableCell(Paragraph(str(turno.hora))))
-        table.add(TableCell(Paragraph(str(turno.estado))))
-
-    layout.add(table)
-
-    PDF.dumps(buffer, doc)
-    buffer.seek(0)
-    return buffer
-
-def generar_csv_turnos_cancelados(turnos: list) -> io.StringIO:
-    data_list = []
-
-    for t in turnos:
-        data_list.append({
-            "ID Turno": t.id,
-            "Fecha": t.fecha,
-            "Hora": t.hora,
-            "Estado": t.estado,
-            "Persona ID": t.persona_id
-        })
-
-    df = pd.DataFrame(data_list)
-
-    stream = io.StringIO()
-    df.to_csv(stream, index=False, sep=";")
-    return stream
+@medir_render
+def generar_csv_turnos_cancelados(turnos: Iterable) -> Iterator[bytes]:
+    filas = ((t.id, t.fecha, t.hora, t.estado, t.persona_id) for t in turnos)
+    return _csv_stream(["ID Turno", "Fecha", "Hora", "Estado", "Persona ID"], filas)
 
+@medir_render
 def generar_pdf_turnos_cancelados(turnos: list) -> io.BytesIO:
-    pdf_buffer = io.BytesIO()
-    doc = Document()
-    page = Page()
-    doc.add_page(page)
-    layout = SingleColumnLayout(page)
-
-    layout.add(Paragraph("Reporte de Turnos Cancelados", font_size=Decimal(14)))
-    layout.add(Paragraph(f"Total de turnos cancelados: {len(turnos)}", font_size=Decimal(10)))
-
-    if turnos:
-        table = FixedColumnWidthTable(
-            number_of_rows=len(turnos) + 1,
-            number_of_columns=4
-        )
-
-        for h in ["ID", "Fecha", "Hora", "Persona ID"]:
-            table.add(TableCell(Paragraph(h, font="Helvetica-Bold")))
-
-        for t in turnos:
-            table.add(TableCell(Paragraph(str(t.id))))
-            table.add(TableCell(Paragraph(str(t.fecha))))
-            table.add(TableCell(Paragraph(str(t.hora))))
-            table.add(TableCell(Paragraph(str(t.persona_id))))
-
-        layout.add(table)
-    else:
-        layout.add(Paragraph("No hay turnos cancelados."))
-
-    PDF.dumps(pdf_buffer, doc)
-    pdf_buffer.seek(0)
-    return pdf_buffer
+    reporte = ReportePDF(
+        [("Reporte de Turnos Cancelados", 14), (f"Total de turnos cancelados: {len(turnos)}", 10)],
+        ["ID", "Fecha", "Hora", "Persona ID"],
+        tipo="turnos-cancelados"
+    )
+    reporte.agregar_filas((t.id, t.fecha, t.hora, t.persona_id) for t in turnos)
+    return reporte.generar(mensaje_vacio="No hay turnos cancelados.")
 
+@medir_render
 def generar_pdf_estado_personas(personas_data: list) -> io.BytesIO:
-    pdf_buffer = io.BytesIO()
-    doc = Document()
-    page = Page()
-    doc.add_page(page)
-    layout = SingleColumnLayout(page)
-
-    layout.add(Paragraph("Reporte Estado de Personas", font_size=Decimal(14)))
-
-    table = FixedColumnWidthTable(
-        number_of_rows=len(personas_data) + 1,
-        number_of_columns=5
+    reporte = ReportePDF(
+        [("Reporte Estado de Personas", 14)],
+        ["ID", "Nombre", "DNI", "Email", "Estado"],
+        anchos=[1, 3, 2, 4, 2],
+        tipo="estado-personas"
     )
-
-    for h in ["ID", "Nombre", "DNI", "Email", "Estado"]:
-        table.add(TableCell(Paragraph(h, font="Helvetica-Bold")))
-
-    def partir_texto(texto: str, largo: int = 12) -> str:
-        return "\n".join(
-            texto[i:i+largo] for i in range(0, len(texto), largo)
+    reporte.agregar_filas(
+        (p["id"], p["nombre"], p["dni"], p["email"], p["estado_general"])
+        for p in personas_data
+    )
+    return reporte.generar()
+
+@medir_render
+def generar_csv_estado_personas(resultado: list, pagina: int, total_paginas: int) -> Iterator[bytes]:
+    filas = (
+        (
+            persona["id"],
+            persona["dni"],
+            persona["nombre"],
+            persona["estado_general"],
+            persona["telefono"],
+            "Si" if persona["habilitado"] else "No",
+            "Si" if persona["puede_sacar_turno"] else "No",
+            persona["email"],
         )
-
-    for p in personas_data:
-        table.add(TableCell(Paragraph(str(p["id"]))))
-        table.add(TableCell(Paragraph(p["nombre"])))
-        table.add(TableCell(Paragraph(p["dni"])))
-        table.add(TableCell(Paragraph(partir_texto(p["email"]))))
-        table.add(TableCell(Paragraph(p["estado_general"])))
-
-    layout.add(table)
-
-    PDF.dumps(pdf_buffer, doc)
-    pdf_buffer.seek(0)
-    return pdf_buffer
-
-def generar_csv_estado_personas(resultado: list, pagina: int, total_paginas: int) -> io.StringIO:
-    buffer = io.StringIO()
-    
-    # Crear DataFrame con datos esenciales
-    data = []
-    for persona in resultado:
-        data.append({
-            "ID": persona["id"],
-            "DNI": persona["dni"],
-            "Nombre": persona["nombre"],
-            "Estado": persona["estado_general"],
-            "Telefono": persona["telefono"],
-            "Habilitado": "Si" if persona["habilitado"] else "No",
-            "Puede sacar turno": "Si" if persona["puede_sacar_turno"] else "No",
-            "Email": persona["email"]
-            
-        })
-    
-    df = pd.DataFrame(data)
-    buffer.write('\ufeff')
-    df.to_csv(
-        buffer,
-        index=False,
-        sep=";",
-        encoding='utf-8-sig'
+        for persona in resultado
+    )
+    return _csv_stream(
+        ["ID", "DNI", "Nombre", "Estado", "Telefono", "Habilitado", "Puede sacar turno", "Email"],
+        filas,
+        bom=True
     )
-    
-    buffer.seek(0)
-    return buffer
 
+@medir_render
 def generar_pdf_turnos_confirmados_periodos(resultados: list, desde: date, hasta: date, 
     pagina: int, total_paginas: int, total: int) -> io.BytesIO:
-    
-    def preparar_texto_pdf(texto: any, max_len: int = 25) -> str:
-        if texto is None:
-            return ""
-        
-        texto_str = str(texto)
-        if len(texto_str) > max_len and "@" in texto_str:
-            usuario, dominio = texto_str.split("@", 1)
-            if len(usuario) > 20:
-                usuario = usuario[:17] + "..."
-            texto_str = f"{usuario}\n@{dominio}"
-        elif len(texto_str) > max_len:
-            lineas = [texto_str[i:i+max_len] for i in range(0, len(texto_str), max_len)]
-            texto_str = "\n".join(lineas)
-        
-        return texto_str
-    
-    #Crear PDF
-    pdf_buffer = io.BytesIO()
-    doc = Document()
-    page = Page()
-    doc.add_page(page)
-    layout = SingleColumnLayout(page)
-    
-    #Título
-    layout.add(Paragraph(f"Reporte de Turnos Confirmados", font_size=Decimal(16)))
-    layout.add(Paragraph(f"Período: {desde} a {hasta}", font_size=Decimal(12)))
-    layout.add(Paragraph(f"Página {pagina} de {total_paginas} - Total de turnos: {total}", 
-                        font_size=Decimal(10)))
-    layout.add(Paragraph(f"Fecha de generación: {date.today()}", font_size=Decimal(10)))
-    
-    if resultados:
-        #Tabla con anchos optimizados
-        table = FixedColumnWidthTable(
-            number_of_rows=len(resultados) + 1,
-            number_of_columns=7,
-            column_widths=[
-                Decimal(1),   # ID
-                Decimal(3),   # Fecha
-                Decimal(2.5), # Hora
-                Decimal(3),   # Estado
-                Decimal(4),   # Nombre
-                Decimal(2.5),   # DNI
-                Decimal(4)  # Email
-            ]
+    reporte = ReportePDF(
+        [
+            ("Reporte de Turnos Confirmados", 16),
+            (f"Período: {desde} a {hasta}", 12),
+            (f"Página {pagina} de {total_paginas} - Total de turnos: {total}", 10),
+            (f"Fecha de generación: {date.today()}", 10),
+        ],
+        ["ID", "Fecha", "Hora", "Estado", "Nombre", "DNI", "Email"],
+        anchos=[1, 3, 2, 3, 4, 2.5, 5],
+        tipo="turnos-confirmados-periodos",
+        parametros={"desde": desde, "hasta": hasta, "pagina": pagina}
+    )
+    reporte.agregar_filas(
+        (
+            item["id"],
+            item["fecha"],
+            item["hora"],
+            item["estado"],
+            item["nombre_persona"],
+            item["dni_persona"],
+            item["email_persona"],
         )
-        
-        # Encabezados
-        headers = ["ID", "Fecha", "Hora", "Estado", "Nombre", "DNI", "Email"]
-        for h in headers:
-            table.add(TableCell(Paragraph(h, font="Helvetica-Bold")))
-        
-        for item in resultados:
-            table.add(TableCell(Paragraph(str(item["id"]))))
-            table.add(TableCell(Paragraph(str(item["fecha"]))))
-            table.add(TableCell(Paragraph(str(item["hora"]))))
-            table.add(TableCell(Paragraph(str(item["estado"]))))
-            table.add(TableCell(Paragraph(preparar_texto_pdf(item["nombre_persona"], 20))))
-            table.add(TableCell(Paragraph(str(item["dni_persona"]))))
-            table.add(TableCell(Paragraph(preparar_texto_pdf(item["email_persona"], 25))))
-        
-        layout.add(table)
-    else:
-        layout.add(Paragraph("No hay turnos confirmados en este período."))
-    
-    PDF.dumps(pdf_buffer, doc)
-    pdf_buffer.seek(0)
-    return pdf_buffer
-
+        for item in resultados
+    )
+    return reporte.generar(mensaje_vacio="No hay turnos confirmados en este período.")
 
+@medir_render
 def generar_csv_turnos_confirmados_periodos(resultados: list, desde: date, hasta: date,
-    pagina: int, total_paginas: int, total: int) -> io.StringIO:
-    buffer = io.StringIO()
-    
-    data = []
-    for item in resultados:
-        data.append({
-            "ID_Turno": item["id"],
-            "Fecha": item["fecha"],
-            "Hora": item["hora"],
-            "Estado": item["estado"],
-            "ID_Persona": item["persona_id"],
-            "DNI": item["dni_persona"],
-            "Nombre": item["nombre_persona"],
-            "Email": item["email_persona"]
-        })
-    
-    df = pd.DataFrame(data)
-    buffer.write('\ufeff')
-    
-    df.to_csv(
-        buffer,
-        index=False,
-        sep=";",
-        encoding='utf-8-sig'
+    pagina: int, total_paginas: int, total: int) -> Iterator[bytes]:
+    filas = (
+        (
+            item["id"],
+            item["fecha"],
+            item["hora"],
+            item["estado"],
+            item["persona_id"],
+            item["dni_persona"],
+            item["nombre_persona"],
+            item["email_persona"],
+        )
+        for item in resultados
+    )
+    return _csv_stream(
+        ["ID_Turno", "Fecha", "Hora", "Estado", "ID_Persona", "DNI", "Nombre", "Email"],
+        filas,
+        bom=True
     )
-    
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Almacén de PDF generados: un pedido repetido se sirve del archivo guardado.
+"""
+import os
+import pdf_reportes
+from artefactos import AlmacenArtefactos
+
+
+def armar(filas):
+    reporte = pdf_reportes.ReportePDF([("Título", 14)], ["ID", "Nombre"], tipo="prueba")
+    reporte.agregar_filas(filas)
+    return reporte, reporte.generar()
+
+
+def test_pedido_repetido_no_pinta_paginas(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_reportes, "almacen_artefactos", AlmacenArtefactos(str(tmp_path), 1024 * 1024))
+    filas = [(i, f"Persona {i}") for i in range(200)]
+    primero, buffer = armar(filas)
+    assert primero._numero_pagina > 1
+
+    repetido, guardado = armar(filas)
+    assert repetido._documento is None and repetido._numero_pagina == 0
+    assert guardado.getvalue() == buffer.getvalue()
+
+    distinto, _ = armar(filas[:-1])
+    assert distinto._numero_pagina > 1
+
+
+def test_guardar_la_misma_clave_no_cambia_el_total(tmp_path):
+    almacen = AlmacenArtefactos(str(tmp_path), 1024 * 1024)
+    almacen.guardar("a", b"x" * 100)
+    almacen.guardar("b", b"y" * 50)
+    for _ in range(3):
+        almacen.guardar("a", b"x" * 100)
+    assert almacen._tamanio_total == 150 == sum(os.path.getsize(tmp_path / n) for n in os.listdir(tmp_path))
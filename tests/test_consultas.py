@@ -0,0 +1,147 @@
+"""
+Presupuesto de consultas SQL de los endpoints más usados.
+
+Cada endpoint se pide con dos tamaños de página: si la cantidad de consultas crece
+con las filas, hay un N+1 (una consulta por turno o por persona).
+"""
+import logging
+import pytest
+import consultas_sql
+from conftest import ClienteASGI, REFERENCIA
+
+HOY = REFERENCIA.isoformat()
+
+# (url con {n} = tamaño de página, máximo de consultas)
+PRESUPUESTOS = [
+    ("/turnos?limit={n}", 1),
+    ("/personas?limit={n}", 1),
+    ("/reportes/estado-personas?por_pagina={n}", 2),
+    ("/reportes/turnos-por-persona?dni=20000001&size={n}", 3),
+]
+
+
+@pytest.mark.parametrize("url, maximo", PRESUPUESTOS)
+@pytest.mark.parametrize("n", [5, 20])
+def test_presupuesto_no_depende_de_las_filas(cliente, presupuesto, url, maximo, n):
+    with presupuesto(maximo):
+        respuesta = cliente.get(url.format(n=n))
+    assert respuesta.status_code == 200, respuesta.text
+
+
+def test_disponibilidad_una_consulta_por_fecha(cliente, presupuesto):
+    from ocupacion import indice_ocupacion
+    indice_ocupacion.limpiar()
+    with presupuesto(1):
+        assert cliente.get(f"/turnos-disponibles?fecha={HOY}").status_code == 200
+    # Con la fecha ya cargada en el índice de ocupación no se consulta la base
+    with presupuesto(0):
+        assert cliente.get(f"/turnos-disponibles?fecha={HOY}").status_code == 200
+
+
+def test_calendario_una_consulta_por_rango(cliente, presupuesto):
+    from ocupacion import indice_ocupacion
+    indice_ocupacion.limpiar()
+    with presupuesto(1):
+        respuesta = cliente.get("/turnos-disponibles/calendario?desde=2025-06-01&hasta=2025-07-31")
+    assert respuesta.status_code == 200
+    assert respuesta.json()["dias"]
+
+
+def test_reserva(cliente, presupuesto, dni_habilitado):
+    # DNI, cancelados de los últimos 6 meses e INSERT
+    with presupuesto(3) as conteo:
+        respuesta = cliente.post("/turnos", json={"fecha": "2030-01-07", "hora": "09:00", "dni": dni_habilitado})
+    assert respuesta.status_code == 200, respuesta.text
+    assert conteo.cantidad == 3
+
+
+def test_presupuesto_excedido():
+    import crud
+    import database
+    db = database.SessionLectura()
+    try:
+        with pytest.raises(consultas_sql.PresupuestoExcedido, match="2 consultas"):
+            with consultas_sql.presupuesto_consultas(1):
+                crud.get_persona(db, 1)
+                crud.get_persona(db, 2)
+    finally:
+        db.close()
+
+
+def test_middleware_headers_y_aviso_n_mas_1(app, caplog):
+    from fastapi import FastAPI
+    import crud
+    import database
+
+    # App de prueba con un N+1 explícito: una consulta por persona
+    prueba = FastAPI()
+
+    @prueba.get("/n-mas-1")
+    def n_mas_1():
+        db = database.SessionLectura()
+        try:
+            return [crud.get_persona(db, i).id for i in range(1, 6)]
+        finally:
+            db.close()
+
+    cliente = ClienteASGI(consultas_sql.ConsultasMiddleware(prueba, umbral=3))
+    try:
+        with caplog.at_level(logging.WARNING, logger="consultas_sql"):
+            respuesta = cliente.get("/n-mas-1")
+    finally:
+        cliente.cerrar()
+    assert respuesta.json() == [1, 2, 3, 4, 5]
+    assert respuesta.headers["X-DB-Queries"] == "5"
+    assert float(respuesta.headers["X-DB-Time-Ms"]) >= 0
+    assert "Posible N+1 en GET /n-mas-1: la misma consulta se ejecutó 5 veces" in caplog.text
+
+
+# Cantidad exacta de consultas de los endpoints que antes buscaban la persona de cada
+# turno con crud.get_persona: tiene que ser la misma con 5 filas que con 100 o más
+
+PERIODO = "desde=2025-01-01&hasta=2025-06-15"
+
+CONSULTAS_EXACTAS = [
+    # (url con pocas filas, url con muchas filas, consultas)
+    ("/turnos?limit=5", "/turnos?limit=500", 1),
+    # Cinco personas por página; con min=3 cada una trae al menos tres turnos
+    ("/reportes/turnos-cancelados?min=1", "/reportes/turnos-cancelados?min=3", 3),
+    (f"/reportes/turnos-confirmados-periodos?{PERIODO}&por_pagina=5",
+     f"/reportes/turnos-confirmados-periodos?{PERIODO}&por_pagina=100", 2),
+    (f"/reportes/turnos-confirmados-periodos/pdf?{PERIODO}&por_pagina=5",
+     f"/reportes/turnos-confirmados-periodos/pdf?{PERIODO}&por_pagina=100", 2),
+    (f"/reportes/turnos-confirmados-periodos/csv?{PERIODO}&por_pagina=5",
+     f"/reportes/turnos-confirmados-periodos/csv?{PERIODO}&por_pagina=100", 2),
+]
+
+
+@pytest.mark.parametrize("pocas, muchas, consultas", CONSULTAS_EXACTAS,
+                         ids=["turnos", "cancelados", "confirmados", "confirmados-pdf", "confirmados-csv"])
+def test_consultas_exactas_por_endpoint(cliente, presupuesto, pocas, muchas, consultas):
+    tamanios = []
+    for url in (pocas, muchas):
+        with presupuesto(consultas) as conteo:
+            respuesta = cliente.get(url)
+        assert respuesta.status_code == 200, respuesta.text
+        assert conteo.cantidad == consultas, url
+        tamanios.append(len(respuesta.content))
+    assert tamanios[1] > tamanios[0]
+
+
+def test_consultas_exactas_obtener_turno(cliente, presupuesto):
+    with presupuesto(1) as conteo:
+        respuesta = cliente.get("/turnos/1")
+    assert respuesta.status_code == 200
+    assert respuesta.json()["dni"]
+    assert conteo.cantidad == 1
+
+
+def test_consultas_exactas_confirmar_y_cancelar(cliente, presupuesto, dni_habilitado):
+    turno = cliente.post("/turnos", json={"fecha": "2030-01-08", "hora": "10:00", "dni": dni_habilitado}).json()
+    # El turno con su persona (en el handler y al actualizar) y el UPDATE
+    for accion in ("confirmar", "cancelar"):
+        with presupuesto(3) as conteo:
+            respuesta = cliente.put(f"/turnos/{turno['id']}/{accion}")
+        assert respuesta.status_code == 200, respuesta.text
+        assert respuesta.json()["dni"] == dni_habilitado
+        assert conteo.cantidad == 3
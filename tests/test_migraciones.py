@@ -0,0 +1,68 @@
+"""
+Migración de una base creada antes del índice único de horarios, con horarios que
+tienen más de un turno activo (como las que generaba populate_db).
+"""
+import pytest
+from sqlalchemy import create_engine, inspect
+import migraciones
+from config import settings
+
+TURNOS = [
+    # (id, fecha, hora, estado)
+    (1, "2025-03-03", "09:00", "pendiente"),
+    (2, "2025-03-03", "09:00", "confirmado"),
+    (3, "2025-03-03", "09:00", "pendiente"),
+    (4, "2025-03-03", "09:30", "cancelado"),
+    (5, "2025-03-03", "09:30", "pendiente"),
+    (6, "2025-03-04", "10:00", "asistido"),
+    (7, "2025-03-04", "10:00", "pendiente"),
+    (8, "2025-03-04", "10:30", "pendiente"),
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'vieja.db'}")
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(
+            "CREATE TABLE personas (id INTEGER PRIMARY KEY, nombre VARCHAR NOT NULL, email VARCHAR NOT NULL, "
+            "dni VARCHAR NOT NULL, telefono VARCHAR, fecha_nacimiento DATE NOT NULL, habilitado BOOLEAN NOT NULL)"
+        )
+        conexion.exec_driver_sql(
+            "CREATE TABLE turnos (id INTEGER PRIMARY KEY, fecha DATE NOT NULL, hora VARCHAR NOT NULL, "
+            "estado VARCHAR NOT NULL, persona_id INTEGER NOT NULL REFERENCES personas (id))"
+        )
+        conexion.exec_driver_sql(
+            "INSERT INTO personas VALUES (1, 'Ana', 'ana@example.com', '30000001', NULL, '1990-01-01', 1)"
+        )
+        for turno in TURNOS:
+            conexion.exec_driver_sql("INSERT INTO turnos VALUES (?, ?, ?, ?, 1)", turno)
+    yield engine
+    engine.dispose()
+
+
+def estados(engine) -> dict:
+    with engine.connect() as conexion:
+        return dict(conexion.exec_driver_sql("SELECT id, estado FROM turnos").all())
+
+
+def test_duplicados_detienen_la_migracion(engine):
+    with pytest.raises(migraciones.ErrorMigracion, match="2 horarios.*MIGRACION_CANCELAR_DUPLICADOS"):
+        migraciones.aplicar(engine)
+    # No quedó nada a medias: ni turnos cancelados ni versión aplicada
+    assert estados(engine) == {id_: estado for id_, _, _, estado in TURNOS}
+    with engine.connect() as conexion:
+        assert conexion.exec_driver_sql("PRAGMA user_version").scalar() == 0
+
+
+def test_cancelar_duplicados(engine, monkeypatch):
+    monkeypatch.setattr(settings, "MIGRACION_CANCELAR_DUPLICADOS", True)
+    assert migraciones.aplicar(engine) == len(migraciones.MIGRACIONES)
+
+    # En cada horario queda el turno más viejo; los cancelados y los horarios sin repetir no cambian
+    assert estados(engine) == {
+        1: "pendiente", 2: "cancelado", 3: "cancelado", 4: "cancelado",
+        5: "pendiente", 6: "asistido", 7: "cancelado", 8: "pendiente",
+    }
+    indices = {indice["name"] for indice in inspect(engine).get_indexes("turnos")}
+    assert "ux_turnos_horario_activo" in indices
@@ -0,0 +1,43 @@
+"""
+Planes de consulta de los reportes (EXPLAIN QUERY PLAN): ninguno recorre la tabla
+turnos entera y cada uno usa su índice compuesto.
+"""
+from datetime import timedelta
+import pytest
+import crud
+import services
+from consultas_sql import planes_de_consultas
+from conftest import REFERENCIA
+
+HACE_UN_MES = REFERENCIA - timedelta(days=30)
+
+# (reporte, consultas que hace, índice que tiene que usar)
+ESPERADOS = [
+    ("cancelados por mes", lambda db: crud.get_turnos_cancelados_por_mes(db, REFERENCIA.year, REFERENCIA.month),
+     "ix_turnos_estado_fecha"),
+    ("confirmados por período", lambda db: services.obtener_turnos_confirmados_periodos(db, HACE_UN_MES, REFERENCIA, 0, 10),
+     "ix_turnos_estado_fecha"),
+    ("puede_sacar_turno", lambda db: services.puede_sacar_turno(db, 1), "ix_turnos_persona_estado_fecha"),
+    ("puede_sacar_turno_bulk", lambda db: services.puede_sacar_turno_bulk(db, range(1, 50)), "ix_turnos_persona_estado_fecha"),
+    ("turnos por persona", lambda db: crud.get_turnos_por_persona_paginado(db, 1), "ix_turnos_persona_estado_fecha"),
+    ("personas con cancelados", lambda db: crud.get_personas_con_cancelados(db, 2), "ix_turnos_estado_fecha"),
+    ("turnos cancelados (CSV)", lambda db: crud.iterar_en_lotes(crud.query_turnos_cancelados(db)).all(),
+     "ix_turnos_estado_fecha"),
+]
+
+
+@pytest.fixture
+def db(app):
+    import database
+    sesion = database.SessionLectura()
+    yield sesion
+    sesion.close()
+
+
+@pytest.mark.parametrize("consultas, indice", [(c, i) for _, c, i in ESPERADOS], ids=[n for n, _, _ in ESPERADOS])
+def test_reporte_usa_su_indice(db, consultas, indice):
+    import database
+    planes = planes_de_consultas(database.engine_lectura, lambda: consultas(db))
+    assert planes
+    assert not any("SCAN turnos" in plan for plan in planes), planes
+    assert any(indice in plan for plan in planes), planes
@@ -0,0 +1,42 @@
+"""
+Reportes encolados: se arman en el pool de procesos y sus tiempos de armado llegan
+a GET /metrics del proceso de la API.
+"""
+import re
+import time
+from reportes_jobs import cola_reportes
+from conftest import REFERENCIA
+
+METRICA = 'report_render_seconds_count{function="generar_pdf_turnos_fecha"}'
+
+
+def renders(cliente) -> int:
+    coincidencia = re.search(re.escape(METRICA) + r" (\d+)", cliente.get("/metrics").text)
+    return int(coincidencia.group(1)) if coincidencia else 0
+
+
+def test_tiempos_de_render_del_pool_en_metrics(cliente):
+    antes = renders(cliente)
+    try:
+        respuesta = cliente.post("/reportes/jobs", json={
+            "reporte": "turnos-por-fecha", "formato": "pdf", "parametros": {"fecha": REFERENCIA.isoformat()},
+        })
+        assert respuesta.status_code == 202, respuesta.text
+        trabajo = respuesta.json()["id"]
+
+        limite = time.monotonic() + 60
+        while cliente.get(f"/reportes/jobs/{trabajo}").json()["estado"] in ("pendiente", "procesando"):
+            assert time.monotonic() < limite
+            time.sleep(0.1)
+
+        descarga = cliente.get(f"/reportes/jobs/{trabajo}/descarga")
+        assert descarga.status_code == 200
+        assert descarga.content.startswith(b"%PDF")
+    finally:
+        cola_reportes.cerrar()
+    # El armado fue en otro proceso: el tiempo llega con el resultado del trabajo, en
+    # un callback del future que puede correr justo después de que figure "listo"
+    limite = time.monotonic() + 5
+    while renders(cliente) == antes and time.monotonic() < limite:
+        time.sleep(0.05)
+    assert renders(cliente) == antes + 1
@@ -0,0 +1,86 @@
+"""
+Reserva de horarios bajo concurrencia: el índice único parcial ux_turnos_horario_activo
+admite un solo turno no cancelado por (fecha, hora), sin consulta previa ni lock.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import crud
+import schemas
+from config import settings
+
+HILOS = 40
+
+
+@pytest.fixture
+def Sesion(app):
+    # Una conexión por hilo (no el escritor único de la app) para que las reservas
+    # compitan en la base y no esperando el pool
+    import database
+    engine = create_engine(database.DATABASE_URL, connect_args={"check_same_thread": False}, max_overflow=-1)
+    database.configurar_sqlite(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+    engine.dispose()
+
+
+def reservar_en_paralelo(Sesion, turno: schemas.TurnoCreate) -> int:
+    """HILOS reservas del mismo horario largadas a la vez; devuelve cuántas se aceptaron"""
+    largada = threading.Barrier(HILOS)
+
+    def reservar(_):
+        db = Sesion()
+        try:
+            largada.wait()
+            crud.create_turno(db, turno)
+            return True
+        except crud.HorarioOcupado:
+            return False
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(HILOS) as pool:
+        return sum(pool.map(reservar, range(HILOS)))
+
+
+@pytest.mark.parametrize("dia", range(3))
+def test_reservas_simultaneas_del_mismo_horario(Sesion, dia):
+    turno = schemas.TurnoCreate(
+        fecha=date(2031, 3, 3) + timedelta(days=dia), hora=settings.HORARIOS_VALIDOS[dia], persona_id=1
+    )
+    assert reservar_en_paralelo(Sesion, turno) == 1
+
+
+def test_reservas_simultaneas_por_la_api(cliente, dnis_habilitados):
+    # Mitad por POST /turnos (sync) y mitad por POST /async/turnos
+    cuerpo = {"fecha": "2031-04-01", "hora": settings.HORARIOS_VALIDOS[0]}
+    respuestas = cliente.en_paralelo([
+        ("POST", "/async/turnos" if i % 2 else "/turnos", {"json": {**cuerpo, "dni": dni}})
+        for i, dni in enumerate(dnis_habilitados[:HILOS])
+    ])
+    estados = sorted(r.status_code for r in respuestas)
+    assert estados == [200] + [409] * (len(respuestas) - 1), [r.text for r in respuestas if r.status_code not in (200, 409)]
+
+
+def test_cancelado_libera_el_horario(cliente, dnis_habilitados):
+    primero, segundo = dnis_habilitados[:2]
+    cuerpo = {"fecha": "2031-05-02", "hora": settings.HORARIOS_VALIDOS[1]}
+    turno = cliente.post("/turnos", json={**cuerpo, "dni": primero}).json()
+
+    ocupado = cliente.post("/turnos", json={**cuerpo, "dni": segundo})
+    assert ocupado.status_code == 409
+    assert ocupado.json()["detail"] == crud.mensaje_horario_ocupado(date(2031, 5, 2), cuerpo["hora"])
+
+    assert cliente.put(f"/turnos/{turno['id']}/cancelar").status_code == 200
+    assert cliente.post("/turnos", json={**cuerpo, "dni": segundo}).status_code == 200
+
+
+def test_mover_a_un_horario_ocupado(cliente, dnis_habilitados):
+    primero, segundo = dnis_habilitados[2:4]
+    cliente.post("/turnos", json={"fecha": "2031-05-05", "hora": "09:00", "dni": primero})
+    b = cliente.post("/turnos", json={"fecha": "2031-05-05", "hora": "09:30", "dni": segundo}).json()
+    respuesta = cliente.put(f"/turnos/{b['id']}", json={"hora": "09:00"})
+    assert respuesta.status_code == 409
+    assert cliente.get(f"/turnos/{b['id']}").json()["hora"] == "09:30"